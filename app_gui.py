@@ -1,20 +1,21 @@
 import os
-import glob
 import re
 import hashlib
+import itertools
+import queue
+import threading
 import tkinter as tk
 from tkinter import messagebox
 from PIL import Image, ImageTk
 
 import torch
 
-from models import get_model
 from config import DATASET_CONFIGS
+from checkpoint_index import latest_checkpoint_per_dataset
+from model_registry import ModelRegistry
 from utils import (
     class_index_from_prompt,
     prompt_to_seed,
-    is_conditional_checkpoint,
-    get_num_classes_from_checkpoint,
 )
 
 # -------------------------------------------------------
@@ -23,29 +24,21 @@ from utils import (
 
 def find_available_models():
     """
-    Vasculha outputs/**/checkpoint_latest.pth e, para cada dataset
-    (pasta logo após 'outputs/'), escolhe o checkpoint mais recente.
+    Consulta o índice de checkpoints (outputs/checkpoint_index.json) e, para
+    cada dataset (pasta logo após 'outputs/'), escolhe o checkpoint mais recente.
     Suporta DCGAN, DCGAN-cond e WGAN-GP checkpoints.
     Retorna: { dataset_name: ckpt_path_mais_recente }
     """
-    found = {}
-    for ckpt in glob.glob(os.path.join("outputs", "**", "checkpoint_latest.pth"), recursive=True):
-        parts = ckpt.replace("/", os.sep).split(os.sep)
-        if len(parts) >= 3 and parts[0] == "outputs":
-            ds = parts[1]  # outputs/<dataset>/...
-            try:
-                mtime = os.path.getmtime(ckpt)
-            except OSError:
-                continue
-            if ds not in found or mtime > found[ds][1]:
-                found[ds] = (ckpt, mtime)
-    # só o caminho
-    return {ds: data[0] for ds, data in found.items()}
+    return latest_checkpoint_per_dataset("outputs")
 
-AVAILABLE_MODELS = find_available_models()
+# preenchido em main() (a descoberta não roda no import)
+AVAILABLE_MODELS = {}
 
 device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
 
+# geradores residentes (troca de dataset instantânea); preload em main()
+model_registry = ModelRegistry(device)
+
 # estado global simples
 current_dataset = None
 current_checkpoint = None
@@ -91,116 +84,70 @@ def parse_prompt(prompt, dataset_name):
 # Carregar modelo
 # -------------------------------------------------------
 
-def load_generator(dataset_name):
+def _checkpoint_for_dataset(dataset_name):
     """
-    Carrega o gerador do dataset escolhido.
+    Retorna o checkpoint do dataset ou None (mostrando o erro ao usuário).
+    Deve ser chamada na thread do Tk.
     """
-    global generator, nz, current_dataset, current_checkpoint
-
     if dataset_name not in AVAILABLE_MODELS:
         messagebox.showerror(
             "Modelo não encontrado",
             f"Nenhum checkpoint encontrado para o dataset '{dataset_name}'.\n"
             f"Use seu instalador/menu para baixar esse modelo primeiro."
         )
-        return False
+        return None
 
     ckpt_path = AVAILABLE_MODELS[dataset_name]
 
-    if (
-        generator is not None
-        and current_dataset == dataset_name
-        and current_checkpoint == ckpt_path
-    ):
-        # já carregado
-        return True
-
     if not os.path.exists(ckpt_path):
         messagebox.showerror(
             "Checkpoint ausente",
             f"O caminho do checkpoint não existe:\n{ckpt_path}"
         )
-        return False
+        return None
 
-    try:
-        ckpt = torch.load(ckpt_path, map_location=device)
-    except Exception as e:
-        messagebox.showerror("Erro ao carregar modelo", str(e))
-        return False
+    return ckpt_path
 
-    config = ckpt.get("config", {})
-    model_type = config.get("model", "dcgan").lower()
-
-    nz_local = config.get("nz", 100)
-    ngf = config.get("ngf", 64)
-    ndf = config.get("ndf", 64)
-    ds_name = config.get("dataset", dataset_name)
-
-    # sinaliza se o checkpoint é condicional e carrega as classes do dataset
-    global is_conditional, classes_map
-    is_conditional = is_conditional_checkpoint(ckpt)
-    classes_map = DATASET_CONFIGS.get(ds_name, {}).get("classes", [])
-
-    # canais / tamanho baseado no checkpoint
-    nc = config.get("nc", 1 if ds_name == "mnist" else 3)
-    img_size = config.get("img_size", 28 if ds_name == "mnist" else 32)
-
-    # ---------- TUDO ABAIXO PRECISA ESTAR DENTRO DA FUNÇÃO ----------
-    # Se for condicional, precisamos de num_classes (e opcionalmente text_conditional)
-    num_classes = None
-    text_conditional = False
-
-    # monta a config base do gerador
-    model_config = {
-        "nz": nz_local,
-        "ngf": ngf,
-        "ndf": ndf,
-        "nc": nc,
-        "img_size": img_size,
-    }
-
-    # se o checkpoint/modelo for condicional, garantimos num_classes
-    if is_conditional:
-        num_classes = config.get("num_classes", None)
-        text_conditional = bool(config.get("text_conditional", False))
-
-        # tenta inferir pelo mapeamento de classes do dataset (ex.: 10 no MNIST/CIFAR10)
-        if num_classes is None and classes_map:
-            num_classes = len(classes_map)
-
-        if num_classes is None:
-            messagebox.showerror(
-                "Erro ao inicializar gerador",
-                "num_classes é obrigatório para dcgan-cond"
-            )
-            return False
 
-        model_config.update({
-            "num_classes": num_classes,
-            "text_conditional": text_conditional,
-        })
+def _select_entry(entry, ckpt_path):
+    """Torna entry (LoadedGenerator) o modelo atual e avisa a UI"""
+    global generator, nz, current_dataset, current_checkpoint
+    global is_conditional, classes_map, on_model_loaded_callback
 
-    # cria o gerador (condicional ou não) com a config montada
-    try:
-        gen, _ = get_model(model_type, model_config)
-        gen.load_state_dict(ckpt["generator_state_dict"])
-        gen.to(device)
-        gen.eval()
-    except Exception as e:
-        messagebox.showerror("Erro ao inicializar gerador", str(e))
-        return False
+    if generator is entry.generator:
+        # já selecionado
+        return
 
-    # atualiza estado global só no final (se tudo deu certo)
-    nz = nz_local
-    generator = gen
-    current_dataset = ds_name
+    nz = entry.nz
+    generator = entry.generator
+    is_conditional = entry.is_conditional
+    classes_map = entry.classes
+    current_dataset = entry.dataset_name
     current_checkpoint = ckpt_path
-    
+
     # Chama callback se definido (para atualizar UI)
-    global on_model_loaded_callback
     if on_model_loaded_callback:
         on_model_loaded_callback()
-    
+
+
+def load_generator(dataset_name):
+    """
+    Seleciona o gerador do dataset escolhido (bloqueante).
+
+    Os geradores ficam residentes no registro (LRU); trocar de dataset
+    só reaproveita o modelo já carregado, sem reler o checkpoint.
+    """
+    ckpt_path = _checkpoint_for_dataset(dataset_name)
+    if ckpt_path is None:
+        return False
+
+    try:
+        entry = model_registry.get(ckpt_path)
+    except Exception as e:
+        messagebox.showerror("Erro ao carregar modelo", str(e))
+        return False
+
+    _select_entry(entry, ckpt_path)
     return True
 
 
@@ -208,79 +155,183 @@ def load_generator(dataset_name):
 # Geração de imagem
 # -------------------------------------------------------
 
-def generate_image(prompt_text, image_label, dataset_var):
-    global generator, generation_counter
+def render_image(entry, prompt_text, dataset_name, counter):
+    """
+    Gera a imagem (PIL, 340x340) da geração número 'counter' do prompt.
+    Não toca no Tk: pode rodar na thread de geração.
+    """
+    # interpretar prompt dentro do dataset escolhido
+    selected_class = parse_prompt(prompt_text, dataset_name)
+    seed = prompt_to_seed(prompt_text, dataset_name, selected_class, extra=counter)
 
-    dataset_name = dataset_var.get()
+    g = torch.Generator(device=device)
+    g.manual_seed(seed)
 
-    if not dataset_name:
-        messagebox.showwarning("Selecione um modelo", "Escolha um dataset antes de gerar.")
+    noise = torch.randn(1, entry.nz, 1, 1, generator=g, device=device)
+
+    with torch.no_grad():
+        if entry.is_conditional:
+            # Extrai índice de classe a partir do prompt
+            selected_idx = class_index_from_prompt(
+                prompt_text, dataset_name, DATASET_CONFIGS, default=None
+            )
+            
+            # Se não encontrou classe no prompt, usa hash determinístico do prompt para escolher classe
+            if selected_idx is None and entry.classes:
+                # Usa hash determinístico (SHA256) para distribuir entre classes disponíveis
+                # Usa 16 caracteres (64 bits) para reduzir colisões
+                prompt_hash = int(hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()[:16], 16)
+                selected_idx = prompt_hash % len(entry.classes)
+            elif selected_idx is None:
+                # Fallback se não houver classes mapeadas
+                selected_idx = 0
+            
+            labels = torch.tensor([selected_idx], device=device, dtype=torch.long)
+            fake = entry.generator(noise, labels).detach().cpu()
+        else:
+            fake = entry.generator(noise).detach().cpu()
+
+    fake = (fake + 1) / 2  # [-1,1] -> [0,1]
+    fake = fake.squeeze(0)
+
+    # grayscale vs RGB
+    if fake.shape[0] == 1:
+        img_np = fake[0].numpy()
+        img = Image.fromarray((img_np * 255).astype("uint8"), mode="L")
+    else:
+        img_np = fake.permute(1, 2, 0).numpy()
+        img = Image.fromarray((img_np * 255).astype("uint8"), mode="RGB")
+
+    # tamanho maior pra ficar mais bonito na UI
+    return img.resize((340, 340), Image.NEAREST)
+
+
+class GenerationWorker:
+    """
+    Thread de geração para a interface.
+
+    Pedidos do usuário têm prioridade sobre a pré-geração especulativa da
+    próxima seed. Os resultados voltam para a thread do Tk por uma fila
+    consultada com root.after (o Tk não é thread-safe).
+
+    Uma chave de geração é (checkpoint, dataset, prompt, contador).
+    """
+
+    PRIORITY_REQUEST = 0
+    PRIORITY_PREFETCH = 1
+    POLL_MS = 30
+
+    def __init__(self, root, on_result):
+        self.root = root
+        self.on_result = on_result
+        self._jobs = queue.PriorityQueue()
+        self._results = queue.Queue()
+        self._prefetched = {}  # chave -> (entry, imagem)
+        self._lock = threading.Lock()
+        self._seq = itertools.count()  # desempate FIFO na fila de prioridade
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.root.after(self.POLL_MS, self._poll)
+
+    def request(self, key):
+        """Pede a imagem de key; usa a pré-gerada se já estiver pronta"""
+        with self._lock:
+            ready = self._prefetched.pop(key, None)
+        if ready is not None:
+            self.on_result(key, ready[0], ready[1], None)
+        else:
+            self._jobs.put((self.PRIORITY_REQUEST, next(self._seq), key))
+
+    def prefetch(self, key):
+        """Gera key especulativamente; descarta pré-gerações de outras chaves"""
+        with self._lock:
+            self._prefetched = {k: v for k, v in self._prefetched.items() if k == key}
+            if key in self._prefetched:
+                return
+        self._jobs.put((self.PRIORITY_PREFETCH, next(self._seq), key))
+
+    def _run(self):
+        while True:
+            priority, _, key = self._jobs.get()
+            ckpt_path, dataset_name, prompt_text, counter = key
+            try:
+                entry = model_registry.get(ckpt_path)
+                img = render_image(entry, prompt_text, dataset_name, counter)
+            except Exception as e:
+                if priority == self.PRIORITY_REQUEST:
+                    self._results.put((key, None, None, e))
+                continue
+
+            if priority == self.PRIORITY_PREFETCH:
+                with self._lock:
+                    self._prefetched[key] = (entry, img)
+            else:
+                self._results.put((key, entry, img, None))
+
+    def _poll(self):
+        while True:
+            try:
+                result = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self.on_result(*result)
+        self.root.after(self.POLL_MS, self._poll)
+
+
+# worker criado em main() (precisa da janela raiz)
+generation_worker = None
+latest_request = None
+
+
+def show_result(image_label, key, entry, img, error):
+    """Exibe um resultado do worker (thread do Tk) e pré-gera a próxima seed"""
+    if key != latest_request:
+        # resultado de um clique antigo (o usuário já pediu outra imagem)
         return
 
-    if not load_generator(dataset_name):
+    if error is not None:
+        image_label.config(image="", text="")
+        messagebox.showerror("Erro ao gerar imagem", str(error))
         return
 
-    # interpretar prompt dentro do dataset escolhido
-    selected_class = parse_prompt(prompt_text, dataset_name)
+    _select_entry(entry, key[0])
 
-    # incrementa contador para variar seed a cada geração
-    generation_counter += 1
-    seed = prompt_to_seed(prompt_text, dataset_name, selected_class, extra=generation_counter)
+    tk_img = ImageTk.PhotoImage(img)
+    image_label.config(image=tk_img, text="")
+    image_label.image = tk_img
 
-    try:
-        g = torch.Generator(device=device)
-        g.manual_seed(seed)
+    # próximo clique com o mesmo prompt usa counter + 1
+    generation_worker.prefetch(key[:3] + (key[3] + 1,))
 
-        noise = torch.randn(1, nz, 1, 1, generator=g, device=device)
 
-        with torch.no_grad():
-            if is_conditional:
-                # Extrai índice de classe a partir do prompt
-                selected_idx = class_index_from_prompt(
-                    prompt_text, dataset_name, DATASET_CONFIGS, default=None
-                )
-                
-                # Se não encontrou classe no prompt, usa hash determinístico do prompt para escolher classe
-                if selected_idx is None and classes_map:
-                    # Usa hash determinístico (SHA256) para distribuir entre classes disponíveis
-                    # Usa 16 caracteres (64 bits) para reduzir colisões
-                    prompt_hash = int(hashlib.sha256(prompt_text.encode("utf-8")).hexdigest()[:16], 16)
-                    selected_idx = prompt_hash % len(classes_map)
-                elif selected_idx is None:
-                    # Fallback se não houver classes mapeadas
-                    selected_idx = 0
-                
-                labels = torch.tensor([selected_idx], device=device, dtype=torch.long)
-                fake = generator(noise, labels).detach().cpu()
-            else:
-                fake = generator(noise).detach().cpu()
+def generate_image(prompt_text, image_label, dataset_var):
+    global generation_counter, latest_request
 
-        fake = (fake + 1) / 2  # [-1,1] -> [0,1]
-        fake = fake.squeeze(0)
+    dataset_name = dataset_var.get()
 
-        # grayscale vs RGB
-        if fake.shape[0] == 1:
-            img_np = fake[0].numpy()
-            img = Image.fromarray((img_np * 255).astype("uint8"), mode="L")
-        else:
-            img_np = fake.permute(1, 2, 0).numpy()
-            img = Image.fromarray((img_np * 255).astype("uint8"), mode="RGB")
+    if not dataset_name:
+        messagebox.showwarning("Selecione um modelo", "Escolha um dataset antes de gerar.")
+        return
 
-        # tamanho maior pra ficar mais bonito na UI
-        img = img.resize((340, 340), Image.NEAREST)
+    ckpt_path = _checkpoint_for_dataset(dataset_name)
+    if ckpt_path is None:
+        return
 
-        tk_img = ImageTk.PhotoImage(img)
-        image_label.config(image=tk_img, text="")
-        image_label.image = tk_img
+    # incrementa contador para variar seed a cada geração
+    generation_counter += 1
+    latest_request = (ckpt_path, dataset_name, prompt_text, generation_counter)
 
-    except Exception as e:
-        messagebox.showerror("Erro ao gerar imagem", str(e))
+    if image_label.image is None:
+        image_label.config(text="Gerando...")
+    generation_worker.request(latest_request)
 
 # -------------------------------------------------------
 # Interface Tkinter (somente estética)
 # -------------------------------------------------------
 
 def main():
+    AVAILABLE_MODELS.update(find_available_models())
+
     if not AVAILABLE_MODELS:
         root = tk.Tk()
         root.withdraw()
@@ -366,6 +417,7 @@ def main():
         font=("Segoe UI", 10),
     )
     image_label.place(relx=0.5, rely=0.5, anchor="center")
+    image_label.image = None
 
     # coluna de controles
     controls = tk.Frame(content, bg="#111827")
@@ -502,6 +554,18 @@ def main():
     )
     generate_button.pack(fill="x")
 
+    # geração fora da thread do Tk (a janela não congela)
+    global generation_worker
+    generation_worker = GenerationWorker(
+        root, lambda *result: show_result(image_label, *result)
+    )
+
+    # carrega todos os modelos em segundo plano (o selecionado primeiro)
+    selected = AVAILABLE_MODELS[dataset_var.get()]
+    model_registry.preload(
+        [selected] + [p for p in AVAILABLE_MODELS.values() if p != selected]
+    )
+
     root.mainloop()
 
 
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Geração em larga escala (ex: 50k imagens para avaliação FID)
+
+As imagens são geradas em micro-batches de tamanho fixo e gravadas em disco
+por um pool de threads, sem nunca manter todas em memória. Cada imagem i usa
+o ruído da seed (--seed + i), então o resultado não depende do batch size e
+intervalos [--start, --end) podem ser divididos entre processos/máquinas.
+Reexecutar o mesmo comando retoma de onde parou (chunks completos são pulados).
+
+Formatos de saída:
+    png  - um arquivo por imagem (<output>/00000123.png)
+    tar  - shards tar com --shard-size PNGs cada (<output>/shard_00000000_00001000.tar)
+    npy  - array uint8 N x H x W x C via memmap (<output>/images_<start>_<end>.npy)
+
+Uso:
+    python batch_generate.py --checkpoint outputs/.../checkpoint_latest.pth --num-samples 50000
+    python batch_generate.py --checkpoint ... --start 0 --end 25000 --format npy
+    python batch_generate.py --checkpoint ... --start 25000 --end 50000 --format npy
+"""
+
+import argparse
+import io
+import os
+import tarfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+from PIL import Image
+
+from config import DATASET_CONFIGS
+from utils import (
+    build_generator_from_checkpoint,
+    compile_generator,
+    format_time,
+    get_img_size_from_checkpoint,
+    get_num_classes_from_checkpoint,
+    is_conditional_checkpoint,
+    load_generator_checkpoint,
+    seeded_noise,
+    to_uint8_nhwc,
+)
+
+# ====================================================================================
+# Constantes
+# ====================================================================================
+
+OUTPUT_FORMATS = ("png", "tar", "npy")
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_SHARD_SIZE = 1000
+
+
+def _encode_png(image):
+    """Codifica um array uint8 (H, W, C) como PNG"""
+    if image.shape[2] == 1:
+        image = image[:, :, 0]
+    buffer = io.BytesIO()
+    Image.fromarray(image).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# ====================================================================================
+# Escritores
+# ====================================================================================
+#
+# Todos os escritores dividem [start, end) em chunks de chunk_size imagens.
+# is_done(chunk) permite pular trabalho já concluído; write(chunk, images)
+# roda numa thread do pool e só marca o chunk como concluído após gravá-lo.
+
+
+class PngWriter:
+    """Um PNG por imagem; um chunk está pronto quando todos os arquivos existem"""
+
+    def __init__(self, output_dir, start, end, chunk_size):
+        self.output_dir = output_dir
+        self.start = start
+        self.end = end
+        self.chunk_size = chunk_size
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _path(self, index):
+        return os.path.join(self.output_dir, f"{index:08d}.png")
+
+    def is_done(self, chunk_start, chunk_end):
+        return all(os.path.exists(self._path(i)) for i in range(chunk_start, chunk_end))
+
+    def write(self, chunk_start, images):
+        for offset, image in enumerate(images):
+            path = self._path(chunk_start + offset)
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(_encode_png(image))
+            os.replace(tmp_path, path)
+
+    def close(self):
+        pass
+
+
+class TarShardWriter:
+    """
+    Shards tar de PNGs (formato webdataset: <índice>.png)
+
+    Os shards são alinhados a múltiplos de chunk_size a partir de 0 e o nome
+    traz o intervalo exato de índices [início, fim): com intervalos não
+    alinhados (ex.: --start 0 --end 1500 e --start 1500 --end 3000), as duas
+    metades do shard 1000-2000 viram arquivos distintos, e a retomada só
+    pula um shard que cobre exatamente o chunk pedido.
+    """
+
+    def __init__(self, output_dir, start, end, chunk_size):
+        self.output_dir = output_dir
+        self.chunk_size = chunk_size
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _path(self, chunk_start, chunk_end):
+        return os.path.join(self.output_dir, f"shard_{chunk_start:08d}_{chunk_end:08d}.tar")
+
+    def is_done(self, chunk_start, chunk_end):
+        return os.path.exists(self._path(chunk_start, chunk_end))
+
+    def write(self, chunk_start, images):
+        path = self._path(chunk_start, chunk_start + len(images))
+        tmp_path = path + ".tmp"
+        with tarfile.open(tmp_path, "w") as tar:
+            for offset, image in enumerate(images):
+                data = _encode_png(image)
+                info = tarfile.TarInfo(name=f"{chunk_start + offset:08d}.png")
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+        os.replace(tmp_path, path)
+
+    def close(self):
+        pass
+
+
+class NpyMemmapWriter:
+    """
+    Array uint8 (N, H, W, C) em .npy via memmap, mais um mapa de chunks prontos
+
+    O mapa (<arquivo>.done.npy, um byte por chunk) só é atualizado depois que
+    o chunk foi gravado e sincronizado, então uma interrupção nunca marca
+    dados incompletos.
+    """
+
+    def __init__(self, output_dir, start, end, chunk_size, image_shape):
+        os.makedirs(output_dir, exist_ok=True)
+        self.start = start
+        self.chunk_size = chunk_size
+        self.path = os.path.join(output_dir, f"images_{start}_{end}.npy")
+        done_path = self.path[: -len(".npy")] + ".done.npy"
+        num_chunks = (end - start + chunk_size - 1) // chunk_size
+        shape = (end - start,) + tuple(image_shape)
+
+        if os.path.exists(self.path) and os.path.exists(done_path):
+            self.images = np.load(self.path, mmap_mode="r+")
+            self.done = np.load(done_path, mmap_mode="r+")
+            if self.images.shape != shape or self.done.shape != (num_chunks,):
+                raise ValueError(
+                    f"{self.path} existe com formato diferente; remova-o para recomeçar"
+                )
+        else:
+            self.images = np.lib.format.open_memmap(
+                self.path, mode="w+", dtype=np.uint8, shape=shape
+            )
+            self.done = np.lib.format.open_memmap(
+                done_path, mode="w+", dtype=np.uint8, shape=(num_chunks,)
+            )
+
+    def _chunk_id(self, chunk_start):
+        return (chunk_start - self.start) // self.chunk_size
+
+    def is_done(self, chunk_start, chunk_end):
+        return bool(self.done[self._chunk_id(chunk_start)])
+
+    def write(self, chunk_start, images):
+        offset = chunk_start - self.start
+        self.images[offset : offset + len(images)] = images
+        self.images.flush()
+        self.done[self._chunk_id(chunk_start)] = 1
+        self.done.flush()
+
+    def close(self):
+        self.images.flush()
+        self.done.flush()
+
+
+def make_writer(output_format, output_dir, start, end, chunk_size, image_shape):
+    """Factory: 'png', 'tar' ou 'npy'"""
+    if output_format == "png":
+        return PngWriter(output_dir, start, end, chunk_size)
+    if output_format == "tar":
+        return TarShardWriter(output_dir, start, end, chunk_size)
+    if output_format == "npy":
+        return NpyMemmapWriter(output_dir, start, end, chunk_size, image_shape)
+    raise ValueError(f"Formato '{output_format}' não suportado. Use {OUTPUT_FORMATS}")
+
+
+# ====================================================================================
+# Motor de geração
+# ====================================================================================
+
+
+def iter_chunks(start, end, chunk_size, aligned=False):
+    """
+    Divide [start, end) em chunks
+
+    Com aligned=True as fronteiras caem em múltiplos de chunk_size (shards tar).
+    """
+    chunk_start = start
+    while chunk_start < end:
+        boundary = (chunk_start // chunk_size + 1) * chunk_size if aligned else chunk_start + chunk_size
+        chunk_end = min(boundary, end)
+        yield chunk_start, chunk_end
+        chunk_start = chunk_end
+
+
+def generate_range(
+    generator,
+    nz,
+    device,
+    writer,
+    start,
+    end,
+    base_seed=0,
+    batch_size=DEFAULT_BATCH_SIZE,
+    chunk_size=DEFAULT_BATCH_SIZE,
+    aligned_chunks=False,
+    label_fn=None,
+    num_workers=4,
+):
+    """
+    Gera as imagens [start, end) em micro-batches e grava pelo writer
+
+    Args:
+        generator: gerador em modo eval
+        nz: tamanho do vetor de ruído
+        device: dispositivo
+        writer: PngWriter/TarShardWriter/NpyMemmapWriter
+        start, end: intervalo de índices globais
+        base_seed: seed base (imagem i usa base_seed + i)
+        batch_size: tamanho do micro-batch na GPU/CPU
+        chunk_size: unidade de escrita/retomada
+        aligned_chunks: alinhar chunks a múltiplos de chunk_size
+        label_fn: função índices -> labels (modelos condicionais) ou None
+        num_workers: threads de escrita
+
+    Returns:
+        (imagens geradas, imagens puladas por já existirem)
+    """
+    generated = 0
+    skipped = 0
+    max_pending = 2 * num_workers
+    pending = deque()
+    report_every = max(chunk_size, 1000)
+    next_report = report_every
+
+    with ThreadPoolExecutor(max_workers=num_workers) as pool, torch.inference_mode():
+        for chunk_start, chunk_end in iter_chunks(start, end, chunk_size, aligned_chunks):
+            if writer.is_done(chunk_start, chunk_end):
+                skipped += chunk_end - chunk_start
+                continue
+
+            parts = []
+            for batch_start in range(chunk_start, chunk_end, batch_size):
+                indices = range(batch_start, min(batch_start + batch_size, chunk_end))
+                noise = seeded_noise(indices, base_seed, nz, device)
+                if label_fn is not None:
+                    fake = generator(noise, label_fn(indices).to(device))
+                else:
+                    fake = generator(noise)
+                parts.append(to_uint8_nhwc(fake))
+            images = parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+            # Limita imagens em memória aguardando escrita
+            while len(pending) >= max_pending:
+                pending.popleft().result()
+            pending.append(pool.submit(writer.write, chunk_start, images))
+            generated += chunk_end - chunk_start
+
+            if generated + skipped >= next_report:
+                print(f"   {generated + skipped}/{end - start} imagens")
+                next_report += report_every
+
+        while pending:
+            pending.popleft().result()
+
+    writer.close()
+    return generated, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Gerar grandes quantidades de imagens em disco (retomável)"
+    )
+
+    parser.add_argument("--checkpoint", type=str, required=True)
+    parser.add_argument(
+        "--num-samples",
+        type=int,
+        default=None,
+        help="Total de imagens (equivale a --start 0 --end N)",
+    )
+    parser.add_argument("--start", type=int, default=0, help="Primeiro índice (inclusivo)")
+    parser.add_argument("--end", type=int, default=None, help="Último índice (exclusivo)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed base (imagem i usa seed + i)")
+    parser.add_argument(
+        "--format",
+        type=str,
+        choices=list(OUTPUT_FORMATS),
+        default="png",
+        help="png (arquivos), tar (shards) ou npy (memmap uint8)",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Diretório de saída (padrão: <run>/generated_<seed>)",
+    )
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=DEFAULT_SHARD_SIZE,
+        help="Imagens por shard tar / chunk de retomada do npy (padrão: 1000)",
+    )
+    parser.add_argument("--workers", type=int, default=4, help="Threads de escrita")
+    parser.add_argument(
+        "--class-name",
+        type=str,
+        default=None,
+        help="Classe fixa (modelos condicionais); padrão: classes em rodízio",
+    )
+    parser.add_argument("--device", type=str, default=None)
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Compila o gerador com torch.compile (cache em .compile_cache; "
+        "volta ao modo eager se não suportado)",
+    )
+
+    args = parser.parse_args()
+
+    end = args.end if args.end is not None else args.num_samples
+    if end is None:
+        parser.error("informe --num-samples ou --end")
+    if not 0 <= args.start < end:
+        parser.error("intervalo inválido: é necessário 0 <= --start < --end")
+
+    if args.device is None:
+        device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    else:
+        device = torch.device(args.device)
+
+    checkpoint = load_generator_checkpoint(args.checkpoint, device)
+    config = checkpoint.get("config", {})
+    generator = build_generator_from_checkpoint(checkpoint, device, DATASET_CONFIGS)
+    nz = config.get("nz", 100)
+    img_size = get_img_size_from_checkpoint(checkpoint)
+    nc = config.get("nc", 3)
+
+    label_fn = None
+    if is_conditional_checkpoint(checkpoint):
+        num_classes = get_num_classes_from_checkpoint(checkpoint, DATASET_CONFIGS)
+        if args.class_name:
+            classes = DATASET_CONFIGS.get(config.get("dataset"), {}).get("classes", [])
+            if args.class_name not in classes:
+                parser.error(f"classe '{args.class_name}' não existe em {classes}")
+            fixed = classes.index(args.class_name)
+            label_fn = lambda idx: torch.full((len(idx),), fixed, dtype=torch.long)
+        else:
+            label_fn = lambda idx: torch.as_tensor(list(idx), dtype=torch.long) % num_classes
+
+    if args.compile:
+        generator = compile_generator(
+            generator,
+            config,
+            device,
+            args.batch_size,
+            conditional=label_fn is not None,
+            inference_mode=True,  # generate_range gera sob inference_mode
+        )
+
+    output_dir = args.output
+    if output_dir is None:
+        run_dir = os.path.dirname(os.path.dirname(os.path.abspath(args.checkpoint)))
+        output_dir = os.path.join(run_dir, f"generated_seed{args.seed}")
+
+    # tar/npy: a unidade de retomada independe do batch size (pode mudar entre execuções)
+    chunk_size = args.batch_size if args.format == "png" else args.shard_size
+    writer = make_writer(
+        args.format, output_dir, args.start, end, chunk_size, (img_size, img_size, nc)
+    )
+
+    print(f"\n🎨 Gerando imagens [{args.start}, {end}) → {output_dir} ({args.format})")
+    print(f"📱 Dispositivo: {device} | batch: {args.batch_size} | writers: {args.workers}")
+
+    start_time = time.time()
+    generated, skipped = generate_range(
+        generator,
+        nz,
+        device,
+        writer,
+        args.start,
+        end,
+        base_seed=args.seed,
+        batch_size=args.batch_size,
+        chunk_size=chunk_size,
+        aligned_chunks=args.format == "tar",
+        label_fn=label_fn,
+        num_workers=args.workers,
+    )
+    elapsed = time.time() - start_time
+
+    print(f"\n✅ {generated} imagens geradas em {format_time(elapsed)}", end="")
+    if generated and elapsed > 0:
+        print(f" ({generated / elapsed:.0f} img/s)", end="")
+    print()
+    if skipped:
+        print(f"   {skipped} imagens já existiam (retomado)")
+    print("\n✨ Concluído!\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+"""
+Índice de checkpoints em outputs/ (descoberta rápida, sem glob recursivo)
+
+Mantém outputs/checkpoint_index.json com um registro por
+checkpoint_latest.pth (dataset, modelo, época, img_size, mtime). O treino
+atualiza o índice a cada checkpoint salvo; as ferramentas de geração só
+fazem uma atualização incremental: os diretórios de dataset cujo mtime não
+mudou não são listados de novo.
+
+Não importa torch, para que scripts auxiliares (find_checkpoint.py,
+quick_generate.py) continuem leves.
+
+Uso:
+    python checkpoint_index.py            # lista os checkpoints indexados
+    python checkpoint_index.py --rebuild  # reconstrói varrendo outputs/ inteiro
+"""
+
+import argparse
+import json
+import os
+import re
+
+# ====================================================================================
+# Constantes
+# ====================================================================================
+
+DEFAULT_ROOT = "outputs"
+INDEX_FILENAME = "checkpoint_index.json"
+INDEX_VERSION = 1
+LATEST_FILENAME = "checkpoint_latest.pth"
+CHECKPOINTS_DIRNAME = "checkpoints"
+SR_MODEL = "sr"  # Upscaler aprendido: não é um gerador de imagens
+
+_EPOCH_FILE_RE = re.compile(r"^checkpoint_epoch_(\d+)\.pth$")
+
+
+# ====================================================================================
+# Leitura e escrita do índice
+# ====================================================================================
+
+
+def _empty_index():
+    return {"version": INDEX_VERSION, "dirs": {}, "pending": [], "checkpoints": {}}
+
+
+def load_index(root=DEFAULT_ROOT):
+    """Lê o índice (ou um índice vazio se não existir/estiver corrompido)"""
+    try:
+        with open(os.path.join(root, INDEX_FILENAME), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return _empty_index()
+    if index.get("version") != INDEX_VERSION:
+        return _empty_index()
+    return index
+
+
+def save_index(index, root=DEFAULT_ROOT):
+    """Grava o índice de forma atômica (arquivo temporário + os.replace)"""
+    path = os.path.join(root, INDEX_FILENAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _rel(path, root):
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def _abs(rel, root):
+    return os.path.join(root, *rel.split("/"))
+
+
+# ====================================================================================
+# Registros
+# ====================================================================================
+
+
+def _latest_epoch_in_dir(checkpoint_dir):
+    """Maior N entre os checkpoint_epoch_N.pth do diretório (ou None)"""
+    try:
+        names = os.listdir(checkpoint_dir)
+    except OSError:
+        return None
+    epochs = [int(m.group(1)) for m in map(_EPOCH_FILE_RE.match, names) if m]
+    return max(epochs) if epochs else None
+
+
+def _make_entry(checkpoint_path, root, config=None, epoch=None):
+    """
+    Monta o registro de um checkpoint_latest.pth
+
+    Sem config/epoch (checkpoint descoberto, não salvo pelo treino), lê o
+    config.json do diretório do run e deduz a época pelos arquivos de época.
+    """
+    checkpoint_dir = os.path.dirname(checkpoint_path)
+    run_dir = os.path.dirname(checkpoint_dir)
+
+    if config is None:
+        try:
+            with open(os.path.join(run_dir, "config.json"), "r", encoding="utf-8") as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            config = {}
+    if epoch is None:
+        epoch = _latest_epoch_in_dir(checkpoint_dir)
+
+    rel_parts = _rel(checkpoint_path, root).split("/")
+    model = config.get("model")
+    return {
+        "dataset_dir": rel_parts[0] if len(rel_parts) > 1 else None,
+        "dataset": config.get("dataset"),
+        "model": model,
+        "conditional": str(model).lower() in ("dcgan-cond", "dcgan_cond", "cgan")
+        or bool(config.get("is_conditional", False)),
+        "epoch": epoch,
+        "img_size": config.get("img_size"),
+        "mtime": os.path.getmtime(checkpoint_path),
+    }
+
+
+def _index_root_for(checkpoint_path):
+    """outputs/<dataset>/<run>/checkpoints/checkpoint_latest.pth -> outputs"""
+    path = os.path.abspath(checkpoint_path)
+    for _ in range(4):
+        path = os.path.dirname(path)
+    return path
+
+
+def record_checkpoint(checkpoint_path, config=None, epoch=None, root=None):
+    """
+    Atualiza o registro de um checkpoint_latest.pth recém-salvo
+
+    Chamado pelo treino a cada checkpoint; falhas de E/S são ignoradas
+    (o índice é só um cache e se corrige na próxima atualização).
+    """
+    root = root or _index_root_for(checkpoint_path)
+    try:
+        index = load_index(root)
+        rel = _rel(checkpoint_path, root)
+        index["checkpoints"][rel] = _make_entry(checkpoint_path, root, config, epoch)
+        run_rel = rel.rsplit("/", 2)[0]
+        if run_rel in index["pending"]:
+            index["pending"].remove(run_rel)
+        save_index(index, root)
+    except OSError:
+        pass
+
+
+# ====================================================================================
+# Atualização incremental
+# ====================================================================================
+
+
+def _subdirs(path):
+    try:
+        return sorted(e.name for e in os.scandir(path) if e.is_dir())
+    except OSError:
+        return []
+
+
+def _full_scan(index, root):
+    """Varre outputs/ inteiro (primeira construção ou --rebuild)"""
+    index["checkpoints"] = {}
+    for dirpath, _, filenames in os.walk(root):
+        if LATEST_FILENAME in filenames:
+            path = os.path.join(dirpath, LATEST_FILENAME)
+            try:
+                index["checkpoints"][_rel(path, root)] = _make_entry(path, root)
+            except OSError:
+                continue
+    index["dirs"] = {}
+    for ds in _subdirs(root):
+        index["dirs"][ds] = os.path.getmtime(os.path.join(root, ds))
+    known_runs = {rel.rsplit("/", 2)[0] for rel in index["checkpoints"]}
+    index["pending"] = [
+        f"{ds}/{run}"
+        for ds in _subdirs(root)
+        for run in _subdirs(os.path.join(root, ds))
+        if f"{ds}/{run}" not in known_runs
+    ]
+
+
+def refresh_index(root=DEFAULT_ROOT, full=False):
+    """
+    Atualiza o índice e o retorna
+
+    Só lista diretórios de dataset cujo mtime mudou (runs novos), verifica
+    os runs ainda sem checkpoint e faz um stat por checkpoint indexado.
+    """
+    if not os.path.isdir(root):
+        return _empty_index()
+
+    index = load_index(root)
+    if full or not os.path.exists(os.path.join(root, INDEX_FILENAME)):
+        _full_scan(index, root)
+        save_index(index, root)
+        return index
+
+    before = json.dumps(index, sort_keys=True)
+    dirs = index["dirs"]
+    checkpoints = index["checkpoints"]
+    pending = set(index["pending"])
+
+    # 1) datasets novos/removidos (a raiz é sempre listada: o próprio índice
+    #    fica nela e alteraria seu mtime a cada gravação)
+    current = set(_subdirs(root))
+    for ds in [d for d in dirs if d not in current]:
+        del dirs[ds]
+    for ds in current:
+        dirs.setdefault(ds, None)  # None força a listagem abaixo
+    datasets = sorted(dirs)
+
+    # 2) runs novos nos datasets alterados
+    for ds in datasets:
+        ds_path = os.path.join(root, ds)
+        try:
+            ds_mtime = os.path.getmtime(ds_path)
+        except OSError:
+            dirs.pop(ds, None)
+            continue
+        if dirs.get(ds) == ds_mtime:
+            continue
+        dirs[ds] = ds_mtime
+        indexed_runs = {rel.rsplit("/", 2)[0] for rel in checkpoints}
+        for run in _subdirs(ds_path):
+            run_rel = f"{ds}/{run}"
+            if run_rel not in indexed_runs:
+                pending.add(run_rel)
+
+    # 3) runs que ainda não tinham checkpoint
+    for run_rel in sorted(pending):
+        run_path = _abs(run_rel, root)
+        if not os.path.isdir(run_path):
+            pending.discard(run_rel)
+            continue
+        path = os.path.join(run_path, CHECKPOINTS_DIRNAME, LATEST_FILENAME)
+        if os.path.exists(path):
+            checkpoints[_rel(path, root)] = _make_entry(path, root)
+            pending.discard(run_rel)
+
+    # 4) checkpoints removidos ou atualizados fora do treino
+    for rel, entry in list(checkpoints.items()):
+        path = _abs(rel, root)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            del checkpoints[rel]
+            continue
+        if mtime != entry["mtime"]:
+            checkpoints[rel] = _make_entry(path, root)
+
+    index["pending"] = sorted(pending)
+    if json.dumps(index, sort_keys=True) != before:
+        try:
+            save_index(index, root)
+        except OSError:
+            pass
+    return index
+
+
+# ====================================================================================
+# Consultas
+# ====================================================================================
+
+
+def list_checkpoints(root=DEFAULT_ROOT, dataset=None, sr=False):
+    """
+    Checkpoints indexados, do mais recente para o mais antigo
+
+    Args:
+        root: diretório de saídas do treino
+        dataset: filtra pela pasta de dataset (outputs/<dataset>/...)
+        sr: lista os upscalers aprendidos (--model sr) em vez dos GANs
+
+    Returns:
+        lista de dicionários com 'path' (relativo ao diretório atual, como
+        o glob antigo) e os campos do registro
+    """
+    index = refresh_index(root)
+    entries = []
+    for rel, entry in index["checkpoints"].items():
+        if dataset is not None and (entry.get("dataset_dir") or "").lower() != dataset.lower():
+            continue
+        if (entry.get("model") == SR_MODEL) != sr:
+            continue
+        entries.append({"path": _abs(rel, root), **entry})
+    entries.sort(key=lambda e: e["mtime"], reverse=True)
+    return entries
+
+
+def find_latest_checkpoint(root=DEFAULT_ROOT, dataset=None, sr=False):
+    """Caminho do checkpoint_latest.pth mais recente (ou None)"""
+    entries = list_checkpoints(root, dataset, sr)
+    return entries[0]["path"] if entries else None
+
+
+def latest_checkpoint_per_dataset(root=DEFAULT_ROOT):
+    """{pasta_do_dataset: checkpoint mais recente}"""
+    found = {}
+    for entry in list_checkpoints(root):
+        ds = entry.get("dataset_dir")
+        if ds and ds not in found:
+            found[ds] = entry["path"]
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice de checkpoints em outputs/")
+    parser.add_argument("--root", type=str, default=DEFAULT_ROOT)
+    parser.add_argument("--dataset", type=str, default=None)
+    parser.add_argument(
+        "--rebuild", action="store_true", help="Reconstrói o índice varrendo tudo"
+    )
+    parser.add_argument(
+        "--sr", action="store_true", help="Lista os upscalers aprendidos (--model sr)"
+    )
+    args = parser.parse_args()
+
+    if args.rebuild:
+        refresh_index(args.root, full=True)
+
+    entries = list_checkpoints(args.root, args.dataset, args.sr)
+    if not entries:
+        print("❌ Nenhum checkpoint encontrado!")
+        return
+
+    for entry in entries:
+        print(
+            f"{entry['path']}  [{entry.get('dataset') or entry.get('dataset_dir')}"
+            f" | {entry.get('model') or '?'} | época {entry.get('epoch') or '?'}"
+            f" | {entry.get('img_size') or '?'}px]"
+        )
+
+
+if __name__ == "__main__":
+    main()
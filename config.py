@@ -3,11 +3,17 @@
 Configurações e datasets para treinamento
 """
 
+import json
 import os
+from contextlib import nullcontext
 
+import numpy as np
+import torch
+import torch.distributed as dist
+import torch.nn.functional as F
 import torchvision.datasets as dset
 import torchvision.transforms as transforms
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, Dataset, Sampler
 
 # ====================================================================================
 # Configurações de Datasets
@@ -105,77 +111,253 @@ MODEL_CONFIGS = {
         "default_ndf": 64,
         "n_critic": 5,  # Treinar critic N vezes por iteração do gerador
         "lambda_gp": 10.0,  # Peso do gradient penalty
+        "critic_step": "separate",  # fused: real/fake/interpolados num único forward
+        "batched_fakes": False,  # Gera as n_critic fakes numa só chamada do gerador
+        "gp_interval": 1,  # Gradient penalty a cada N passos do critic (peso x N)
+        "gp_subbatch": 0,  # Amostras usadas no gradient penalty (0 = batch inteiro)
+        "fresh_critic_batches": False,  # Um batch real diferente por passo do critic
+    },
+    "sr": {
+        "name": "SR",
+        "description": "Upscaler aprendido 2x/4x (convoluções + PixelShuffle), para pós-geração",
+        "default_lr": 0.0005,
+        "default_beta1": 0.9,
+        "default_beta2": 0.999,
+        "default_sr_scale": 2,
+        "default_sr_features": 32,
+        "default_sr_blocks": 4,
     },
 }
 
 
 # ====================================================================================
-# Funções para criar datasets
+# Amostragem retomável
 # ====================================================================================
 
 
-def get_dataset(
-    dataset_name, dataroot="./data", img_size=64, batch_size=128, workers=2
+class ResumableRandomSampler(Sampler):
+    """
+    Amostrador aleatório com ordem determinística por época.
+
+    A permutação de cada época é derivada de (seed + epoch) com um gerador
+    próprio, sem consumir o RNG global. Assim um treino retomado reproduz a
+    mesma ordem de batches e pode começar no meio de uma época (start_index).
+
+    Em treino distribuído (num_replicas > 1) todos os processos geram a mesma
+    permutação (mesmo seed) e cada um fica com a fatia [rank::num_replicas],
+    truncada para que todos tenham o mesmo número de amostras, como o
+    DistributedSampler do PyTorch. start_index conta amostras da fatia local.
+    """
+
+    def __init__(self, num_samples, seed=None, num_replicas=1, rank=0):
+        self.num_samples = num_samples
+        if seed is None:
+            seed = int(torch.empty((), dtype=torch.int64).random_().item())
+        self.seed = seed
+        self.num_replicas = num_replicas
+        self.rank = rank
+        self.epoch = 0
+        self.start_index = 0
+
+    def set_epoch(self, epoch, start_index=0):
+        """Define a época atual e quantas amostras dela já foram consumidas"""
+        self.epoch = epoch
+        self.start_index = start_index
+
+    def permutation(self):
+        """Permutação completa (CPU) da época atual"""
+        g = torch.Generator()
+        g.manual_seed(self.seed + self.epoch)
+        return torch.randperm(self.num_samples, generator=g)
+
+    @property
+    def num_local_samples(self):
+        """Amostras por época neste processo"""
+        return self.num_samples // self.num_replicas
+
+    def indices(self):
+        """Índices (CPU) que este processo ainda vai consumir na época atual"""
+        perm = self.permutation()
+        if self.num_replicas > 1:
+            perm = perm[self.rank : self.num_local_samples * self.num_replicas : self.num_replicas]
+        return perm[self.start_index :]
+
+    def __iter__(self):
+        return iter(self.indices().tolist())
+
+    def __len__(self):
+        return self.num_local_samples - self.start_index
+
+    def state_dict(self):
+        return {"seed": self.seed, "epoch": self.epoch}
+
+    def load_state_dict(self, state):
+        self.seed = state["seed"]
+        self.epoch = state.get("epoch", 0)
+
+
+# ====================================================================================
+# Cache pré-processado de datasets
+# ====================================================================================
+
+CACHE_DIRNAME = "cache"  # Subpasta de dataroot onde ficam os caches
+CACHE_BUILD_BATCH_SIZE = 256  # Batch usado apenas na construção do cache
+
+
+class CachedTensorDataset(Dataset):
+    """
+    Dataset servido a partir de um cache uint8 (N x C x H x W) em memória mapeada.
+
+    As imagens já estão redimensionadas/cortadas para img_size, então cada
+    __getitem__ é só uma cópia do memmap + conversão para float em [-1, 1]
+    (equivalente a ToTensor + Normalize(0.5, 0.5)), sem decodificar PIL.
+    """
+
+    def __init__(self, images_path, labels_path, shape):
+        self.images_path = images_path
+        self.shape = tuple(shape)
+        self.labels = np.load(labels_path)
+        self._images = None  # Aberto sob demanda (um memmap por processo/worker)
+
+    def _get_images(self):
+        if self._images is None:
+            self._images = np.memmap(
+                self.images_path, dtype=np.uint8, mode="r", shape=self.shape
+            )
+        return self._images
+
+    def __getstate__(self):
+        # Evita serializar o memmap inteiro ao enviar o dataset para os workers
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, index):
+        img = torch.from_numpy(np.array(self._get_images()[index]))
+        img = img.float().div_(127.5).sub_(1.0)
+        return img, int(self.labels[index])
+
+
+def _get_cache_paths(dataroot, dataset_name, img_size, nc):
+    """Retorna (images_path, labels_path, meta_path) do cache de um dataset"""
+    cache_dir = os.path.join(dataroot, CACHE_DIRNAME)
+    prefix = os.path.join(cache_dir, f"{dataset_name}_{img_size}px_nc{nc}")
+    return prefix + ".u8", prefix + "_labels.npy", prefix + ".json"
+
+
+def _source_fingerprint(dataset_name, dataroot):
+    """
+    Identifica o conteúdo da pasta de origem de datasets ImageFolder
+
+    Datasets torchvision (cifar10, mnist...) são fixos; já celeba/custom
+    podem ganhar ou trocar imagens, e o cache precisa ser reconstruído.
+
+    Returns:
+        dict com número de imagens e mtime mais recente, ou None
+    """
+    if dataset_name not in ("celeba", "custom"):
+        return None
+
+    count, newest = 0, 0.0
+    for root, _, files in os.walk(os.path.join(dataroot, dataset_name)):
+        for name in files:
+            if name.lower().endswith(dset.folder.IMG_EXTENSIONS):
+                count += 1
+                newest = max(newest, os.stat(os.path.join(root, name)).st_mtime)
+    return {"num_files": count, "newest_mtime": newest}
+
+
+def build_dataset_cache(
+    dataset, images_path, labels_path, meta_path, img_size, nc, workers=2, source=None
 ):
     """
-    Cria e retorna dataset e dataloader
+    Pré-processa um dataset (já com transform uint8) para o cache em disco
 
     Args:
-        dataset_name: nome do dataset ('cifar10', 'mnist', etc.)
-        dataroot: diretório raiz para salvar/carregar datasets
-        img_size: tamanho das imagens (redimensionadas para img_size x img_size)
-        batch_size: tamanho do batch
-        workers: número de workers para DataLoader
+        dataset: dataset cujo transform retorna tensores uint8 [C, H, W]
+        images_path: arquivo binário das imagens (uint8 N x C x H x W)
+        labels_path: arquivo .npy com os labels
+        meta_path: arquivo JSON com o shape (escrito por último, marca o cache como completo)
+        img_size: tamanho das imagens
+        nc: número de canais
+        workers: número de workers usados na construção
+        source: identificação da pasta de origem (ver _source_fingerprint)
 
     Returns:
-        (dataloader, nc) - dataloader e número de canais
+        shape do array de imagens
     """
+    os.makedirs(os.path.dirname(images_path), exist_ok=True)
 
-    if dataset_name not in DATASET_CONFIGS:
-        raise ValueError(
-            f"Dataset '{dataset_name}' não suportado. "
-            f"Datasets disponíveis: {list(DATASET_CONFIGS.keys())}"
-        )
+    shape = (len(dataset), nc, img_size, img_size)
+    tmp_images_path = images_path + ".tmp"
+    images = np.memmap(tmp_images_path, dtype=np.uint8, mode="w+", shape=shape)
+    labels = np.empty(len(dataset), dtype=np.int64)
 
-    config = DATASET_CONFIGS[dataset_name]
-    nc = config["nc"]
+    loader = DataLoader(
+        dataset,
+        batch_size=CACHE_BUILD_BATCH_SIZE,
+        shuffle=False,
+        num_workers=workers,
+    )
 
-    # Criar diretório se não existir
-    os.makedirs(dataroot, exist_ok=True)
+    offset = 0
+    for batch_images, batch_labels in loader:
+        n = batch_images.size(0)
+        images[offset : offset + n] = batch_images.numpy()
+        labels[offset : offset + n] = batch_labels.numpy()
+        offset += n
 
-    # Transformações baseadas no número de canais
-    if nc == 1:  # Grayscale
-        transform = transforms.Compose(
-            [
-                transforms.Resize(img_size),
-                transforms.CenterCrop(img_size),
-                transforms.ToTensor(),
-                transforms.Normalize([0.5], [0.5]),
-            ]
-        )
-    else:  # RGB
-        transform = transforms.Compose(
+    images.flush()
+    del images
+    os.replace(tmp_images_path, images_path)
+    np.save(labels_path, labels)
+
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"shape": list(shape), "source": source}, f)
+
+    return shape
+
+
+def _build_transform(nc, img_size, to_uint8=False):
+    """Transformações padrão (resize + crop + normalização para [-1, 1])"""
+    steps = [
+        transforms.Resize(img_size),
+        transforms.CenterCrop(img_size),
+    ]
+
+    if to_uint8:
+        # Usado pelo cache: guarda pixels crus, a normalização acontece na leitura
+        steps.append(transforms.PILToTensor())
+    else:
+        steps.extend(
             [
-                transforms.Resize(img_size),
-                transforms.CenterCrop(img_size),
                 transforms.ToTensor(),
-                transforms.Normalize([0.5, 0.5, 0.5], [0.5, 0.5, 0.5]),
+                transforms.Normalize([0.5] * nc, [0.5] * nc),
             ]
         )
 
-    # Criar dataset específico
+    return transforms.Compose(steps)
+
+
+def _load_dataset(dataset_name, dataroot, transform):
+    """Instancia o dataset torchvision/ImageFolder correspondente"""
+    config = DATASET_CONFIGS[dataset_name]
+
     if dataset_name == "cifar10":
-        dataset = dset.CIFAR10(
+        return dset.CIFAR10(
             root=dataroot, download=config["download"], transform=transform
         )
 
     elif dataset_name == "mnist":
-        dataset = dset.MNIST(
+        return dset.MNIST(
             root=dataroot, download=config["download"], transform=transform
         )
 
     elif dataset_name == "fashion-mnist":
-        dataset = dset.FashionMNIST(
+        return dset.FashionMNIST(
             root=dataroot, download=config["download"], transform=transform
         )
 
@@ -187,7 +369,7 @@ def get_dataset(
                 f"CelebA dataset não encontrado em {celeba_path}.\n"
                 "Por favor, baixe o dataset de http://mmlab.ie.cuhk.edu.hk/projects/CelebA.html"
             )
-        dataset = dset.ImageFolder(root=celeba_path, transform=transform)
+        return dset.ImageFolder(root=celeba_path, transform=transform)
 
     elif dataset_name == "custom":
         # Dataset customizado (pasta de imagens)
@@ -197,16 +379,313 @@ def get_dataset(
                 f"Dataset customizado não encontrado em {custom_path}.\n"
                 "Por favor, crie a pasta e adicione suas imagens em subpastas."
             )
-        dataset = dset.ImageFolder(root=custom_path, transform=transform)
+        return dset.ImageFolder(root=custom_path, transform=transform)
+
+    raise ValueError(f"Dataset '{dataset_name}' não implementado")
+
+
+def get_cached_dataset(dataset_name, dataroot, img_size, nc, workers=2):
+    """
+    Retorna um CachedTensorDataset, construindo o cache na primeira chamada
+
+    O cache é identificado por (dataset, img_size, nc), então mudar a
+    resolução gera um novo cache sem invalidar os anteriores. Para
+    celeba/custom, o meta guarda também o número de imagens e o mtime mais
+    recente da pasta de origem, e o cache é reconstruído se mudarem.
+    """
+    images_path, labels_path, meta_path = _get_cache_paths(
+        dataroot, dataset_name, img_size, nc
+    )
+    source = _source_fingerprint(dataset_name, dataroot)
+
+    meta = None
+    if os.path.exists(meta_path) and os.path.exists(images_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("source") != source:
+            print("⚠️  Imagens de origem mudaram desde a construção do cache")
+            meta = None
+
+    if meta is not None:
+        shape = meta["shape"]
+        print(f"⚡ Usando cache pré-processado: {images_path}")
+    else:
+        print(f"🗜️  Construindo cache pré-processado ({img_size}px): {images_path}")
+        raw_dataset = _load_dataset(
+            dataset_name, dataroot, _build_transform(nc, img_size, to_uint8=True)
+        )
+        shape = build_dataset_cache(
+            raw_dataset, images_path, labels_path, meta_path, img_size, nc, workers, source
+        )
+        print(f"✓ Cache construído: {shape[0]} imagens")
+
+    return CachedTensorDataset(images_path, labels_path, shape)
+
+
+# ====================================================================================
+# Pré-processamento em batch (sem workers)
+# ====================================================================================
+
+PREPROCESS_MODES = ("pil", "batched")
+
+# Datasets torchvision cujas imagens cabem inteiras em um único tensor uint8
+BATCHED_DATASETS = ("cifar10", "mnist", "fashion-mnist")
+
+
+def _load_raw_uint8(dataset_name, dataroot):
+    """
+    Carrega as imagens originais (sem transform) de um dataset torchvision
+
+    Returns:
+        (dataset, images, labels) - images uint8 [N, C, h, w], labels long [N]
+    """
+    dataset = _load_dataset(dataset_name, dataroot, transform=None)
+
+    images = dataset.data
+    if isinstance(images, np.ndarray):
+        images = torch.from_numpy(images)
+
+    if images.dim() == 3:  # MNIST/Fashion-MNIST: [N, H, W]
+        images = images.unsqueeze(1)
+    else:  # CIFAR-10: [N, H, W, C]
+        images = images.permute(0, 3, 1, 2)
+
+    labels = torch.as_tensor(dataset.targets, dtype=torch.long)
+
+    return dataset, images.contiguous(), labels
+
+
+class BatchedTensorLoader:
+    """
+    Substituto do DataLoader para datasets pequenos que cabem na memória.
+
+    Mantém todas as imagens originais como um único tensor uint8 (no device de
+    treino, se informado) e aplica resize + normalização no batch inteiro com
+    F.interpolate, sem processos de worker nem transforms PIL por amostra.
+    Produz batches (images, labels) no mesmo formato do DataLoader padrão.
+    """
+
+    def __init__(
+        self, dataset, images, labels, batch_size, img_size, device=None, sampler=None
+    ):
+        if device is not None:
+            images = images.to(device)
+            labels = labels.to(device)
+
+        self.dataset = dataset
+        self.images = images
+        self.labels = labels
+        self.batch_size = batch_size
+        self.img_size = img_size
+        self.sampler = sampler or ResumableRandomSampler(images.size(0))
+
+    def __len__(self):
+        # Equivalente a drop_last=True
+        return len(self.sampler) // self.batch_size
+
+    def preprocess(self, batch):
+        """uint8 [B, C, h, w] -> float [B, C, img_size, img_size] em [-1, 1]"""
+        x = batch.float().div_(255.0)
+
+        if x.shape[-2:] != (self.img_size, self.img_size):
+            # Mesmo filtro do transforms.Resize padrão (bilinear)
+            x = F.interpolate(
+                x,
+                size=(self.img_size, self.img_size),
+                mode="bilinear",
+                align_corners=False,
+                antialias=x.size(-1) > self.img_size,
+            )
+
+        return x.mul_(2.0).sub_(1.0)
+
+    def __iter__(self):
+        num_samples = len(self) * self.batch_size
+        perm = self.sampler.indices().to(self.images.device)
+
+        for start in range(0, num_samples, self.batch_size):
+            idx = perm[start : start + self.batch_size]
+            yield (
+                self.preprocess(self.images.index_select(0, idx)),
+                self.labels.index_select(0, idx),
+            )
+
+
+class DevicePrefetcher:
+    """
+    Fila de batches já no device, com a cópia do próximo grupo em andamento.
+
+    Agrupa `group` batches consecutivos do loader (ex.: os n_critic batches
+    reais de um passo do gerador) e, enquanto o grupo atual é consumido,
+    copia o seguinte para o device com non_blocking=True a partir de memória
+    pinned, num stream CUDA separado (double buffering). Em CPU, ou com um
+    loader que já entrega no device (BatchedTensorLoader), as cópias são
+    no-ops e só o agrupamento permanece.
+
+    Expõe sampler e len() como o loader original; cada item é uma lista com
+    `group` batches (images, labels). Batches que não completam um grupo no
+    fim da época são descartados (como drop_last).
+    """
+
+    def __init__(self, loader, device, group=1):
+        self.loader = loader
+        self.device = torch.device(device)
+        self.group = group
+        self.sampler = loader.sampler
+        self.use_cuda = self.device.type == "cuda"
+
+    def __len__(self):
+        return len(self.loader) // self.group
+
+    def _to_device(self, data):
+        if isinstance(data, torch.Tensor):
+            if self.use_cuda and data.device.type == "cpu" and not data.is_pinned():
+                data = data.pin_memory()
+            return data.to(self.device, non_blocking=True)
+        return type(data)(self._to_device(x) for x in data)
+
+    def _load(self, iterator, stream):
+        """Próximo grupo, com as cópias enfileiradas em stream (None no fim)"""
+        batches = []
+        for _ in range(self.group):
+            data = next(iterator, None)
+            if data is None:
+                return None
+            batches.append(data)
+        with torch.cuda.stream(stream) if stream is not None else nullcontext():
+            return [self._to_device(data) for data in batches]
+
+    def __iter__(self):
+        stream = torch.cuda.Stream(self.device) if self.use_cuda else None
+        iterator = iter(self.loader)
+        current = self._load(iterator, stream)
+
+        while current is not None:
+            if stream is not None:
+                # O stream de treino espera a cópia; record_stream impede que o
+                # alocador reaproveite a memória enquanto o treino ainda a usa
+                compute_stream = torch.cuda.current_stream(self.device)
+                compute_stream.wait_stream(stream)
+                for data in current:
+                    for tensor in data:
+                        tensor.record_stream(compute_stream)
+            upcoming = self._load(iterator, stream)
+            yield current
+            current = upcoming
+
+
+# ====================================================================================
+# Funções para criar datasets
+# ====================================================================================
+
 
+def _make_sampler(num_samples, distributed=False):
+    """
+    Amostrador retomável; com distributed=True, fatiado entre os processos
+    do grupo (torch.distributed já inicializado) com o seed do rank 0
+    """
+    if not distributed:
+        return ResumableRandomSampler(num_samples)
+
+    seed = [ResumableRandomSampler(num_samples).seed]
+    dist.broadcast_object_list(seed, src=0)
+    return ResumableRandomSampler(
+        num_samples,
+        seed=seed[0],
+        num_replicas=dist.get_world_size(),
+        rank=dist.get_rank(),
+    )
+
+
+
+def get_dataset(
+    dataset_name,
+    dataroot="./data",
+    img_size=64,
+    batch_size=128,
+    workers=2,
+    cache=False,
+    preprocess="pil",
+    device=None,
+    distributed=False,
+):
+    """
+    Cria e retorna dataset e dataloader
+
+    Args:
+        dataset_name: nome do dataset ('cifar10', 'mnist', etc.)
+        dataroot: diretório raiz para salvar/carregar datasets
+        img_size: tamanho das imagens (redimensionadas para img_size x img_size)
+        batch_size: tamanho do batch
+        workers: número de workers para DataLoader
+        cache: se True, usa o cache uint8 pré-redimensionado em dataroot/cache
+            (construído uma única vez) em vez de aplicar PIL a cada época
+        preprocess: 'pil' (transforms por amostra em workers) ou 'batched'
+            (tensor uint8 residente + resize/normalização por batch, sem workers;
+            apenas para cifar10/mnist/fashion-mnist)
+        device: device onde o modo 'batched' mantém as imagens e faz o resize
+        distributed: se True (torch.distributed inicializado), cada processo
+            recebe uma fatia disjunta de cada época; batch_size é por processo
+
+    Returns:
+        (dataloader, nc) - dataloader e número de canais
+    """
+
+    if dataset_name not in DATASET_CONFIGS:
+        raise ValueError(
+            f"Dataset '{dataset_name}' não suportado. "
+            f"Datasets disponíveis: {list(DATASET_CONFIGS.keys())}"
+        )
+
+    config = DATASET_CONFIGS[dataset_name]
+    nc = config["nc"]
+
+    if preprocess not in PREPROCESS_MODES:
+        raise ValueError(
+            f"Modo de pré-processamento '{preprocess}' inválido. "
+            f"Opções: {list(PREPROCESS_MODES)}"
+        )
+
+    # Criar diretório se não existir
+    os.makedirs(dataroot, exist_ok=True)
+
+    if preprocess == "batched":
+        if dataset_name not in BATCHED_DATASETS:
+            raise ValueError(
+                f"--preprocess batched suporta apenas {list(BATCHED_DATASETS)}. "
+                "Para este dataset use --preprocess pil (opcionalmente com --cache-dataset)."
+            )
+        if cache:
+            raise ValueError("cache=True não é compatível com preprocess='batched'")
+        dataset, images, labels = _load_raw_uint8(dataset_name, dataroot)
+        dataloader = BatchedTensorLoader(
+            dataset,
+            images,
+            labels,
+            batch_size,
+            img_size,
+            device=device,
+            sampler=_make_sampler(images.size(0), distributed),
+        )
+        return dataloader, nc
+
+    if cache:
+        dataset = get_cached_dataset(dataset_name, dataroot, img_size, nc, workers)
     else:
-        raise ValueError(f"Dataset '{dataset_name}' não implementado")
+        dataset = _load_dataset(dataset_name, dataroot, _build_transform(nc, img_size))
+
+    # Ordem por época determinística (permite retomar no meio de uma época).
+    # O gerador dedicado evita que os seeds dos workers consumam o RNG global.
+    sampler = _make_sampler(len(dataset), distributed)
+    loader_generator = torch.Generator()
+    loader_generator.manual_seed(sampler.seed + sampler.rank)
 
     # Criar DataLoader
     dataloader = DataLoader(
         dataset,
         batch_size=batch_size,
-        shuffle=True,
+        sampler=sampler,
+        generator=loader_generator,
         num_workers=workers,
         drop_last=True,  # Importante para manter batch_size consistente
         pin_memory=True,  # Acelera transferência CPU -> GPU
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Exporta apenas o gerador de um checkpoint de treino (artefato de inferência)
+
+O checkpoint completo carrega discriminador, estados dos otimizadores e
+histórico; o artefato exportado contém só os pesos do gerador e a config
+(safetensors, lido via mmap). generate.py, generate_interactive.py e
+app_gui.py usam automaticamente o artefato ao lado do checkpoint quando
+ele estiver atualizado.
+
+Uso:
+    python export_generator.py --checkpoint outputs/mnist/dcgan_xxx/checkpoints/checkpoint_latest.pth
+    python export_generator.py --all
+"""
+
+import argparse
+import os
+import time
+
+from checkpoint_index import list_checkpoints
+from config import DATASET_CONFIGS
+from utils import export_generator, load_generator_checkpoint, resolve_generator_artifact
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exportar gerador (somente inferência) de um checkpoint"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=str,
+        default=None,
+        help="Checkpoint de treino a exportar",
+    )
+    parser.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        help="Arquivo de saída (padrão: <checkpoint>.generator.safetensors)",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Exporta todos os outputs/**/checkpoint_latest.pth desatualizados",
+    )
+
+    args = parser.parse_args()
+
+    if args.all:
+        checkpoints = [
+            e["path"]
+            for e in list_checkpoints("outputs")
+            if resolve_generator_artifact(e["path"]) == e["path"]
+        ]
+    elif args.checkpoint:
+        if not os.path.exists(args.checkpoint):
+            raise FileNotFoundError(f"Checkpoint não encontrado: {args.checkpoint}")
+        checkpoints = [args.checkpoint]
+    else:
+        parser.error("informe --checkpoint ou --all")
+
+    if not checkpoints:
+        print("✓ Nenhum checkpoint para exportar (todos atualizados)")
+        return
+
+    for checkpoint_path in checkpoints:
+        output_path = export_generator(
+            checkpoint_path,
+            args.output if not args.all else None,
+            dataset_configs=DATASET_CONFIGS,
+        )
+
+        # Confere o artefato e compara o tempo de carregamento
+        start = time.perf_counter()
+        load_generator_checkpoint(checkpoint_path, prefer_export=False)
+        full_time = time.perf_counter() - start
+        start = time.perf_counter()
+        load_generator_checkpoint(output_path, prefer_export=False)
+        export_time = time.perf_counter() - start
+
+        full_size = os.path.getsize(checkpoint_path) / 1024 / 1024
+        export_size = os.path.getsize(output_path) / 1024 / 1024
+        print(f"💾 {checkpoint_path}")
+        print(f"   → {output_path}")
+        print(f"   Tamanho: {full_size:.1f} MB → {export_size:.1f} MB")
+        print(f"   Carregamento: {full_time * 1000:.0f} ms → {export_time * 1000:.0f} ms")
+
+    print("\n✨ Concluído!\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,8 +10,8 @@ Uso:
 """
 
 import sys
-import os
-import glob
+
+from checkpoint_index import find_latest_checkpoint
 
 
 def find_checkpoint_for_dataset(dataset_name):
@@ -31,36 +31,8 @@ def find_checkpoint_for_dataset(dataset_name):
     if not dataset_name:
         return None
     
-    # Procurar em outputs/**/checkpoint_latest.pth
-    checkpoints = []
-    
-    if not os.path.exists("outputs"):
-        return None
-    
-    # Buscar recursivamente por checkpoint_latest.pth
-    for ckpt_path in glob.glob(os.path.join("outputs", "**", "checkpoint_latest.pth"), recursive=True):
-        # Normalizar separadores de caminho para Windows
-        ckpt_path = ckpt_path.replace("/", os.sep)
-        parts = ckpt_path.split(os.sep)
-        
-        # Estrutura esperada: outputs/<dataset>/...
-        if len(parts) >= 3 and parts[0] == "outputs":
-            ds = parts[1].lower()
-            
-            # Verificar se o dataset corresponde
-            if ds == dataset_name:
-                try:
-                    mtime = os.path.getmtime(ckpt_path)
-                    checkpoints.append((ckpt_path, mtime))
-                except OSError:
-                    continue
-    
-    # Se encontrou checkpoints, retornar o mais recente
-    if checkpoints:
-        checkpoints.sort(key=lambda x: x[1], reverse=True)
-        return checkpoints[0][0]
-    
-    return None
+    # Consultar o índice de checkpoints (atualizado incrementalmente)
+    return find_latest_checkpoint("outputs", dataset=dataset_name)
 
 
 def main():
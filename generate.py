@@ -5,17 +5,28 @@ Script para gerar imagens usando modelos treinados
 Uso:
     python generate.py --checkpoint outputs/cifar10/dcgan_xxx/checkpoints/checkpoint_latest.pth --num-samples 64
     python generate.py --checkpoint outputs/mnist/wgan-gp_xxx/checkpoints/checkpoint_epoch_50.pth --num-samples 100
+    python generate.py --checkpoint outputs/cifar10/dcgan_xxx/checkpoints/checkpoint_latest.pth --upscale 4x --upscale-method learned
 """
 
 import argparse
 import json
 import os
 
+import numpy as np
 import torch
 from PIL import Image
 
-from models import get_model
-from utils import generate_samples
+from config import DATASET_CONFIGS
+from utils import (
+    build_generator_from_checkpoint,
+    compile_generator,
+    generate_samples,
+    get_img_size_from_checkpoint,
+    load_generator_checkpoint,
+    load_sr_model,
+    resolve_sr_checkpoint,
+    upscale_learned,
+)
 
 # ====================================================================================
 # Constantes
@@ -29,6 +40,22 @@ UPSCALE_METHODS = {
 }
 
 
+def upscale_grid_learned(img, config, scale_factor, sr_checkpoint, device):
+    """Aplica o upscaler aprendido ao grid salvo (a rede é totalmente convolucional)"""
+    sr_path = resolve_sr_checkpoint(sr_checkpoint, config.get("dataset"))
+    print(f"   Upscaler: {sr_path}")
+    sr_model = load_sr_model(sr_path, device)
+
+    # O grid é salvo em RGB; modelos de 1 canal recebem a versão em tons de cinza
+    img = img.convert("L" if sr_model.nc == 1 else "RGB")
+    x = torch.from_numpy(np.asarray(img)).float().div(127.5).sub(1)
+    x = x.unsqueeze(0).unsqueeze(0) if x.dim() == 2 else x.permute(2, 0, 1).unsqueeze(0)
+
+    y = upscale_learned(x, sr_model, scale_factor)
+    y = ((y[0] + 1) * 127.5).round().clamp(0, 255).byte().permute(1, 2, 0).cpu().numpy()
+    return Image.fromarray(y[:, :, 0] if y.shape[2] == 1 else y)
+
+
 def main():
     parser = argparse.ArgumentParser(description="Gerar imagens usando modelo treinado")
 
@@ -73,8 +100,21 @@ def main():
         "--upscale-method",
         type=str,
         default="lanczos",
-        choices=["lanczos", "bicubic", "nearest"],
-        help="Método de upscaling (padrão: lanczos)",
+        choices=["lanczos", "bicubic", "nearest", "learned"],
+        help="Método de upscaling (padrão: lanczos). learned: upscaler treinado "
+        "com train.py --model sr",
+    )
+    parser.add_argument(
+        "--sr-checkpoint",
+        type=str,
+        default=None,
+        help="Upscaler para --upscale-method learned (padrão: o mais recente do dataset)",
+    )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Compila o gerador com torch.compile (cache em .compile_cache; "
+        "volta ao modo eager se não suportado)",
     )
 
     args = parser.parse_args()
@@ -92,38 +132,27 @@ def main():
     print(f"\n🤖 Carregando modelo de: {args.checkpoint}")
     print(f"📱 Dispositivo: {device}")
 
-    # Carregar checkpoint
-    checkpoint = torch.load(args.checkpoint, map_location=device)
+    # Carregar apenas o gerador (usa o artefato exportado se houver)
+    checkpoint = load_generator_checkpoint(args.checkpoint, device)
     config = checkpoint.get("config", {})
 
     print(f"\n📋 Configurações do modelo:")
     print(f"   Dataset: {config.get('dataset', 'desconhecido')}")
     print(f"   Modelo: {config.get('model', 'desconhecido')}")
     print(f"   Época: {checkpoint.get('epoch', '?')}")
-    print(
-        f"   Tamanho da imagem: {config.get('img_size', 64)}x{config.get('img_size', 64)}"
-    )
+    img_size = get_img_size_from_checkpoint(checkpoint)
+    print(f"   Tamanho da imagem: {img_size}x{img_size}")
     print(f"   Canais: {config.get('nc', 3)}")
 
-    # Criar modelo
-    model_config = {
-        "nz": config.get("nz", 100),
-        "ngf": config.get("ngf", 64),
-        "ndf": config.get("ndf", 64),
-        "nc": config.get("nc", 3),
-        "img_size": config.get("img_size", 64),
-    }
-
-    model_type = config.get("model", "dcgan")
-    generator, _ = get_model(model_type, model_config)
-
-    # Carregar pesos
-    generator.load_state_dict(checkpoint["generator_state_dict"])
-    generator = generator.to(device)
-    generator.eval()
+    # Criar modelo e carregar pesos
+    generator = build_generator_from_checkpoint(checkpoint, device, DATASET_CONFIGS)
 
     print(f"\n✓ Modelo carregado com sucesso!")
 
+    if args.compile:
+        # generate_samples gera em micro-batches de até 256
+        generator = compile_generator(generator, config, device, min(args.num_samples, 256))
+
     # Determinar caminho de saída
     if args.output is None:
         checkpoint_dir = os.path.dirname(args.checkpoint)
@@ -149,10 +178,13 @@ def main():
         img = Image.open(args.output)
         original_size = img.size
         
-        # Aplicar upscaling usando método do dicionário
         new_size = (original_size[0] * scale_factor, original_size[1] * scale_factor)
-        upscale_method = UPSCALE_METHODS.get(args.upscale_method, Image.LANCZOS)
-        upscaled = img.resize(new_size, upscale_method)
+        if args.upscale_method == "learned":
+            upscaled = upscale_grid_learned(img, config, scale_factor, args.sr_checkpoint, device)
+        else:
+            # Aplicar upscaling usando método do dicionário
+            upscale_method = UPSCALE_METHODS.get(args.upscale_method, Image.LANCZOS)
+            upscaled = img.resize(new_size, upscale_method)
         
         # Salvar com sufixo
         output_base = args.output.replace(".png", "")
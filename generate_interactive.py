@@ -21,6 +21,9 @@ Uso:
     # Com prompt (simulado para GANs incondicionais)
     python generate_interactive.py --checkpoint outputs/cifar10/dcgan_xxx/checkpoints/checkpoint_latest.pth --prompt "gerar um gato"
 
+    # Upscaling com o upscaler aprendido (train.py --model sr)
+    python generate_interactive.py --checkpoint outputs/cifar10/dcgan_xxx/checkpoints/checkpoint_latest.pth --upscale 4 --upscale-method learned
+
     # Desabilitar upscaling
     python generate_interactive.py --checkpoint outputs/cifar10/dcgan_xxx/checkpoints/checkpoint_latest.pth --upscale 1
 
@@ -38,9 +41,15 @@ import torch
 from PIL import Image, ImageEnhance
 
 from config import DATASET_CONFIGS
-from models import get_model
 from utils import (
+    build_generator_from_checkpoint,
+    compile_generator,
     generate_samples,
+    load_sr_model,
+    resolve_sr_checkpoint,
+    upscale_batch,
+    upscale_learned,
+    load_generator_checkpoint,
     class_index_from_prompt,
     prompt_to_seed,
     is_conditional_checkpoint,
@@ -48,9 +57,15 @@ from utils import (
 )
 
 
+# Imagens por chamada de upscale_batch (limita a memória em upscales grandes)
+UPSCALE_CHUNK_SIZE = 64
+
+
 def upscale_image(image_tensor, scale_factor, method="lanczos", sharpen=1.0):
     """
-    Faz upscaling de um tensor de imagem
+    Faz upscaling de um tensor de imagem (via PIL, uma imagem por vez)
+
+    Implementação de referência; para batches use utils.upscale_batch.
 
     Args:
         image_tensor: Tensor PyTorch (C, H, W) normalizado em [-1, 1]
@@ -171,7 +186,7 @@ def interactive_menu(checkpoint_path, device):
     """Menu interativo para seleção de classe"""
 
     # Carregar checkpoint para obter informações
-    checkpoint = torch.load(checkpoint_path, map_location=device)
+    checkpoint = load_generator_checkpoint(checkpoint_path, device)
     config = checkpoint.get("config", {})
     dataset_name = config.get("dataset", "unknown")
     
@@ -419,8 +434,23 @@ Para GANs incondicionais, a seleção de classe é apenas simulada.
         "--upscale-method",
         type=str,
         default="lanczos",
-        choices=["lanczos", "bicubic", "nearest"],
-        help="Método de upscaling (padrão: lanczos)",
+        choices=["lanczos", "bicubic", "nearest", "learned"],
+        help="Método de upscaling (padrão: lanczos). learned: upscaler treinado "
+        "com train.py --model sr (sem --sharpen)",
+    )
+    parser.add_argument(
+        "--sr-checkpoint",
+        type=str,
+        default=None,
+        help="Upscaler para --upscale-method learned (padrão: o mais recente do dataset)",
+    )
+    parser.add_argument(
+        "--upscale-backend",
+        type=str,
+        default="torch",
+        choices=["torch", "pil"],
+        help="torch: batch inteiro de uma vez no device (padrão). "
+        "pil: uma imagem por vez via PIL (referência)",
     )
     parser.add_argument(
         "--sharpen",
@@ -428,6 +458,12 @@ Para GANs incondicionais, a seleção de classe é apenas simulada.
         default=1.6,
         help="Fator de nitidez no upscaling (1.0-2.0, padrão: 1.6, use 1.0 para desabilitar)",
     )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Compila o gerador com torch.compile (cache em .compile_cache; "
+        "volta ao modo eager se não suportado)",
+    )
 
     args = parser.parse_args()
 
@@ -444,8 +480,8 @@ Para GANs incondicionais, a seleção de classe é apenas simulada.
     print(f"\n🤖 Carregando modelo de: {args.checkpoint}")
     print(f"📱 Dispositivo: {device}")
 
-    # Carregar checkpoint
-    checkpoint = torch.load(args.checkpoint, map_location=device)
+    # Carregar apenas o gerador (usa o artefato exportado se houver)
+    checkpoint = load_generator_checkpoint(args.checkpoint, device)
     config = checkpoint.get("config", {})
     dataset_name = config.get("dataset", "unknown")
 
@@ -467,30 +503,16 @@ Para GANs incondicionais, a seleção de classe é apenas simulada.
     else:
         print(f"   ⚠️  Tipo: Incondicional (sem controle de classe)")
 
-    # Criar modelo
-    model_config = {
-        "nz": config.get("nz", 100),
-        "ngf": config.get("ngf", 64),
-        "ndf": config.get("ndf", 64),
-        "nc": config.get("nc", 3),
-        "img_size": config.get("img_size", 64),
-    }
-
-    # Se for condicional, adicionar num_classes
-    if is_cond and num_classes is not None:
-        model_config["num_classes"] = num_classes
-        model_config["text_conditional"] = config.get("text_conditional", False)
-
-    model_type = config.get("model", "dcgan")
-    generator, _ = get_model(model_type, model_config)
-
-    # Carregar pesos
-    generator.load_state_dict(checkpoint["generator_state_dict"])
-    generator = generator.to(device)
-    generator.eval()
+    # Criar modelo e carregar pesos
+    generator = build_generator_from_checkpoint(checkpoint, device, DATASET_CONFIGS)
 
     print(f"\n✓ Modelo carregado com sucesso!")
 
+    if args.compile:
+        generator = compile_generator(
+            generator, config, device, args.num_samples, conditional=is_cond
+        )
+
     # Determinar classe a gerar
     selected_class = None
     mode = None
@@ -528,7 +550,7 @@ Para GANs incondicionais, a seleção de classe é apenas simulada.
     fake_images = generate_with_class(
         generator,
         args.num_samples,
-        model_config["nz"],
+        config.get("nz", 100),
         device,
         selected_class,
         dataset_name,
@@ -544,20 +566,36 @@ Para GANs incondicionais, a seleção de classe é apenas simulada.
             f"\n📐 Aplicando upscaling {args.upscale}x ({original_size}x{original_size} → {original_size * args.upscale}x{original_size * args.upscale})..."
         )
         print(f"   Método: {args.upscale_method}")
-        if args.sharpen > 1.0:
+        if args.sharpen > 1.0 and args.upscale_method != "learned":
             print(f"   Nitidez: {args.sharpen}")
 
-        upscaled_images = []
-        for i in range(fake_images.shape[0]):
-            upscaled = upscale_image(
-                fake_images[i],
-                args.upscale,
-                method=args.upscale_method,
-                sharpen=args.sharpen,
+        if args.upscale_method == "learned":
+            sr_path = resolve_sr_checkpoint(args.sr_checkpoint, dataset_name)
+            print(f"   Upscaler: {sr_path}")
+            sr_model = load_sr_model(sr_path, device)
+            fake_images = upscale_learned(fake_images, sr_model, args.upscale).cpu()
+        elif args.upscale_backend == "pil":
+            upscaled_images = []
+            for i in range(fake_images.shape[0]):
+                upscaled = upscale_image(
+                    fake_images[i],
+                    args.upscale,
+                    method=args.upscale_method,
+                    sharpen=args.sharpen,
+                )
+                upscaled_images.append(upscaled)
+
+            fake_images = torch.stack(upscaled_images)
+        else:
+            # Em blocos para limitar a memória com muitas imagens grandes
+            fake_images = torch.cat(
+                [
+                    upscale_batch(
+                        chunk, args.upscale, method=args.upscale_method, sharpen=args.sharpen
+                    ).cpu()
+                    for chunk in fake_images.split(UPSCALE_CHUNK_SIZE)
+                ]
             )
-            upscaled_images.append(upscaled)
-
-        fake_images = torch.stack(upscaled_images)
         final_size = original_size * args.upscale
     else:
         final_size = original_size
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Registro de geradores carregados (cache LRU limitado por memória)
+
+Mantém vários geradores residentes, indexados por (caminho do checkpoint,
+mtime): trocar de modelo não recarrega nada, e um checkpoint reescrito
+(mtime novo) é recarregado automaticamente. Quando a soma dos tamanhos
+passa do orçamento, os modelos menos usados recentemente são descartados.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import torch
+
+from config import DATASET_CONFIGS
+from utils import (
+    build_generator_from_checkpoint,
+    get_num_classes_from_checkpoint,
+    is_conditional_checkpoint,
+    load_generator_checkpoint,
+)
+
+# ====================================================================================
+# Constantes
+# ====================================================================================
+
+DEFAULT_MEMORY_BUDGET_MB = 1024
+
+
+# ====================================================================================
+# Entradas do registro
+# ====================================================================================
+
+
+def model_nbytes(model):
+    """Bytes ocupados por parâmetros e buffers de um modelo"""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class LoadedGenerator:
+    """Gerador pronto para uso mais os metadados que a geração precisa"""
+
+    def __init__(self, checkpoint_path, mtime, checkpoint, device):
+        self.checkpoint_path = checkpoint_path
+        self.mtime = mtime
+        self.config = checkpoint.get("config", {})
+        self.dataset_name = self.config.get("dataset", "unknown")
+        self.nz = self.config.get("nz", 100)
+        self.is_conditional = is_conditional_checkpoint(checkpoint)
+        self.num_classes = (
+            get_num_classes_from_checkpoint(checkpoint, DATASET_CONFIGS)
+            if self.is_conditional
+            else None
+        )
+        self.classes = DATASET_CONFIGS.get(self.dataset_name, {}).get("classes", [])
+        self.generator = build_generator_from_checkpoint(
+            checkpoint, device, DATASET_CONFIGS
+        )
+        self.nbytes = model_nbytes(self.generator)
+
+
+# ====================================================================================
+# Registro
+# ====================================================================================
+
+
+class ModelRegistry:
+    """
+    Cache LRU de geradores, seguro para uso entre threads
+
+    Args:
+        device: dispositivo onde os geradores ficam residentes
+        memory_budget_mb: limite para a soma dos tamanhos (None = sem limite).
+            O modelo mais recente nunca é descartado, mesmo acima do limite.
+    """
+
+    def __init__(self, device, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self.device = device
+        self.memory_budget = (
+            None if memory_budget_mb is None else int(memory_budget_mb * 1024 * 1024)
+        )
+        self._entries = OrderedDict()  # (path, mtime) -> LoadedGenerator
+        self._lock = threading.Lock()
+        self._loading = {}  # (path, mtime) -> threading.Event
+        self._preload_thread = None
+
+    @staticmethod
+    def _key(checkpoint_path):
+        path = os.path.abspath(checkpoint_path)
+        return path, os.path.getmtime(path)
+
+    @property
+    def total_bytes(self):
+        with self._lock:
+            return sum(entry.nbytes for entry in self._entries.values())
+
+    def is_loaded(self, checkpoint_path):
+        try:
+            key = self._key(checkpoint_path)
+        except OSError:
+            return False
+        with self._lock:
+            return key in self._entries
+
+    def get(self, checkpoint_path):
+        """
+        Retorna o LoadedGenerator do checkpoint, carregando se necessário
+
+        Se outra thread (ex: o preload) já está carregando o mesmo
+        checkpoint, espera por ela em vez de carregar de novo.
+        """
+        key = self._key(checkpoint_path)
+
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    return self._entries[key]
+                event = self._loading.get(key)
+                if event is None:
+                    event = threading.Event()
+                    self._loading[key] = event
+                    break
+            event.wait()
+            # Se o carregamento da outra thread falhou, tenta carregar aqui
+
+        try:
+            checkpoint = load_generator_checkpoint(key[0], self.device)
+            entry = LoadedGenerator(key[0], key[1], checkpoint, self.device)
+        finally:
+            with self._lock:
+                del self._loading[key]
+            event.set()
+
+        with self._lock:
+            # Versões antigas do mesmo checkpoint não serão mais usadas
+            for old_key in [k for k in self._entries if k[0] == key[0]]:
+                del self._entries[old_key]
+            self._entries[key] = entry
+            self._evict()
+        return entry
+
+    def _evict(self):
+        """Descarta entradas LRU até caber no orçamento (chamado com o lock)"""
+        if self.memory_budget is None:
+            return
+        total = sum(entry.nbytes for entry in self._entries.values())
+        while total > self.memory_budget and len(self._entries) > 1:
+            _, entry = self._entries.popitem(last=False)
+            total -= entry.nbytes
+        if self.device.type == "cuda":
+            torch.cuda.empty_cache()
+
+    def preload(self, checkpoint_paths, on_loaded=None):
+        """
+        Carrega checkpoints em segundo plano (na ordem dada)
+
+        Args:
+            checkpoint_paths: caminhos a carregar
+            on_loaded: callback(path, entry_ou_None, erro_ou_None), chamado
+                na thread de preload
+        """
+
+        def run():
+            for path in checkpoint_paths:
+                try:
+                    entry = self.get(path)
+                    error = None
+                except Exception as e:  # Um checkpoint ruim não interrompe os demais
+                    entry, error = None, e
+                if on_loaded is not None:
+                    on_loaded(path, entry, error)
+
+        self._preload_thread = threading.Thread(target=run, daemon=True)
+        self._preload_thread.start()
+        return self._preload_thread
@@ -71,9 +71,12 @@ class DCGANDiscriminator(nn.Module):
     Compatível com resoluções 64, 128, 256 (potências de 2).
     Para 256px, recomenda-se usar ndf >= 96-128 para melhor qualidade.
     Padrão ndf=64 otimizado para VRAM moderada (RTX 4060 8GB).
+
+    sigmoid=False devolve logits (treino com BCEWithLogitsLoss); True mantém
+    a saída em probabilidade dos checkpoints antigos.
     """
 
-    def __init__(self, ndf=64, nc=3, img_size=64):
+    def __init__(self, ndf=64, nc=3, img_size=64, sigmoid=True):
         super(DCGANDiscriminator, self).__init__()
         self.ndf = ndf
         self.nc = nc
@@ -102,12 +105,9 @@ class DCGANDiscriminator(nn.Module):
             )
             current_dim = next_dim
 
-        layers.extend(
-            [
-                nn.Conv2d(current_dim, 1, 4, 1, 0, bias=False),
-                nn.Sigmoid(),
-            ]
-        )
+        layers.append(nn.Conv2d(current_dim, 1, 4, 1, 0, bias=False))
+        if sigmoid:
+            layers.append(nn.Sigmoid())
 
         self.main = nn.Sequential(*layers)
 
@@ -176,9 +176,10 @@ class ConditionalDCGANDiscriminator(nn.Module):
     """
     Discriminador condicional:
     concatena um mapa derivado do label como canal extra.
+    sigmoid como no DCGANDiscriminator.
     """
 
-    def __init__(self, ndf=64, nc=3, img_size=64, num_classes=10):
+    def __init__(self, ndf=64, nc=3, img_size=64, num_classes=10, sigmoid=True):
         super().__init__()
         self.ndf = ndf
         self.nc = nc
@@ -211,12 +212,9 @@ class ConditionalDCGANDiscriminator(nn.Module):
             )
             current_dim = next_dim
 
-        layers.extend(
-            [
-                nn.Conv2d(current_dim, 1, 4, 1, 0, bias=False),
-                nn.Sigmoid(),
-            ]
-        )
+        layers.append(nn.Conv2d(current_dim, 1, 4, 1, 0, bias=False))
+        if sigmoid:
+            layers.append(nn.Sigmoid())
 
         self.main = nn.Sequential(*layers)
 
@@ -330,6 +328,181 @@ class WGANCritic(nn.Module):
         return self.main(input).view(-1)
 
 
+# ====================================================================================
+# CRESCIMENTO PROGRESSIVO (DCGAN / WGAN-GP)
+# ====================================================================================
+
+
+def _progressive_dims(base, img_size):
+    """
+    Canais por nível (nível k = resolução 4 * 2^k), do 4x4 até img_size
+
+    Mesma progressão das pilhas DCGAN/WGAN (base * 2^(L-1) no 4x4, dividindo
+    por 2 a cada nível), com mínimo de base // 2.
+    """
+    num_layers = int(torch.log2(torch.tensor(img_size))) - 2
+    return [int(max(base * 2 ** (num_layers - 1 - k), base // 2)) for k in range(num_layers + 1)]
+
+
+def _resolution_level(resolution, img_size):
+    """Nível (0 = 4x4) de uma resolução entre 4 e img_size"""
+    level = int(torch.log2(torch.tensor(resolution))) - 2
+    if resolution != 4 * 2**level or not 4 <= resolution <= img_size:
+        raise ValueError(f"Resolução {resolution} inválida (potência de 2 entre 4 e {img_size})")
+    return level
+
+
+class ProgressiveGenerator(nn.Module):
+    """
+    Gerador com crescimento progressivo (blocos do DCGANGenerator)
+
+    Um bloco ConvTranspose2d + BatchNorm + ReLU por resolução (4x4 até
+    img_size) e uma saída 1x1 "to_rgb" por nível. set_stage(resolução, alpha)
+    escolhe até onde a rede roda; com alpha < 1 a saída do nível novo é
+    misturada (fade-in) com a do nível anterior ampliada.
+
+    Sem set_stage, roda na resolução final (inferência).
+    """
+
+    def __init__(self, nz=100, ngf=64, nc=3, img_size=64):
+        super().__init__()
+        self.nz = nz
+        self.ngf = ngf
+        self.nc = nc
+        self.img_size = img_size
+
+        dims = _progressive_dims(ngf, img_size)
+        self.blocks = nn.ModuleList(
+            [
+                nn.Sequential(
+                    nn.ConvTranspose2d(nz, dims[0], 4, 1, 0, bias=False),
+                    nn.BatchNorm2d(dims[0]),
+                    nn.ReLU(True),
+                )
+            ]
+        )
+        for k in range(1, len(dims)):
+            self.blocks.append(
+                nn.Sequential(
+                    nn.ConvTranspose2d(dims[k - 1], dims[k], 4, 2, 1, bias=False),
+                    nn.BatchNorm2d(dims[k]),
+                    nn.ReLU(True),
+                )
+            )
+        self.to_rgb = nn.ModuleList([nn.Conv2d(dim, nc, 1, 1, 0) for dim in dims])
+        self.set_stage(img_size)
+
+    def set_stage(self, resolution, alpha=1.0):
+        self.level = _resolution_level(resolution, self.img_size)
+        self.alpha = float(alpha)
+
+    @property
+    def stage(self):
+        """(resolução, alpha) atuais, no formato de set_stage"""
+        return 4 * 2**self.level, self.alpha
+
+    def forward(self, input):
+        x = input
+        for block in self.blocks[: self.level]:
+            x = block(x)
+        out = self.to_rgb[self.level](self.blocks[self.level](x))
+
+        if self.alpha < 1.0 and self.level > 0:
+            skip = nn.functional.interpolate(
+                self.to_rgb[self.level - 1](x), scale_factor=2, mode="nearest"
+            )
+            out = skip + self.alpha * (out - skip)
+        return torch.tanh(out)
+
+
+class ProgressiveDiscriminator(nn.Module):
+    """
+    Discriminador/crítico com crescimento progressivo
+
+    Espelho do ProgressiveGenerator: entrada 1x1 "from_rgb" por nível e um
+    bloco Conv2d 4x4/2 por resolução até o 4x4 final. batch_norm/sigmoid
+    reproduzem o DCGANDiscriminator (True) ou o WGANCritic (False).
+    """
+
+    def __init__(self, ndf=64, nc=3, img_size=64, batch_norm=True, sigmoid=True):
+        super().__init__()
+        self.ndf = ndf
+        self.nc = nc
+        self.img_size = img_size
+
+        dims = _progressive_dims(ndf, img_size)
+        final = [nn.Conv2d(dims[0], 1, 4, 1, 0, bias=not batch_norm)]
+        if sigmoid:
+            final.append(nn.Sigmoid())
+        self.blocks = nn.ModuleList([nn.Sequential(*final)])
+        for k in range(1, len(dims)):
+            layers = [nn.Conv2d(dims[k], dims[k - 1], 4, 2, 1, bias=not batch_norm)]
+            if batch_norm:
+                layers.append(nn.BatchNorm2d(dims[k - 1]))
+            layers.append(nn.LeakyReLU(0.2, inplace=True))
+            self.blocks.append(nn.Sequential(*layers))
+        self.from_rgb = nn.ModuleList(
+            [
+                nn.Sequential(nn.Conv2d(nc, dim, 1, 1, 0), nn.LeakyReLU(0.2, inplace=True))
+                for dim in dims
+            ]
+        )
+        self.set_stage(img_size)
+
+    def set_stage(self, resolution, alpha=1.0):
+        self.level = _resolution_level(resolution, self.img_size)
+        self.alpha = float(alpha)
+
+    def forward(self, input):
+        x = self.from_rgb[self.level](input)
+        if self.level > 0:
+            x = self.blocks[self.level](x)
+            if self.alpha < 1.0:
+                skip = self.from_rgb[self.level - 1](nn.functional.avg_pool2d(input, 2))
+                x = skip + self.alpha * (x - skip)
+        for k in range(self.level - 1, 0, -1):
+            x = self.blocks[k](x)
+        return self.blocks[0](x).view(-1)
+
+
+# ====================================================================================
+# SUPER-RESOLUÇÃO (upscaler aprendido)
+# ====================================================================================
+
+
+class SRNet(nn.Module):
+    """
+    Rede de super-resolução leve (estilo ESPCN/FSRCNN)
+
+    Algumas convoluções 3x3 na resolução baixa e um PixelShuffle no final.
+    A rede aprende apenas o resíduo sobre um upscale bicúbico da entrada,
+    então converge rápido e roda em milissegundos na CPU.
+    Entrada e saída em [-1, 1].
+    """
+
+    def __init__(self, nc=3, scale=2, num_feat=32, num_blocks=4):
+        super().__init__()
+        self.nc = nc
+        self.scale = scale
+
+        layers = [nn.Conv2d(nc, num_feat, 3, 1, 1), nn.ReLU(True)]
+        for _ in range(num_blocks):
+            layers.extend([nn.Conv2d(num_feat, num_feat, 3, 1, 1), nn.ReLU(True)])
+        layers.extend(
+            [
+                nn.Conv2d(num_feat, nc * scale * scale, 3, 1, 1),
+                nn.PixelShuffle(scale),
+            ]
+        )
+        self.body = nn.Sequential(*layers)
+
+    def forward(self, input):
+        base = nn.functional.interpolate(
+            input, scale_factor=self.scale, mode="bicubic", align_corners=False
+        )
+        return base + self.body(input)
+
+
 # ====================================================================================
 # Helpers
 # ====================================================================================
@@ -347,18 +520,38 @@ def weights_init(m):
 def get_model(model_type, model_config):
     """
     Factory: 'dcgan', 'wgan-gp', 'dcgan-cond'
+
+    Com model_config["progressive"], dcgan/wgan-gp usam as versões com
+    crescimento progressivo. Com model_config["d_logits"], o discriminador
+    do dcgan/dcgan-cond devolve logits (sem o Sigmoid final).
     """
     nz = model_config.get("nz", 100)
     ngf = model_config.get("ngf", 64)
     ndf = model_config.get("ndf", 64)
     nc = model_config.get("nc", 3)
     img_size = model_config.get("img_size", 64)
+    sigmoid = not model_config.get("d_logits", False)
 
     mt = model_type.lower()
 
+    if model_config.get("progressive", False):
+        if mt not in ("dcgan", "wgan-gp"):
+            raise ValueError("Crescimento progressivo disponível apenas para 'dcgan' e 'wgan-gp'")
+        generator = ProgressiveGenerator(nz=nz, ngf=ngf, nc=nc, img_size=img_size)
+        discriminator = ProgressiveDiscriminator(
+            ndf=ndf,
+            nc=nc,
+            img_size=img_size,
+            batch_norm=mt == "dcgan",
+            sigmoid=mt == "dcgan" and sigmoid,
+        )
+        generator.apply(weights_init)
+        discriminator.apply(weights_init)
+        return generator, discriminator
+
     if mt == "dcgan":
         generator = DCGANGenerator(nz=nz, ngf=ngf, nc=nc, img_size=img_size)
-        discriminator = DCGANDiscriminator(ndf=ndf, nc=nc, img_size=img_size)
+        discriminator = DCGANDiscriminator(ndf=ndf, nc=nc, img_size=img_size, sigmoid=sigmoid)
         generator.apply(weights_init)
         discriminator.apply(weights_init)
         return generator, discriminator
@@ -371,7 +564,7 @@ def get_model(model_type, model_config):
             nz=nz, ngf=ngf, nc=nc, img_size=img_size, num_classes=num_classes
         )
         discriminator = ConditionalDCGANDiscriminator(
-            ndf=ndf, nc=nc, img_size=img_size, num_classes=num_classes
+            ndf=ndf, nc=nc, img_size=img_size, num_classes=num_classes, sigmoid=sigmoid
         )
         generator.apply(weights_init)
         discriminator.apply(weights_init)
@@ -390,5 +583,32 @@ def get_model(model_type, model_config):
         )
 
 
+def get_sr_model(model_config):
+    """
+    Factory do upscaler aprendido ('sr'); sem discriminador
+    """
+    model = SRNet(
+        nc=model_config.get("nc", 3),
+        scale=model_config.get("sr_scale", 2),
+        num_feat=model_config.get("sr_features", 32),
+        num_blocks=model_config.get("sr_blocks", 4),
+    )
+    # Última convolução começa perto de zero: saída inicial = upscale bicúbico
+    nn.init.normal_(model.body[-2].weight, 0.0, 1e-3)
+    nn.init.zeros_(model.body[-2].bias)
+    return model
+
+
+def to_channels_last(model):
+    """
+    Converte os pesos das pilhas convolucionais para channels_last (NHWC).
+
+    Em GPUs com Tensor Cores (e com AMP) as convoluções NHWC evitam
+    transposições internas; as entradas devem ser convertidas com
+    tensor.contiguous(memory_format=torch.channels_last).
+    """
+    return model.to(memory_format=torch.channels_last)
+
+
 def count_parameters(model):
     return sum(p.numel() for p in model.parameters() if p.requires_grad)
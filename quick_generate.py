@@ -4,11 +4,12 @@ Script auxiliar para gerar imagens rapidamente
 Encontra automaticamente o último modelo treinado
 """
 
-import glob
 import os
 import subprocess
 import sys
 
+import checkpoint_index
+
 # ====================================================================================
 # Constantes
 # ====================================================================================
@@ -18,19 +19,16 @@ VALID_UPSCALE_OPTIONS = ["2x", "4x", "8x"]  # Opções válidas de upscale
 
 def find_latest_checkpoint():
     """Encontra o checkpoint mais recente"""
-    # Procurar todos os checkpoints
-    checkpoints = glob.glob("outputs/**/checkpoint_latest.pth", recursive=True)
+    # Consultar o índice de checkpoints (ordenado do mais recente)
+    checkpoint = checkpoint_index.find_latest_checkpoint("outputs")
 
-    if not checkpoints:
+    if checkpoint is None:
         print("❌ Nenhum checkpoint encontrado!")
         print("\nVocê precisa treinar um modelo primeiro:")
         print("  python train.py --dataset mnist --model dcgan --epochs 5")
         return None
 
-    # Ordenar por data de modificação (mais recente primeiro)
-    checkpoints.sort(key=os.path.getmtime, reverse=True)
-
-    return checkpoints[0]
+    return checkpoint
 
 
 def main():
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Benchmark: passo do critic do WGAN-GP separado vs fundido
+
+Compara a fase do critic de train_wgan_gp (n_critic passos com otimizador)
+com e sem cada otimização: o passo original (três forwards: real, fake e
+interpolados), o fundido (um forward concatenado, --critic-step fused) e as
+fakes de todos os passos numa só chamada do gerador (--batched-fakes), além
+do gradient penalty preguiçoso (--gp-interval / --gp-subbatch). Antes,
+confere a equivalência numérica do passo fundido (perda e gradientes do
+critic) com o separado.
+
+Uso (a partir da raiz do projeto):
+    python scripts/benchmark_critic_step.py
+    python scripts/benchmark_critic_step.py --img-size 128 --batch-size 32 --device cuda
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+import torch
+import torch.optim as optim
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import get_model  # noqa: E402
+from train import critic_losses, generate_critic_fakes  # noqa: E402
+
+RTOL = 1e-4  # Tolerância relativa da equivalência (ordem de soma das convoluções muda)
+ATOL = 1e-5
+
+
+def _sync(device):
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+
+
+def _critic_grads(critic, real, fake, device, lambda_gp, fused, seed):
+    """errD e gradientes do critic para um passo (alpha sorteado com seed)"""
+    critic = copy.deepcopy(critic)
+    torch.manual_seed(seed)
+    errD, _, _ = critic_losses(critic, real, fake, device, lambda_gp, fused=fused)
+    errD.backward()
+    return errD.detach(), [p.grad.detach().clone() for p in critic.parameters()]
+
+
+def compare_critic_steps(critic, real, fake, device, lambda_gp):
+    """
+    Passo fundido x separado (mesmo alpha): perdas e gradientes do critic
+
+    Returns:
+        (errD separado, errD fundido, máx. diferença nos gradientes, ok)
+    """
+    err_sep, grads_sep = _critic_grads(critic, real, fake, device, lambda_gp, False, 0)
+    err_fus, grads_fus = _critic_grads(critic, real, fake, device, lambda_gp, True, 0)
+
+    grad_diff = max((a - b).abs().max().item() for a, b in zip(grads_sep, grads_fus))
+    ok = torch.allclose(err_sep, err_fus, rtol=RTOL, atol=ATOL) and all(
+        torch.allclose(a, b, rtol=RTOL, atol=ATOL) for a, b in zip(grads_sep, grads_fus)
+    )
+    return err_sep.item(), err_fus.item(), grad_diff, ok
+
+
+def compare_batched_fakes(generator, batch_size, nz, n_critic, device):
+    """
+    Fakes em lote x n_critic chamadas separadas do gerador
+
+    Com o gerador em eval (BatchNorm com estatísticas fixas), o lote único
+    precisa dar exatamente as mesmas fakes.
+
+    Returns:
+        (máx. diferença, ok)
+    """
+    generator.eval()
+    torch.manual_seed(1)
+    batched = torch.cat(generate_critic_fakes(generator, batch_size, nz, n_critic, device))
+    torch.manual_seed(1)
+    noise = torch.randn(n_critic * batch_size, nz, 1, 1, device=device)
+    with torch.no_grad():
+        separate = torch.cat([generator(chunk) for chunk in noise.split(batch_size)])
+    generator.train()
+
+    diff = (batched - separate).abs().max().item()
+    return diff, torch.allclose(batched, separate, rtol=RTOL, atol=ATOL)
+
+
+def check_equivalence(generator, critic, real, nz, n_critic, device, lambda_gp):
+    """Confere passo fundido x separado e fakes em lote x uma a uma; True se ok"""
+    batch_size = real.size(0)
+    with torch.no_grad():
+        fake = generator(torch.randn(batch_size, nz, 1, 1, device=device))
+
+    err_sep, err_fus, grad_diff, steps_ok = compare_critic_steps(
+        critic, real, fake, device, lambda_gp
+    )
+    print(
+        f"{'✓' if steps_ok else '❌'} Passo fundido x separado: "
+        f"errD {err_sep:.6f} x {err_fus:.6f} | "
+        f"máx. diferença nos gradientes {grad_diff:.2e}"
+    )
+
+    fakes_diff, fakes_ok = compare_batched_fakes(generator, batch_size, nz, n_critic, device)
+    print(
+        f"{'✓' if fakes_ok else '❌'} Fakes em lote x uma a uma (G em eval): "
+        f"máx. diferença {fakes_diff:.2e}"
+    )
+
+    return steps_ok and fakes_ok
+
+
+def time_critic_phase(
+    generator,
+    critic,
+    real,
+    nz,
+    n_critic,
+    device,
+    lambda_gp,
+    fused,
+    batched,
+    iterations,
+    gp_interval=1,
+    gp_subbatch=0,
+):
+    """Fases do critic (n_critic passos + Adam) por segundo"""
+    critic = copy.deepcopy(critic)
+    optimizer = optim.Adam(critic.parameters(), lr=1e-4, betas=(0.0, 0.9))
+    batch_size = real.size(0)
+
+    step = 0
+
+    def phase():
+        nonlocal step
+        fakes = None
+        if batched:
+            fakes = generate_critic_fakes(generator, batch_size, nz, n_critic, device)
+        for k in range(n_critic):
+            critic.zero_grad()
+            if fakes is not None:
+                fake = fakes[k]
+            else:
+                with torch.no_grad():
+                    fake = generator(torch.randn(batch_size, nz, 1, 1, device=device))
+            step_lambda_gp = lambda_gp * gp_interval if step % gp_interval == 0 else 0.0
+            errD, _, _ = critic_losses(
+                critic, real, fake, device, step_lambda_gp, fused=fused, gp_subbatch=gp_subbatch
+            )
+            errD.backward()
+            optimizer.step()
+            step += 1
+
+    phase()  # Aquecimento (cuDNN autotune, alocações)
+    _sync(device)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        phase()
+    _sync(device)
+    return iterations / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do passo do critic do WGAN-GP")
+    parser.add_argument("--img-size", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--nc", type=int, default=3)
+    parser.add_argument("--nz", type=int, default=100)
+    parser.add_argument("--ngf", type=int, default=64)
+    parser.add_argument("--ndf", type=int, default=64)
+    parser.add_argument("--n-critic", type=int, default=5)
+    parser.add_argument("--lambda-gp", type=float, default=10.0)
+    parser.add_argument("--gp-interval", type=int, default=4, help="Variante preguiçosa")
+    parser.add_argument(
+        "--gp-subbatch", type=int, default=None, help="Variante com sub-batch (padrão: batch/4)"
+    )
+    parser.add_argument("--iterations", type=int, default=5, help="Fases cronometradas")
+    parser.add_argument("--device", type=str, default=None)
+    args = parser.parse_args()
+
+    if args.device is None:
+        device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    else:
+        device = torch.device(args.device)
+
+    torch.manual_seed(0)
+    generator, critic = get_model(
+        "wgan-gp",
+        {
+            "nz": args.nz,
+            "ngf": args.ngf,
+            "ndf": args.ndf,
+            "nc": args.nc,
+            "img_size": args.img_size,
+        },
+    )
+    generator, critic = generator.to(device), critic.to(device)
+    real = torch.rand(args.batch_size, args.nc, args.img_size, args.img_size, device=device)
+    real = real * 2 - 1
+
+    print(
+        f"\n📐 {args.img_size}px | batch {args.batch_size} | n_critic {args.n_critic} | "
+        f"ngf/ndf {args.ngf}/{args.ndf} | device {device}\n"
+    )
+    equivalent = check_equivalence(
+        generator, critic, real, args.nz, args.n_critic, device, args.lambda_gp
+    )
+
+    gp_subbatch = args.gp_subbatch or max(1, args.batch_size // 4)
+    lazy = f"GP a cada {args.gp_interval}"
+    variants = [
+        # (nome, fused, batched, gp_interval, gp_subbatch)
+        ("separado", False, False, 1, 0),
+        ("separado + fakes em lote", False, True, 1, 0),
+        ("fundido", True, False, 1, 0),
+        ("fundido + fakes em lote", True, True, 1, 0),
+        (lazy, False, False, args.gp_interval, 0),
+        (f"{lazy} + sub-batch {gp_subbatch}", False, False, args.gp_interval, gp_subbatch),
+    ]
+    width = max(len(v[0]) for v in variants)
+    print(f"\n{'Variante':>{width}} | {'fases/s':>8} | {'passos/s':>8} | {'speedup':>7}")
+    print("-" * (width + 34))
+    baseline = None
+    for name, fused, batched, gp_interval, subbatch in variants:
+        rate = time_critic_phase(
+            generator,
+            critic,
+            real,
+            args.nz,
+            args.n_critic,
+            device,
+            args.lambda_gp,
+            fused,
+            batched,
+            args.iterations,
+            gp_interval=gp_interval,
+            gp_subbatch=subbatch,
+        )
+        baseline = baseline or rate
+        print(
+            f"{name:>{width}} | {rate:>8.2f} | {rate * args.n_critic:>8.1f} | "
+            f"{rate / baseline:>6.2f}x"
+        )
+    print()
+
+    if not equivalent:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
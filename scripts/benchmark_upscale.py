@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: upscaling por imagem (PIL) vs em batch (utils.upscale_batch)
+
+Mede imagens/s dos dois caminhos de generate_interactive para batches de
+1, 16 e 256 imagens e a diferença máxima entre eles (em níveis de uint8).
+
+Uso (a partir da raiz do projeto):
+    python scripts/benchmark_upscale.py
+    python scripts/benchmark_upscale.py --img-size 32 --scale 4 --sizes 1 16 256 --device cuda
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_interactive import UPSCALE_CHUNK_SIZE, upscale_image  # noqa: E402
+from utils import upscale_batch  # noqa: E402
+
+
+def _time(fn, repeats):
+    """Melhor tempo (s) de repeats execuções, após um aquecimento"""
+    fn()
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de upscaling PIL vs batch")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 16, 256])
+    parser.add_argument("--img-size", type=int, default=64)
+    parser.add_argument("--nc", type=int, default=3)
+    parser.add_argument("--scale", type=int, default=8)
+    parser.add_argument("--method", type=str, default="lanczos", choices=["lanczos", "bicubic"])
+    parser.add_argument("--sharpen", type=float, default=1.6)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--device", type=str, default=None)
+    args = parser.parse_args()
+
+    if args.device is None:
+        device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    else:
+        device = torch.device(args.device)
+
+    print(
+        f"\n📐 {args.img_size}px → {args.img_size * args.scale}px | {args.method} | "
+        f"sharpen {args.sharpen} | device {device}\n"
+    )
+    print(f"{'N':>5} | {'PIL (img/s)':>12} | {'batch (img/s)':>13} | {'speedup':>7} | {'max diff':>8}")
+    print("-" * 58)
+
+    for n in args.sizes:
+        images = torch.rand(n, args.nc, args.img_size, args.img_size) * 2 - 1
+        images_device = images.to(device)
+
+        def run_pil():
+            return torch.stack(
+                [upscale_image(img, args.scale, args.method, args.sharpen) for img in images]
+            )
+
+        def run_batch():
+            # Como em generate_interactive.main: blocos de UPSCALE_CHUNK_SIZE
+            out = torch.cat(
+                [
+                    upscale_batch(chunk, args.scale, args.method, args.sharpen).cpu()
+                    for chunk in images_device.split(UPSCALE_CHUNK_SIZE)
+                ]
+            )
+            return out
+
+        pil_time = _time(run_pil, args.repeats)
+        batch_time = _time(run_batch, args.repeats)
+
+        # Diferença em níveis de uint8 (o PIL quantiza entre as etapas)
+        reference = ((run_pil() + 1) * 127.5).round()
+        batched = ((run_batch() + 1) * 127.5).round()
+        max_diff = (reference - batched).abs().max().item()
+
+        print(
+            f"{n:>5} | {n / pil_time:>12.1f} | {n / batch_time:>13.1f} | "
+            f"{pil_time / batch_time:>6.1f}x | {max_diff:>8.0f}"
+        )
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Avaliação do upscaler aprendido (train.py --model sr) contra o Lanczos do PIL
+
+Reduz imagens do dataset do upscaler pelo fator dele, amplia de volta pelos
+dois caminhos e compara PSNR (contra o original) e latência: por imagem
+(batch 1, como na GUI) e vazão em batch.
+
+Uso (a partir da raiz do projeto):
+    python scripts/evaluate_sr.py --checkpoint outputs/cifar10/sr_xxx/checkpoints/checkpoint_latest.pth
+    python scripts/evaluate_sr.py --checkpoint ... --num-images 512 --device cuda
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_dataset  # noqa: E402
+from generate_interactive import upscale_image  # noqa: E402
+from train import batch_psnr, make_low_res  # noqa: E402
+from utils import load_generator_checkpoint, load_sr_model, upscale_learned  # noqa: E402
+
+LATENCY_SAMPLES = 32  # Imagens cronometradas uma a uma
+
+
+def _median_ms(fn, inputs):
+    """Mediana (ms) de fn(x) para cada x, após um aquecimento"""
+    fn(inputs[0])
+    times = []
+    for x in inputs:
+        start = time.perf_counter()
+        fn(x)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def _throughput(fn, batch):
+    """Imagens/s de fn sobre o batch inteiro, após um aquecimento"""
+    fn(batch)
+    start = time.perf_counter()
+    fn(batch)
+    return batch.size(0) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PSNR/latência: upscaler aprendido x Lanczos")
+    parser.add_argument("--checkpoint", type=str, required=True, help="Checkpoint do upscaler")
+    parser.add_argument("--dataroot", type=str, default="./data")
+    parser.add_argument("--num-images", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--device", type=str, default="cpu")
+    args = parser.parse_args()
+
+    device = torch.device(args.device)
+    config = load_generator_checkpoint(args.checkpoint)["config"]
+    sr_model = load_sr_model(args.checkpoint, device)
+    scale = sr_model.scale
+    img_size = config["img_size"]
+
+    dataloader, _ = get_dataset(
+        config["dataset"],
+        dataroot=args.dataroot,
+        img_size=img_size,
+        batch_size=args.batch_size,
+        workers=args.workers,
+    )
+
+    def run_pil(low_res):
+        return torch.stack([upscale_image(img, scale, "lanczos", sharpen=1.0) for img in low_res])
+
+    def run_learned(low_res):
+        return upscale_learned(low_res, sr_model, scale).cpu()
+
+    psnr = {"lanczos": 0.0, "learned": 0.0}
+    count = 0
+    low_res_all = []
+    for data in dataloader:
+        high_res = data[0][: args.num_images - count]
+        # Entrada quantizada em uint8 para os dois caminhos (o PIL trabalha em uint8)
+        low_res = ((make_low_res(high_res, scale) + 1) * 127.5).round() / 127.5 - 1
+        n = high_res.size(0)
+        psnr["lanczos"] += batch_psnr(run_pil(low_res), high_res).item() * n
+        psnr["learned"] += batch_psnr(run_learned(low_res), high_res).item() * n
+        low_res_all.append(low_res)
+        count += n
+        if count >= args.num_images:
+            break
+
+    low_res = torch.cat(low_res_all)
+    singles = [x.unsqueeze(0) for x in low_res[:LATENCY_SAMPLES]]
+    batch = low_res[: args.batch_size]
+
+    results = {
+        "lanczos": (
+            _median_ms(run_pil, singles),
+            _throughput(run_pil, batch),
+        ),
+        "learned": (
+            _median_ms(run_learned, singles),
+            _throughput(run_learned, batch),
+        ),
+    }
+
+    print(
+        f"\n📐 {config['dataset']} | {img_size // scale}px → {img_size}px ({scale}x) | "
+        f"{count} imagens | device {device}\n"
+    )
+    print(f"{'Método':>12} | {'PSNR (dB)':>9} | {'ms/img (batch 1)':>16} | {'img/s (batch)':>13}")
+    print("-" * 60)
+    for name, label in (("lanczos", "PIL Lanczos"), ("learned", "Aprendido")):
+        latency, throughput = results[name]
+        print(
+            f"{label:>12} | {psnr[name] / count:>9.2f} | {latency:>16.2f} | {throughput:>13.1f}"
+        )
+    print()
+
+
+if __name__ == "__main__":
+    main()
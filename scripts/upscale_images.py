@@ -17,12 +17,21 @@ Uso:
     # Melhor qualidade (lanczos)
     python upscale_images.py --input generated.png --scale 8 --method lanczos
 
-    # Super-resolução com ESRGAN (requer modelo)
-    python upscale_images.py --input generated.png --method esrgan --scale 4
+    # Super-resolução com ESRGAN (requer basicsr e os pesos baixados localmente)
+    python upscale_images.py --input generated.png --method esrgan --scale 4 \\
+        --esrgan-weights weights/RealESRGAN_x4plus.pth --tile 256
+
+    # Pasta inteira (ou glob) em paralelo, pulando saídas já atualizadas
+    python upscale_images.py --input outputs/mnist/.../generated_individual --scale 4
+    python upscale_images.py --input "outputs/**/*_individual/*.png" --scale 4 --workers 8
 """
 
 import argparse
+import glob
 import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import numpy as np
@@ -66,56 +75,564 @@ def enhance_contrast(image, factor=1.2):
     return enhancer.enhance(factor)
 
 
-def upscale_esrgan(image, scale_factor):
-    """
-    Upscaling com ESRGAN (super-resolução com deep learning)
+# ====================================================================================
+# ESRGAN (engine persistente)
+# ====================================================================================
+
+ESRGAN_NATIVE_SCALE = 4
+ESRGAN_DEFAULT_WEIGHTS = os.environ.get(
+    "ESRGAN_WEIGHTS", os.path.join("weights", "RealESRGAN_x4plus.pth")
+)
+ESRGAN_WEIGHTS_URL = (
+    "https://github.com/xinntao/Real-ESRGAN/releases/download/v0.1.0/RealESRGAN_x4plus.pth"
+)
 
-    Nota: Requer modelo ESRGAN baixado.
-    Para usar: pip install basicsr realesrgan
+
+class ESRGANEngine:
     """
-    try:
+    Super-resolução RRDBNet (Real-ESRGAN x4plus) carregada uma única vez
+
+    Os pesos são lidos de um arquivo local (sem acesso à rede). Imagens
+    grandes são divididas em tiles de tile x tile pixels (com tile_pad de
+    contexto em cada lado, descartado na saída) e os tiles de várias
+    imagens são processados juntos, batch_size por forward.
+
+    Args:
+        weights_path: arquivo .pth do Real-ESRGAN (params_ema/params ou state_dict)
+        device: dispositivo (padrão: cuda se disponível)
+        tile: tamanho do tile em pixels de entrada (0 = imagem inteira)
+        tile_pad: contexto extra em cada lado do tile
+        batch_size: tiles por forward
+        half: usa float16 (somente CUDA)
+    """
+
+    def __init__(
+        self,
+        weights_path=ESRGAN_DEFAULT_WEIGHTS,
+        device=None,
+        tile=256,
+        tile_pad=10,
+        batch_size=8,
+        half=False,
+    ):
+        import torch
         from basicsr.archs.rrdbnet_arch import RRDBNet
-        from realesrgan import RealESRGANer
-    except ImportError:
-        print("❌ ESRGAN não instalado!")
-        print("   Instale com: pip install basicsr realesrgan")
-        print("   Usando bicubic como fallback...")
-        return upscale_bicubic(image, scale_factor)
 
-    try:
-        # Modelo ESRGAN (baixa automaticamente se necessário)
+        if not os.path.isfile(weights_path):
+            raise FileNotFoundError(
+                f"Pesos do ESRGAN não encontrados: {weights_path}\n"
+                f"   Baixe de {ESRGAN_WEIGHTS_URL}\n"
+                f"   e informe --esrgan-weights (ou a variável ESRGAN_WEIGHTS)"
+            )
+
+        if device is None:
+            device = "cuda:0" if torch.cuda.is_available() else "cpu"
+        self.device = torch.device(device)
+        self.tile = tile
+        self.tile_pad = tile_pad
+        self.batch_size = batch_size
+        self.dtype = torch.float16 if half and self.device.type == "cuda" else torch.float32
+
+        state = torch.load(weights_path, map_location="cpu", weights_only=True)
+        state = state.get("params_ema", state.get("params", state))
         model = RRDBNet(
             num_in_ch=3,
             num_out_ch=3,
             num_feat=64,
             num_block=23,
             num_grow_ch=32,
-            scale=4,
+            scale=ESRGAN_NATIVE_SCALE,
         )
+        model.load_state_dict(state, strict=True)
+        self.model = model.eval().to(self.device, self.dtype)
+
+    def _windows(self, size):
+        """
+        Posições (início do tile, início da janela) ao longo de um eixo
+
+        Todos os tiles/janelas têm o mesmo tamanho (para poderem ser
+        empilhados): o último tile é recuado para dentro da imagem e a
+        janela de contexto é deslocada em vez de preenchida nas bordas.
+        """
+        tile = min(self.tile, size)
+        window = min(tile + 2 * self.tile_pad, size)
+        positions = []
+        for start in range(0, size, tile):
+            start = min(start, size - tile)
+            window_start = max(0, min(start - self.tile_pad, size - window))
+            positions.append((start, window_start))
+        return tile, window, positions
+
+    def _geometry(self, height, width):
+        """(tile, janela, posições) nos eixos y e x de uma imagem height x width"""
+        if self.tile <= 0:
+            return (height, height, [(0, 0)]), (width, width, [(0, 0)])
+        return self._windows(height), self._windows(width)
+
+    def _forward_tiles(self, jobs):
+        """
+        Um forward com os tiles de jobs, copiando o centro de cada saída para
+        o array uint8 da imagem correspondente
+
+        Args:
+            jobs: lista de (imagem aberta, (ty, wy), (tx, wx)), todas com
+                janelas do mesmo tamanho
+        """
+        import torch
+
+        scale = ESRGAN_NATIVE_SCALE
+        windows = torch.stack(
+            [
+                image["input"][:, wy : wy + image["win_h"], wx : wx + image["win_w"]]
+                for image, (_, wy), (_, wx) in jobs
+            ]
+        ).to(self.device, self.dtype)
+        with torch.inference_mode():
+            result = self.model(windows).float().clamp_(0, 1).mul_(255).round_().byte()
+        result = result.permute(0, 2, 3, 1).cpu().numpy()
+
+        for out, (image, (ty, wy), (tx, wx)) in zip(result, jobs):
+            tile_h, tile_w = image["tile_h"] * scale, image["tile_w"] * scale
+            oy, ox = (ty - wy) * scale, (tx - wx) * scale
+            image["output"][
+                ty * scale : ty * scale + tile_h, tx * scale : tx * scale + tile_w
+            ] = out[oy : oy + tile_h, ox : ox + tile_w]
+            image["remaining"] -= 1
+
+    def _finished(self, opened, scale_factor):
+        """Gera, em ordem, as imagens abertas cujos tiles já foram todos processados"""
+        while opened and opened[0]["remaining"] == 0:
+            image = opened.popleft()
+            result = Image.fromarray(image["output"])
+            if scale_factor != ESRGAN_NATIVE_SCALE:
+                width, height = image["size"]
+                result = result.resize(
+                    (width * scale_factor, height * scale_factor), Image.LANCZOS
+                )
+            yield result
+
+    def upscale_stream(self, images, scale_factor=ESRGAN_NATIVE_SCALE):
+        """
+        Upscale de um iterável de PIL.Image (RGB), gerando cada saída assim que fica pronta
+
+        Tiles de imagens consecutivas com janelas do mesmo tamanho vão juntos
+        para o modelo (batch_size por forward). Cada imagem é montada em um
+        array uint8 próprio e liberada assim que seu último tile sai do
+        modelo, então no máximo batch_size imagens ficam abertas ao mesmo
+        tempo, independentemente de quantas entradas houver. Para fatores
+        diferentes de 4, a saída x4 é redimensionada com Lanczos.
+
+        Yields:
+            PIL.Image, na mesma ordem da entrada
+        """
+        import torch
+
+        scale = ESRGAN_NATIVE_SCALE
+        opened = deque()
+        jobs = []
+        for image in images:
+            width, height = image.size
+            (tile_h, win_h, ys), (tile_w, win_w, xs) = self._geometry(height, width)
+
+            # Janelas de tamanhos diferentes não podem ser empilhadas
+            if jobs and (jobs[0][0]["win_h"], jobs[0][0]["win_w"]) != (win_h, win_w):
+                self._forward_tiles(jobs)
+                jobs = []
+                yield from self._finished(opened, scale_factor)
+
+            pixels = torch.from_numpy(np.array(image.convert("RGB")))
+            state = {
+                "input": pixels.permute(2, 0, 1).float().div_(255),
+                "output": np.empty((height * scale, width * scale, 3), dtype=np.uint8),
+                "size": (width, height),
+                "tile_h": tile_h,
+                "win_h": win_h,
+                "tile_w": tile_w,
+                "win_w": win_w,
+                "remaining": len(ys) * len(xs),
+            }
+            opened.append(state)
+
+            for y in ys:
+                for x in xs:
+                    jobs.append((state, y, x))
+                    if len(jobs) == self.batch_size:
+                        self._forward_tiles(jobs)
+                        jobs = []
+                        yield from self._finished(opened, scale_factor)
+
+        if jobs:
+            self._forward_tiles(jobs)
+        yield from self._finished(opened, scale_factor)
+
+    def upscale_images(self, images, scale_factor=ESRGAN_NATIVE_SCALE):
+        """
+        Upscale de uma lista de PIL.Image (RGB)
+
+        Returns:
+            lista de PIL.Image, na mesma ordem da entrada
+        """
+        return list(self.upscale_stream(images, scale_factor))
+
+
+_ESRGAN_ENGINES = {}
+
+
+def get_esrgan_engine(**kwargs):
+    """ESRGANEngine compartilhado (um por combinação de argumentos)"""
+    key = tuple(sorted(kwargs.items()))
+    if key not in _ESRGAN_ENGINES:
+        _ESRGAN_ENGINES[key] = ESRGANEngine(**kwargs)
+    return _ESRGAN_ENGINES[key]
+
+
+def upscale_esrgan(image, scale_factor, engine=None):
+    """
+    Upscaling com ESRGAN (super-resolução com deep learning)
 
-        upsampler = RealESRGANer(
-            scale=4,
-            model_path="https://github.com/xinntao/Real-ESRGAN/releases/download/v0.1.0/RealESRGAN_x4plus.pth",
-            model=model,
-            tile=0,
-            tile_pad=10,
-            pre_pad=0,
-            half=False,
-        )
+    Nota: Requer basicsr (pip install basicsr) e os pesos
+    RealESRGAN_x4plus.pth baixados localmente.
+    """
+    if engine is None:
+        try:
+            engine = get_esrgan_engine()
+        except ImportError:
+            print("❌ ESRGAN não instalado!")
+            print("   Instale com: pip install basicsr")
+            print("   Usando bicubic como fallback...")
+            return upscale_bicubic(image, scale_factor)
+        except OSError as e:
+            print(f"⚠️  Erro ao usar ESRGAN: {e}")
+            print("   Usando bicubic como fallback...")
+            return upscale_bicubic(image, scale_factor)
+
+    return engine.upscale_images([image], scale_factor)[0]
+
+
+# ====================================================================================
+# Processamento de um arquivo
+# ====================================================================================
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp")
+UPSCALED_MARKER = "_upscaled_"
+
+
+def upscale_pil_image(image, scale, method, sharpen=None, contrast=None, engine=None):
+    """Aplica upscale e melhorias opcionais a uma PIL.Image (convertida para RGB)"""
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    if method == "bicubic":
+        upscaled = upscale_bicubic(image, scale)
+    elif method == "lanczos":
+        upscaled = upscale_lanczos(image, scale)
+    elif method == "nearest":
+        upscaled = upscale_nearest(image, scale)
+    elif method == "esrgan":
+        upscaled = upscale_esrgan(image, scale, engine)
+    else:
+        upscaled = upscale_bicubic(image, scale)
+
+    return _enhance(upscaled, sharpen, contrast)
+
+
+def _enhance(image, sharpen=None, contrast=None):
+    if sharpen is not None:
+        image = enhance_sharpness(image, sharpen)
+    if contrast is not None:
+        image = enhance_contrast(image, contrast)
+    return image
 
-        # Converter para numpy array
-        img_array = np.array(image)
 
-        # Upscale
-        output, _ = upsampler.enhance(img_array, outscale=scale_factor)
+def default_output_path(input_path, scale):
+    """input.png -> input_upscaled_4x.png"""
+    input_path = Path(input_path)
+    return str(input_path.parent / f"{input_path.stem}{UPSCALED_MARKER}{scale}x{input_path.suffix}")
 
-        # Converter de volta para PIL
-        return Image.fromarray(output)
 
+def is_up_to_date(input_path, output_path, scale):
+    """
+    True se a saída existe, é mais nova que a entrada e tem o tamanho esperado
+
+    O tamanho é lido só do cabeçalho (Image.open não decodifica os pixels).
+    """
+    try:
+        if os.path.getmtime(output_path) < os.path.getmtime(input_path):
+            return False
+        with Image.open(input_path) as src, Image.open(output_path) as dst:
+            return dst.size == (src.size[0] * scale, src.size[1] * scale)
+    except OSError:
+        return False
+
+
+def _upscale_file_task(task):
+    """Executado nos processos do pool: (entrada, saída, opções) -> (entrada, erro)"""
+    input_path, output_path, scale, method, sharpen, contrast = task
+    try:
+        with Image.open(input_path) as image:
+            upscaled = upscale_pil_image(image, scale, method, sharpen, contrast)
+        _save_atomic(upscaled, output_path)
+        return input_path, None
     except Exception as e:
+        return input_path, str(e)
+
+
+def _save_atomic(image, output_path):
+    """
+    Grava em arquivo temporário + os.replace, para nunca deixar uma saída
+    parcial (que pareceria "atualizada" na próxima execução)
+    """
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.tmp{Path(output_path).suffix}"
+    image.save(tmp_path, quality=95)
+    os.replace(tmp_path, output_path)
+
+
+# ====================================================================================
+# Modo diretório / glob
+# ====================================================================================
+
+
+def collect_inputs(pattern, recursive=False):
+    """
+    Arquivos de imagem de um diretório ou padrão glob (ignora saídas *_upscaled_*)
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "**", "*") if recursive else os.path.join(pattern, "*")
+        recursive = True
+    files = [
+        f
+        for f in glob.glob(pattern, recursive=recursive)
+        if f.lower().endswith(IMAGE_EXTENSIONS)
+        and UPSCALED_MARKER not in os.path.basename(f)
+        and os.path.isfile(f)
+    ]
+    return sorted(files)
+
+
+def _glob_root(pattern):
+    """
+    Prefixo de um padrão glob sem curingas ('outputs/**/*.png' -> 'outputs')
+
+    Com --output, os arquivos de um glob são espelhados a partir desse
+    prefixo, para que arquivos homônimos em pastas diferentes não se
+    sobrescrevam.
+    """
+    parts = []
+    for part in Path(pattern).parts:
+        if glob.has_magic(part):
+            break
+        parts.append(part)
+    return os.path.join(*parts) if parts else "."
+
+
+def _batch_output_path(input_path, input_root, output_dir, scale):
+    """Saída no modo diretório: espelha a estrutura em output_dir, ou ao lado da entrada"""
+    if output_dir is None:
+        return default_output_path(input_path, scale)
+    return os.path.join(output_dir, os.path.relpath(input_path, input_root))
+
+
+def upscale_many(
+    inputs,
+    scale,
+    method,
+    sharpen=None,
+    contrast=None,
+    input_root=None,
+    output_dir=None,
+    workers=None,
+    chunk_size=256,
+    force=False,
+    engine=None,
+):
+    """
+    Upscale de muitos arquivos com um pool de processos
+
+    Os arquivos são enviados em blocos de chunk_size (só um bloco de tarefas
+    fica pendente por vez, limitando a memória) e o progresso é impresso
+    conforme cada arquivo termina. Com ESRGAN (engine), os blocos são
+    processados no próprio processo, várias imagens por forward. Com
+    output_dir, os caminhos são espelhados a partir de input_root (padrão:
+    pasta comum a todas as entradas).
+
+    Returns:
+        (processados, pulados, lista de (arquivo, erro))
+    """
+    if output_dir is not None and input_root is None and inputs:
+        input_root = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in inputs])
+
+    tasks = []
+    skipped = 0
+    for input_path in inputs:
+        output_path = _batch_output_path(input_path, input_root, output_dir, scale)
+        if not force and is_up_to_date(input_path, output_path, scale):
+            skipped += 1
+            continue
+        tasks.append((input_path, output_path, scale, method, sharpen, contrast))
+
+    total = len(tasks)
+    if skipped:
+        print(f"   ⏭️  {skipped} arquivo(s) já atualizados (pulados)")
+    if not total:
+        return 0, skipped, []
+
+    if method == "esrgan" and engine is not None:
+        results = _esrgan_results(tasks, engine, chunk_size)
+    else:
+        results = _pool_results(tasks, workers, chunk_size)
+
+    failures = []
+    done = 0
+    start = time.time()
+    for input_path, error in results:
+        done += 1
+        if error is not None:
+            failures.append((input_path, error))
+        rate = done / max(time.time() - start, 1e-6)
+        print(
+            f"\r   [{done}/{total}] {rate:.1f} img/s - {os.path.basename(input_path)}"
+            + " " * 10,
+            end="",
+            flush=True,
+        )
+    print()
+    return done - len(failures), skipped, failures
+
+
+def _pool_results(tasks, workers, chunk_size):
+    """Gera (entrada, erro) conforme os processos do pool terminam"""
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk_start in range(0, len(tasks), chunk_size):
+            chunk = tasks[chunk_start : chunk_start + chunk_size]
+            futures = [pool.submit(_upscale_file_task, task) for task in chunk]
+            for future in as_completed(futures):
+                yield future.result()
+
+
+def _read_images(pending, loaded, failed):
+    """
+    Lê sob demanda as imagens das tarefas em pending
+
+    Cada tarefa sai de pending ao ser lida e vai para loaded (imagem
+    entregue ao engine) ou para failed (erro de leitura).
+    """
+    while pending:
+        task = pending.popleft()
+        try:
+            with Image.open(task[0]) as image:
+                rgb = image.convert("RGB")
+        except OSError as e:
+            failed.append((task[0], str(e)))
+            continue
+        loaded.append(task)
+        yield rgb
+
+
+def _esrgan_results(tasks, engine, chunk_size):
+    """
+    Gera (entrada, erro) passando blocos de imagens pelo engine ESRGAN
+
+    As imagens são lidas sob demanda e cada saída é gravada assim que o
+    engine a devolve; um erro do engine marca como falha só o que restava
+    do bloco.
+    """
+    for chunk_start in range(0, len(tasks), chunk_size):
+        pending = deque(tasks[chunk_start : chunk_start + chunk_size])
+        loaded, failed = deque(), deque()
+        scale = pending[0][2]
+
+        try:
+            for image in engine.upscale_stream(_read_images(pending, loaded, failed), scale):
+                while failed:
+                    yield failed.popleft()
+                input_path, output_path, _, _, sharpen, contrast = loaded.popleft()
+                try:
+                    _save_atomic(_enhance(image, sharpen, contrast), output_path)
+                    yield input_path, None
+                except Exception as e:
+                    yield input_path, str(e)
+        except Exception as e:
+            for task in list(loaded) + list(pending):
+                yield task[0], str(e)
+
+        while failed:
+            yield failed.popleft()
+
+
+def run_batch_mode(args):
+    """--input é diretório ou glob"""
+    inputs = collect_inputs(args.input, args.recursive)
+    if not inputs:
+        raise FileNotFoundError(f"Nenhuma imagem encontrada em: {args.input}")
+
+    output_dir = args.output
+    if os.path.isdir(args.input):
+        input_root = args.input
+        if output_dir is None:
+            output_dir = os.path.normpath(input_root) + f"{UPSCALED_MARKER}{args.scale}x"
+    else:
+        input_root = _glob_root(args.input)
+
+    engine = None
+    if args.method == "esrgan":
+        engine = _load_esrgan_engine(args)
+        if engine is None:
+            args.method = "bicubic"
+
+    print(f"\n🖼️  {len(inputs)} imagem(ns) em: {args.input}")
+    if engine is not None:
+        print(f"🚀 Upscale {args.scale}x usando esrgan ({engine.device}, tile {args.tile})")
+    else:
+        print(
+            f"🚀 Upscale {args.scale}x usando {args.method} "
+            f"({args.workers or os.cpu_count()} processos)"
+        )
+    if output_dir:
+        print(f"📁 Saída: {output_dir}")
+
+    start = time.time()
+    processed, skipped, failures = upscale_many(
+        inputs,
+        args.scale,
+        args.method,
+        sharpen=args.sharpen,
+        contrast=args.contrast,
+        input_root=input_root,
+        output_dir=output_dir,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        force=args.force,
+        engine=engine,
+    )
+
+    print(f"\n✅ Concluído em {time.time() - start:.1f}s!")
+    print(f"   Processadas: {processed} | Puladas: {skipped} | Falhas: {len(failures)}")
+    for input_path, error in failures[:10]:
+        print(f"   ❌ {input_path}: {error}")
+    if len(failures) > 10:
+        print(f"   ... e mais {len(failures) - 10}")
+    print()
+
+
+def _load_esrgan_engine(args):
+    """ESRGANEngine com as opções da linha de comando (None se indisponível)"""
+    try:
+        return get_esrgan_engine(
+            weights_path=args.esrgan_weights,
+            device=args.device,
+            tile=args.tile,
+            tile_pad=args.tile_pad,
+            batch_size=args.tile_batch,
+            half=args.half,
+        )
+    except ImportError:
+        print("❌ ESRGAN não instalado!")
+        print("   Instale com: pip install basicsr")
+    except OSError as e:
         print(f"⚠️  Erro ao usar ESRGAN: {e}")
-        print("   Usando bicubic como fallback...")
-        return upscale_bicubic(image, scale_factor)
+    print("   Usando bicubic como fallback...")
+    return None
 
 
 def main():
@@ -148,14 +665,20 @@ Recomendações:
     )
 
     parser.add_argument(
-        "--input", "-i", type=str, required=True, help="Caminho da imagem de entrada"
+        "--input",
+        "-i",
+        type=str,
+        required=True,
+        help="Imagem de entrada, diretório ou padrão glob (ex: 'outputs/**/*.png')",
     )
     parser.add_argument(
         "--output",
         "-o",
         type=str,
         default=None,
-        help="Caminho da imagem de saída (padrão: input_upscaled_NNx.png)",
+        help="Imagem de saída (padrão: input_upscaled_NNx.png). Em modo diretório: "
+        "pasta de saída (padrão: <pasta>_upscaled_NNx; com glob, ao lado de cada arquivo, "
+        "ou espelhando as subpastas a partir do prefixo sem curingas)",
     )
     parser.add_argument(
         "--scale",
@@ -184,9 +707,72 @@ Recomendações:
         default=None,
         help="Fator de contraste (1.0-1.5, padrão: desabilitado)",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Processos no modo diretório/glob (padrão: número de CPUs)",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=256,
+        help="Arquivos enviados ao pool por vez no modo diretório (padrão: 256)",
+    )
+    parser.add_argument(
+        "--recursive",
+        action="store_true",
+        help="Inclui subpastas quando --input é um diretório",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Refaz saídas mesmo se já estiverem atualizadas",
+    )
+    parser.add_argument(
+        "--esrgan-weights",
+        type=str,
+        default=ESRGAN_DEFAULT_WEIGHTS,
+        help="Pesos locais do Real-ESRGAN x4plus (padrão: $ESRGAN_WEIGHTS ou "
+        "weights/RealESRGAN_x4plus.pth)",
+    )
+    parser.add_argument(
+        "--tile",
+        type=int,
+        default=256,
+        help="ESRGAN: tamanho do tile em pixels (0 = imagem inteira, padrão: 256)",
+    )
+    parser.add_argument(
+        "--tile-pad",
+        type=int,
+        default=10,
+        help="ESRGAN: contexto extra em cada lado do tile (padrão: 10)",
+    )
+    parser.add_argument(
+        "--tile-batch",
+        type=int,
+        default=8,
+        help="ESRGAN: tiles processados por forward (padrão: 8)",
+    )
+    parser.add_argument(
+        "--device",
+        type=str,
+        default=None,
+        help="ESRGAN: dispositivo (padrão: cuda se disponível, senão cpu)",
+    )
+    parser.add_argument(
+        "--half",
+        action="store_true",
+        help="ESRGAN: usa float16 (somente CUDA)",
+    )
 
     args = parser.parse_args()
 
+    # Diretório ou glob: processamento em lote
+    if os.path.isdir(args.input) or glob.has_magic(args.input):
+        run_batch_mode(args)
+        return
+
     # Verificar se arquivo existe
     if not os.path.exists(args.input):
         raise FileNotFoundError(f"Arquivo não encontrado: {args.input}")
@@ -215,7 +801,12 @@ Recomendações:
     elif args.method == "nearest":
         upscaled = upscale_nearest(image, args.scale)
     elif args.method == "esrgan":
-        upscaled = upscale_esrgan(image, args.scale)
+        engine = _load_esrgan_engine(args)
+        upscaled = (
+            upscale_esrgan(image, args.scale, engine)
+            if engine is not None
+            else upscale_bicubic(image, args.scale)
+        )
     else:
         upscaled = upscale_bicubic(image, args.scale)
 
@@ -233,10 +824,7 @@ Recomendações:
 
     # Determinar caminho de saída
     if args.output is None:
-        input_path = Path(args.input)
-        stem = input_path.stem
-        suffix = input_path.suffix
-        args.output = str(input_path.parent / f"{stem}_upscaled_{args.scale}x{suffix}")
+        args.output = default_output_path(args.input, args.scale)
 
     # Salvar
     print(f"\n💾 Salvando em: {args.output}")
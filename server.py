@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP persistente para geração de imagens
+
+Mantém o gerador carregado e agrupa requisições concorrentes num único
+forward: a primeira requisição abre uma janela de até --max-wait-ms e tudo
+que chegar nesse intervalo (até --max-batch-size imagens) é gerado junto.
+Cada resposta informa a latência de fila e de computação.
+
+Uso:
+    python server.py --checkpoint outputs/mnist/dcgan_cond_xxx/checkpoints/checkpoint_latest.pth
+    curl "http://localhost:8000/generate?prompt=sete&count=4&format=png" -o out.png
+    curl -X POST http://localhost:8000/generate -H "Content-Type: application/json" \\
+         -d '{"class": "cat", "seed": 42, "count": 2, "upscale": 2}'
+
+Endpoints:
+    GET  /health    - informações do modelo e da fila
+    GET  /generate  - parâmetros na query string
+    POST /generate  - parâmetros em JSON
+
+Parâmetros de /generate:
+    prompt   texto (define a classe em modelos condicionais e a seed padrão)
+    class    nome da classe (tem prioridade sobre o prompt)
+    seed     seed base; a imagem k usa seed + k (padrão: derivada do prompt)
+    count    número de imagens (padrão: 1)
+    upscale  fator 1, 2, 4 ou 8 (Lanczos)
+    format   json (PNGs em base64) ou png (grid único)
+"""
+
+import argparse
+import base64
+import io
+import math
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+from flask import Flask, Response, jsonify, request
+from PIL import Image
+
+from config import DATASET_CONFIGS
+from utils import (
+    build_generator_from_checkpoint,
+    class_index_from_prompt,
+    get_img_size_from_checkpoint,
+    get_num_classes_from_checkpoint,
+    is_conditional_checkpoint,
+    load_generator_checkpoint,
+    prompt_to_seed,
+    seeded_noise,
+    to_uint8_nhwc,
+)
+
+# ====================================================================================
+# Constantes
+# ====================================================================================
+
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 10.0
+MAX_COUNT_PER_REQUEST = 256
+VALID_UPSCALE_FACTORS = (1, 2, 4, 8)
+
+
+# ====================================================================================
+# Serviço de geração com batching dinâmico
+# ====================================================================================
+
+
+class GenerationRequest:
+    """Uma requisição pendente: seeds/labels de entrada e o Future do resultado"""
+
+    def __init__(self, seed, count, label=None):
+        self.seed = seed
+        self.count = count
+        self.label = label
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class GeneratorService:
+    """
+    Gerador residente com fila de requisições e agrupamento dinâmico
+
+    Uma única thread executa os forwards; submit() pode ser chamado de
+    qualquer thread e devolve um Future com (imagens uint8 NHWC, timing).
+    """
+
+    def __init__(
+        self,
+        checkpoint_path,
+        device,
+        max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms=DEFAULT_MAX_WAIT_MS,
+    ):
+        self.device = device
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        checkpoint = load_generator_checkpoint(checkpoint_path, device)
+        self.config = checkpoint.get("config", {})
+        self.dataset_name = self.config.get("dataset", "unknown")
+        self.nz = self.config.get("nz", 100)
+        self.img_size = get_img_size_from_checkpoint(checkpoint)
+        self.is_conditional = is_conditional_checkpoint(checkpoint)
+        self.num_classes = (
+            get_num_classes_from_checkpoint(checkpoint, DATASET_CONFIGS)
+            if self.is_conditional
+            else None
+        )
+        self.classes = DATASET_CONFIGS.get(self.dataset_name, {}).get("classes", [])
+        self.generator = build_generator_from_checkpoint(
+            checkpoint, device, DATASET_CONFIGS
+        )
+
+        self.stats = {"requests": 0, "images": 0, "batches": 0}
+        self._queue = queue.Queue()
+        self._held = None  # Requisição que estouraria o lote anterior (abre o próximo)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, seed, count, label=None):
+        """Enfileira count imagens (seeds seed..seed+count-1) e retorna um Future"""
+        req = GenerationRequest(seed, count, label)
+        self._queue.put(req)
+        return req.future
+
+    def _collect_batch(self):
+        """
+        Bloqueia pela primeira requisição e agrupa as que chegarem na janela
+
+        O lote nunca passa de max_batch_size imagens: a requisição que o
+        estouraria fica retida e abre o lote seguinte. Só uma requisição
+        maior que max_batch_size sozinha forma um lote acima do limite.
+        """
+        if self._held is not None:
+            batch, self._held = [self._held], None
+        else:
+            batch = [self._queue.get()]
+        total = batch[0].count
+        deadline = time.perf_counter() + self.max_wait
+
+        while total < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                req = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if total + req.count > self.max_batch_size:
+                self._held = req
+                break
+            batch.append(req)
+            total += req.count
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            started = time.perf_counter()
+            try:
+                images = self._forward(batch)
+            except Exception as e:  # Propaga o erro para todas as requisições do lote
+                for req in batch:
+                    req.future.set_exception(e)
+                continue
+            finished = time.perf_counter()
+
+            total = sum(req.count for req in batch)
+            self.stats["requests"] += len(batch)
+            self.stats["images"] += total
+            self.stats["batches"] += 1
+
+            offset = 0
+            for req in batch:
+                timing = {
+                    "queue_ms": (started - req.enqueued_at) * 1000,
+                    "compute_ms": (finished - started) * 1000,
+                    "batch_images": total,
+                    "batch_requests": len(batch),
+                }
+                req.future.set_result((images[offset : offset + req.count], timing))
+                offset += req.count
+
+    def _forward(self, batch):
+        """Um único forward para todas as requisições do lote"""
+        noise = torch.cat(
+            [
+                seeded_noise(range(req.count), req.seed, self.nz, self.device)
+                for req in batch
+            ]
+        )
+        with torch.inference_mode():
+            if self.is_conditional:
+                labels = torch.tensor(
+                    [req.label for req in batch for _ in range(req.count)],
+                    dtype=torch.long,
+                    device=self.device,
+                )
+                fake = self.generator(noise, labels)
+            else:
+                fake = self.generator(noise)
+            return to_uint8_nhwc(fake)
+
+    def resolve_label(self, class_name, prompt):
+        """Índice de classe para modelos condicionais (classe > prompt > aleatório)"""
+        if not self.is_conditional:
+            return None
+        if class_name:
+            if class_name not in self.classes:
+                raise ValueError(f"classe '{class_name}' não existe em {self.classes}")
+            return self.classes.index(class_name)
+        idx = class_index_from_prompt(prompt, self.dataset_name, DATASET_CONFIGS)
+        if idx is None:
+            idx = random.randrange(self.num_classes)
+        return idx
+
+
+# ====================================================================================
+# Conversão de saída
+# ====================================================================================
+
+
+def _to_pil(image, upscale=1):
+    """Array uint8 (H, W, C) -> PIL.Image, opcionalmente ampliado (Lanczos)"""
+    img = Image.fromarray(image[:, :, 0] if image.shape[2] == 1 else image)
+    if upscale > 1:
+        img = img.resize((img.width * upscale, img.height * upscale), Image.LANCZOS)
+    return img
+
+
+def _png_bytes(img):
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _make_grid(images):
+    """Monta um grid quadrado a partir de uma lista de PIL.Image do mesmo tamanho"""
+    nrow = math.ceil(math.sqrt(len(images)))
+    ncol = math.ceil(len(images) / nrow)
+    w, h = images[0].size
+    grid = Image.new(images[0].mode, (nrow * w, ncol * h))
+    for i, img in enumerate(images):
+        grid.paste(img, ((i % nrow) * w, (i // nrow) * h))
+    return grid
+
+
+# ====================================================================================
+# Aplicação HTTP
+# ====================================================================================
+
+
+def create_app(service):
+    app = Flask(__name__)
+
+    @app.route("/health", methods=["GET"])
+    def health():
+        return jsonify(
+            {
+                "dataset": service.dataset_name,
+                "model": service.config.get("model"),
+                "img_size": service.img_size,
+                "conditional": service.is_conditional,
+                "classes": service.classes,
+                "device": str(service.device),
+                "queue_size": service._queue.qsize(),
+                "stats": service.stats,
+            }
+        )
+
+    @app.route("/generate", methods=["GET", "POST"])
+    def generate():
+        received = time.perf_counter()
+        params = request.get_json(silent=True) or {}
+        params = {**request.args.to_dict(), **params}
+
+        try:
+            prompt = str(params.get("prompt", ""))
+            count = int(params.get("count", 1))
+            upscale = int(str(params.get("upscale", 1)).rstrip("x"))
+            output_format = params.get("format", "json")
+            if not 1 <= count <= MAX_COUNT_PER_REQUEST:
+                raise ValueError(f"count deve estar entre 1 e {MAX_COUNT_PER_REQUEST}")
+            if upscale not in VALID_UPSCALE_FACTORS:
+                raise ValueError(f"upscale deve ser um de {VALID_UPSCALE_FACTORS}")
+            if output_format not in ("json", "png"):
+                raise ValueError("format deve ser 'json' ou 'png'")
+
+            label = service.resolve_label(params.get("class"), prompt)
+            if params.get("seed") is not None:
+                seed = int(params["seed"])
+            elif prompt:
+                selected = service.classes[label] if label is not None else None
+                seed = prompt_to_seed(prompt, service.dataset_name, selected)
+            else:
+                seed = random.randrange(2**31)
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+
+        images, timing = service.submit(seed, count, label).result()
+        pil_images = [_to_pil(image, upscale) for image in images]
+        timing["total_ms"] = (time.perf_counter() - received) * 1000
+
+        if output_format == "png":
+            img = pil_images[0] if count == 1 else _make_grid(pil_images)
+            response = Response(_png_bytes(img), mimetype="image/png")
+            response.headers["X-Seed"] = str(seed)
+            for key, value in timing.items():
+                response.headers[f"X-{key.replace('_', '-').title()}"] = (
+                    f"{value:.2f}" if isinstance(value, float) else str(value)
+                )
+            return response
+
+        return jsonify(
+            {
+                "seed": seed,
+                "seeds": [seed + k for k in range(count)],
+                "class": service.classes[label] if label is not None else None,
+                "images": [
+                    base64.b64encode(_png_bytes(img)).decode("ascii") for img in pil_images
+                ],
+                "timing": timing,
+            }
+        )
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP de geração de imagens")
+
+    parser.add_argument("--checkpoint", type=str, required=True)
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--device", type=str, default=None)
+    parser.add_argument(
+        "--max-batch-size",
+        type=int,
+        default=DEFAULT_MAX_BATCH_SIZE,
+        help="Máximo de imagens por forward (padrão: 64)",
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=DEFAULT_MAX_WAIT_MS,
+        help="Janela para agrupar requisições (padrão: 10 ms)",
+    )
+
+    args = parser.parse_args()
+
+    if args.device is None:
+        device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    else:
+        device = torch.device(args.device)
+
+    print(f"\n🤖 Carregando modelo de: {args.checkpoint}")
+    service = GeneratorService(
+        args.checkpoint,
+        device,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+    )
+    print(
+        f"✓ {service.config.get('model', '?')} / {service.dataset_name} em {device} "
+        f"(batch até {args.max_batch_size}, janela {args.max_wait_ms:.0f} ms)"
+    )
+    print(f"🌐 Servindo em http://{args.host}:{args.port}\n")
+
+    app = create_app(service)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
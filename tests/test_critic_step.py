@@ -0,0 +1,57 @@
+"""
+Equivalência numérica das otimizações do passo do critic do WGAN-GP
+
+Passo fundido (--critic-step fused) x separado e fakes em lote
+(--batched-fakes) x uma chamada do gerador por passo, com modelos mínimos
+e as mesmas tolerâncias de scripts/benchmark_critic_step.py.
+
+Uso (a partir da raiz do projeto):
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+import torch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "scripts"))
+sys.path.insert(0, ROOT)
+
+from benchmark_critic_step import compare_batched_fakes, compare_critic_steps  # noqa: E402
+from models import get_model  # noqa: E402
+
+IMG_SIZE = 16
+BATCH_SIZE = 4
+NZ = 8
+N_CRITIC = 3
+LAMBDA_GP = 10.0
+DEVICE = torch.device("cpu")
+
+
+@pytest.fixture
+def models():
+    torch.manual_seed(0)
+    generator, critic = get_model(
+        "wgan-gp", {"nz": NZ, "ngf": 8, "ndf": 8, "nc": 3, "img_size": IMG_SIZE}
+    )
+    return generator, critic
+
+
+def test_fused_critic_step_matches_separate(models):
+    generator, critic = models
+    real = torch.rand(BATCH_SIZE, 3, IMG_SIZE, IMG_SIZE) * 2 - 1
+    with torch.no_grad():
+        fake = generator(torch.randn(BATCH_SIZE, NZ, 1, 1))
+
+    err_sep, err_fus, grad_diff, ok = compare_critic_steps(
+        critic, real, fake, DEVICE, LAMBDA_GP
+    )
+    assert ok, f"errD {err_sep} x {err_fus}, máx. diferença nos gradientes {grad_diff:.2e}"
+
+
+def test_batched_fakes_match_separate_calls(models):
+    generator, _ = models
+    diff, ok = compare_batched_fakes(generator, BATCH_SIZE, NZ, N_CRITIC, DEVICE)
+    assert ok, f"máx. diferença {diff:.2e}"
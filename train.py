@@ -7,18 +7,24 @@ Uso:
     python train.py --dataset cifar10 --model dcgan --epochs 50
     python train.py --dataset fashion-mnist --model wgan-gp --epochs 100
     python train.py --dataset mnist --model dcgan-cond --epochs 50
+    python train.py --dataset cifar10 --model sr --sr-scale 2 --epochs 20  # upscaler
     python train.py --list-datasets  # Lista datasets disponíveis
     python train.py --list-models    # Lista modelos disponíveis
 """
 
 import argparse
+import copy
 import os
 import time
 
+import numpy as np
 import torch
+import torch.distributed as dist
 import torch.nn as nn
+import torch.nn.functional as F
 import torch.optim as optim
 from torch.autograd import grad
+from torch.nn.parallel import DistributedDataParallel
 import torchvision.utils as vutils
 
 # ====================================================================================
@@ -26,8 +32,10 @@ import torchvision.utils as vutils
 # ====================================================================================
 
 MIN_RESOLUTION = 128  # Resolução mínima suportada
+CRITIC_STEPS = ("fused", "separate")  # Passo do critic do WGAN-GP (--critic-step)
 
 from config import (
+    DevicePrefetcher,
     get_dataset,
     get_dataset_info,
     get_model_config,
@@ -36,26 +44,680 @@ from config import (
     DATASET_CONFIGS,   # << usado para saber num_classes por dataset
 )
 
-from models import get_model
+from models import count_parameters, get_model, get_sr_model, to_channels_last
 from utils import (
+    LOG_INTERVAL,
+    LOSS_HISTORY_DIRNAME,
+    CapturedStep,
+    CheckpointWriter,
+    GracefulInterrupt,
+    MetricsAccumulator,
     TrainingLogger,
+    broadcast_object,
+    cleanup_distributed,
+    compile_model,
     create_output_dir,
+    enable_compile_cache,
     estimate_remaining_time,
     format_time,
     generate_samples,
     get_device,
+    init_distributed,
+    interrupt_requested,
+    is_main_process,
+    load_checkpoint,
     plot_losses,
     print_model_summary,
-    save_checkpoint,
     save_config,
+    unwrap_model,
+    upscale_batch,
 )
 
+# ====================================================================================
+# Precisão mista (AMP) e formato de memória
+# ====================================================================================
+
+AMP_MODES = ("off", "fp16", "bf16")
+SPEED_BENCHMARK_STEPS = 10  # Passos cronometrados na comparação fp32 x AMP
+
+
+def _get_amp_settings(amp_mode, device):
+    """
+    Resolve o modo --amp para o device atual
+
+    Returns:
+        (autocast_dtype, use_grad_scaler) - autocast_dtype None = AMP desligado
+    """
+    if amp_mode == "off":
+        return None, False
+
+    if amp_mode == "fp16" and device.type != "cuda":
+        # Autocast fp16 em CPU não é suportado de forma útil; bf16 é
+        print("⚠️  --amp fp16 requer CUDA; usando bf16 na CPU")
+        amp_mode = "bf16"
+
+    if amp_mode == "bf16":
+        return torch.bfloat16, False
+
+    # fp16 precisa de GradScaler para evitar underflow dos gradientes
+    return torch.float16, True
+
+
+def _make_grad_scaler(enabled):
+    """GradScaler compatível com torch 2.0+ (no-op quando desabilitado)"""
+    if hasattr(torch.amp, "GradScaler"):
+        return torch.amp.GradScaler("cuda", enabled=enabled)
+    return torch.cuda.amp.GradScaler(enabled=enabled)
+
+
+def _autocast(device, autocast_dtype):
+    """
+    Contexto de autocast (desabilitado quando autocast_dtype é None)
+
+    Durante a captura de um CUDA graph (--captured-step) o cache de pesos
+    convertidos do autocast fica desligado, como exige a captura.
+    """
+    capturing = (
+        autocast_dtype is not None
+        and device.type == "cuda"
+        and torch.cuda.is_current_stream_capturing()
+    )
+    return torch.autocast(
+        device_type=device.type,
+        dtype=autocast_dtype,
+        enabled=autocast_dtype is not None,
+        cache_enabled=not capturing,
+    )
+
+
+def _measure_throughput(
+    generator, discriminator, config, device, autocast_dtype, channels_last
+):
+    """
+    Mede imagens/s de um passo forward+backward (G e D) em cópias dos modelos
+
+    Usa dados sintéticos e fork_rng, então não altera pesos nem o estado
+    aleatório do treino real.
+    """
+    batch_size = config["batch_size"]
+    memory_format = torch.channels_last if channels_last else torch.contiguous_format
+
+    gen = copy.deepcopy(unwrap_model(generator)).to(memory_format=memory_format)
+    disc = copy.deepcopy(unwrap_model(discriminator)).to(memory_format=memory_format)
+
+    cuda_devices = [device.index or 0] if device.type == "cuda" else []
+    with torch.random.fork_rng(devices=cuda_devices):
+        real = torch.randn(
+            batch_size, config["nc"], config["img_size"], config["img_size"], device=device
+        ).contiguous(memory_format=memory_format)
+        noise = torch.randn(batch_size, config["nz"], 1, 1, device=device)
+
+        cond = ()
+        if config.get("is_conditional", False):
+            cond = (torch.randint(0, config["num_classes"], (batch_size,), device=device),)
+
+        def step():
+            with _autocast(device, autocast_dtype):
+                fake = gen(noise, *cond)
+                loss = disc(real, *cond).float().mean() - disc(fake, *cond).float().mean()
+            loss.backward()
+
+        for _ in range(2):  # Aquecimento (cuDNN autotune, alocações)
+            step()
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+
+        start = time.time()
+        for _ in range(SPEED_BENCHMARK_STEPS):
+            step()
+        if device.type == "cuda":
+            torch.cuda.synchronize(device)
+        elapsed = time.time() - start
+
+    return SPEED_BENCHMARK_STEPS * batch_size / elapsed
+
+
+def _log_precision_speedup(logger, generator, discriminator, config, device, autocast_dtype):
+    """Registra no log o ganho de AMP/channels_last em relação a fp32 NCHW"""
+    channels_last = config.get("channels_last", False)
+    if autocast_dtype is None and not channels_last:
+        return
+    if dist.is_initialized():
+        return  # A medição é de um processo isolado; em DDP não representa o treino
+
+    baseline = _measure_throughput(generator, discriminator, config, device, None, False)
+    optimized = _measure_throughput(
+        generator, discriminator, config, device, autocast_dtype, channels_last
+    )
+
+    logger.log(
+        f"Precisão: amp={config.get('amp', 'off')} channels_last={channels_last} | "
+        f"fp32: {baseline:.1f} img/s -> otimizado: {optimized:.1f} img/s "
+        f"(speedup {optimized / baseline:.2f}x)"
+    )
+
+
+# ====================================================================================
+# torch.compile
+# ====================================================================================
+
+COMPILE_MODES = ("default", "reduce-overhead", "max-autotune")
+
+
+def _compile_training_models(generator, discriminator, config, device, mode="default"):
+    """
+    Compila gerador e discriminador (--compile) nos shapes do treino
+
+    O crítico do WGAN-GP continua em modo eager: o gradient penalty precisa
+    de double backward, que o torch.compile não suporta.
+
+    Returns:
+        (generator, discriminator)
+    """
+    enable_compile_cache()
+    mode = None if mode == "default" else mode
+    autocast_dtype, _ = _get_amp_settings(config.get("amp", "off"), device)
+    memory_format = (
+        torch.channels_last if config.get("channels_last", False) else torch.contiguous_format
+    )
+    batch_size = config["batch_size"]
+    img_size = config["img_size"]
+
+    if config["model"] == "sr":
+        low_size = img_size // config["sr_scale"]
+        low_res = torch.randn(
+            batch_size, config["nc"], low_size, low_size, device=device
+        ).contiguous(memory_format=memory_format)
+        generator = compile_model(
+            generator,
+            (low_res,),
+            train=True,
+            mode=mode,
+            autocast_dtype=autocast_dtype,
+            name="upscaler",
+        )
+        return generator, discriminator
+
+    cond = ()
+    if config.get("is_conditional", False):
+        cond = (torch.randint(0, config["num_classes"], (batch_size,), device=device),)
+    noise = torch.randn(batch_size, config["nz"], 1, 1, device=device)
+    images = torch.randn(
+        batch_size, config["nc"], img_size, img_size, device=device
+    ).contiguous(memory_format=memory_format)
+
+    generator = compile_model(
+        generator,
+        (noise, *cond),
+        train=True,
+        mode=mode,
+        autocast_dtype=autocast_dtype,
+        name="gerador",
+    )
+    if config["model"] == "wgan-gp":
+        print("ℹ️  torch.compile: crítico do WGAN-GP mantido em modo eager (gradient penalty)")
+    else:
+        discriminator = compile_model(
+            discriminator,
+            (images, *cond),
+            train=True,
+            mode=mode,
+            autocast_dtype=autocast_dtype,
+            name="discriminador",
+        )
+    return generator, discriminator
+
+
+# ====================================================================================
+# Passo capturado (--captured-step)
+# ====================================================================================
+
+
+def _use_cuda_graphs(config, device, use_scaler):
+    """
+    Se o --captured-step pode capturar CUDA graphs
+
+    Sem CUDA, com GradScaler (--amp fp16: o passo do scaler sincroniza com a
+    CPU) ou com DDP/DataParallel, o passo fica só com os buffers estáticos
+    pré-alocados, sem captura.
+    """
+    if not config.get("captured_step", False) or device.type != "cuda":
+        return False
+    if use_scaler:
+        print("⚠️  --captured-step: CUDA graphs não suportam --amp fp16; seguindo sem captura")
+        return False
+    if config.get("world_size", 1) > 1 or config.get("ngpu", 1) > 1:
+        print("⚠️  --captured-step: CUDA graphs não suportam multi-GPU; seguindo sem captura")
+        return False
+    return True
+
+
+# ====================================================================================
+# Treino distribuído (DDP) e multi-GPU
+# ====================================================================================
+
+DDP_BACKENDS = ("nccl", "gloo")
+
+
+def _wrap_parallel(model, device, world_size, ngpu, sync_bn=False, find_unused_parameters=False):
+    """
+    Envolve o modelo para treinar em vários devices
+
+    Com world_size > 1 (lançado via torchrun) usa DistributedDataParallel:
+    cada processo treina na sua fatia do dataset e os gradientes são
+    sincronizados no backward. sync_bn troca as BatchNorm por SyncBatchNorm
+    (estatísticas sobre o batch global; só CUDA). find_unused_parameters é
+    necessário no crescimento progressivo (camadas fora da resolução atual
+    não recebem gradiente). Num único processo com ngpu > 1, usa
+    nn.DataParallel.
+    """
+    if world_size > 1:
+        if sync_bn:
+            model = nn.SyncBatchNorm.convert_sync_batchnorm(model)
+        device_ids = [device.index] if device.type == "cuda" else None
+        return DistributedDataParallel(
+            model, device_ids=device_ids, find_unused_parameters=find_unused_parameters
+        )
+    if ngpu > 1 and device.type == "cuda":
+        return nn.DataParallel(model, device_ids=list(range(ngpu)))
+    return model
+
+
+def _revert_sync_batchnorm(module):
+    """Troca (no lugar) SyncBatchNorm por BatchNorm2d com os mesmos pesos/estatísticas"""
+    if isinstance(module, nn.SyncBatchNorm):
+        reverted = nn.BatchNorm2d(
+            module.num_features,
+            module.eps,
+            module.momentum,
+            module.affine,
+            module.track_running_stats,
+            device=module.running_mean.device,
+        )
+        reverted.load_state_dict(module.state_dict())
+        return reverted
+    for name, child in module.named_children():
+        module.add_module(name, _revert_sync_batchnorm(child))
+    return module
+
+
+def _sampling_model(model):
+    """
+    Modelo para gerar amostras apenas no rank 0
+
+    Sem o wrapper DDP (o forward dele comunica com os outros processos) e,
+    com SyncBatchNorm, uma cópia com BatchNorm comum pelo mesmo motivo.
+    """
+    model = unwrap_model(model)
+    if not any(isinstance(m, nn.SyncBatchNorm) for m in model.modules()):
+        return model
+    return _revert_sync_batchnorm(copy.deepcopy(model))
+
+
+# ====================================================================================
+# Crescimento progressivo
+# ====================================================================================
+
+PROGRESSIVE_START_SIZES = (8, 16, 32, 64)
+
+
+class ProgressiveSchedule:
+    """
+    Resolução e alpha (fade-in) do crescimento progressivo a cada iteração
+
+    As resoluções vão de start_size até img_size dobrando; cada uma dura
+    stage_epochs épocas (a última, até o fim do treino). Ao entrar numa
+    resolução nova, alpha sobe de 0 a 1 na primeira metade da etapa.
+    Depende só de (época, batch), então a retomada cai na mesma etapa.
+    """
+
+    def __init__(self, start_size, img_size, stage_epochs):
+        self.resolutions = []
+        size = start_size
+        while size <= img_size:
+            self.resolutions.append(size)
+            size *= 2
+        self.stage_epochs = stage_epochs
+        self.fade_epochs = stage_epochs / 2
+
+    @property
+    def final_epoch(self):
+        """Época (fracionária) em que a resolução final chega a alpha = 1"""
+        return (len(self.resolutions) - 1) * self.stage_epochs + self.fade_epochs
+
+    def stage(self, epoch, batch_idx, num_batches):
+        progress = epoch + batch_idx / num_batches
+        index = min(int(progress // self.stage_epochs), len(self.resolutions) - 1)
+        alpha = 1.0
+        if index > 0:
+            alpha = min(1.0, (progress - index * self.stage_epochs) / self.fade_epochs)
+        return self.resolutions[index], alpha
+
+
+def _make_progressive_schedule(config):
+    if not config.get("progressive", False):
+        return None
+    return ProgressiveSchedule(
+        config["progressive_start"], config["img_size"], config["stage_epochs"]
+    )
+
+
+def _apply_progressive_stage(schedule, generator, discriminator, real_data, epoch, i, num_batches):
+    """
+    Ajusta os modelos à etapa atual e reduz o batch real para a resolução dela
+
+    Durante o fade-in as imagens reais também são misturadas com a versão
+    da resolução anterior (como a saída do gerador).
+
+    Returns:
+        (real_data, resolução)
+    """
+    resolution, alpha = schedule.stage(epoch, i, num_batches)
+    unwrap_model(generator).set_stage(resolution, alpha)
+    unwrap_model(discriminator).set_stage(resolution, alpha)
+
+    if real_data.size(-1) != resolution:
+        real_data = F.interpolate(real_data, size=resolution, mode="area")
+    if alpha < 1.0:
+        low = F.interpolate(F.avg_pool2d(real_data, 2), scale_factor=2, mode="nearest")
+        real_data = low + alpha * (real_data - low)
+    return real_data, resolution
+
+
 # ====================================================================================
 # Funções de treinamento
 # ====================================================================================
 
 
-def train_dcgan(generator, discriminator, dataloader, device, config, output_dir):
+def _save_training_checkpoint(
+    checkpoint_writer,
+    generator,
+    discriminator,
+    optimizerG,
+    optimizerD,
+    epoch,
+    batch_idx,
+    losses,
+    config,
+    dataloader,
+    fixed_noise,
+    scalers=None,
+    save_epoch_file=True,
+):
+    """
+    Enfileira checkpoint com tudo que é necessário para retomar o treino
+
+    epoch é o número de épocas completas e batch_idx quantos batches da época
+    seguinte já foram processados (0 em checkpoints de fim de época). Em DDP
+    só o rank 0 grava (os pesos são iguais em todos os processos).
+    """
+    if not is_main_process():
+        return
+
+    extra_state = {
+        "batch_idx": batch_idx,
+        "sampler_state": dataloader.sampler.state_dict(),
+        "fixed_noise": fixed_noise,
+    }
+    if config.get("progressive", False):
+        # Etapa em que o gerador está (checkpoints antes da resolução final)
+        extra_state["progressive_stage"] = list(unwrap_model(generator).stage)
+    if scalers:
+        extra_state["scaler_state_dicts"] = {
+            name: scaler.state_dict() for name, scaler in scalers.items()
+        }
+
+    checkpoint_writer.save(
+        unwrap_model(generator),
+        unwrap_model(discriminator),
+        optimizerG,
+        optimizerD,
+        epoch,
+        losses,
+        config,
+        extra_state=extra_state,
+        save_epoch_file=save_epoch_file,
+    )
+
+
+def _restore_training_checkpoint(
+    resume_checkpoint,
+    generator,
+    discriminator,
+    optimizerG,
+    optimizerD,
+    dataloader,
+    device,
+    scalers=None,
+):
+    """
+    Restaura modelos, otimizadores, histórico, RNGs e posição do dataloader
+
+    Returns:
+        (start_epoch, start_batch, losses, fixed_noise)
+    """
+    start_epoch, losses, _ = load_checkpoint(
+        resume_checkpoint,
+        unwrap_model(generator),
+        unwrap_model(discriminator),
+        optimizerG,
+        optimizerD,
+        device=device,
+        restore_rng=True,
+    )
+
+    if not is_main_process():
+        # O RNG salvo é o do rank 0: os demais derivam um seed próprio dele
+        # para não sortearem o mesmo ruído em todos os processos
+        torch.manual_seed(int(torch.randint(2**62, ()).item()) + dist.get_rank())
+
+    if "sampler_state" in resume_checkpoint:
+        dataloader.sampler.load_state_dict(resume_checkpoint["sampler_state"])
+
+    saved_scalers = resume_checkpoint.get("scaler_state_dicts", {})
+    for name, scaler in (scalers or {}).items():
+        if saved_scalers.get(name):
+            scaler.load_state_dict(saved_scalers[name])
+
+    start_batch = resume_checkpoint.get("batch_idx", 0)
+    fixed_noise = resume_checkpoint.get("fixed_noise")
+    if fixed_noise is not None:
+        fixed_noise = fixed_noise.to(device)
+
+    return start_epoch, start_batch, losses, fixed_noise
+
+
+def _open_metrics(columns, device, output_dir, saved_losses=None):
+    """
+    Cria o MetricsAccumulator do treino, continuando o histórico ao retomar
+
+    Checkpoints novos guardam apenas a referência ao histórico colunar
+    (offset = registros válidos); checkpoints antigos com listas G/D são
+    migrados para ele. Em DDP só o rank 0 grava o histórico.
+    """
+    history_dir = None
+    if is_main_process():
+        history_dir = os.path.join(output_dir, LOSS_HISTORY_DIRNAME)
+    start_record = 0
+    legacy_rows = None
+
+    if saved_losses:
+        if "offset" in saved_losses:
+            start_record = saved_losses["offset"]
+        elif saved_losses.get("G"):
+            legacy_rows = np.full(
+                (len(saved_losses["G"]), len(columns)), np.nan, dtype=np.float32
+            )
+            legacy_rows[:, 0] = saved_losses["G"]
+            legacy_rows[:, 1] = saved_losses["D"]
+
+    metrics = MetricsAccumulator(columns, device, history_dir, start_record)
+    if legacy_rows is not None:
+        metrics.writer.append(legacy_rows)
+
+    return metrics
+
+
+def _history_reference(metrics):
+    """Referência ao histórico salva no checkpoint (em vez das listas de perdas)"""
+    metrics.sync()
+    return {"dir": LOSS_HISTORY_DIRNAME, "offset": metrics.num_records}
+
+
+def _batches_per_epoch(dataloader, group=1):
+    """
+    Batches (ou grupos de `group` batches) de uma época completa
+
+    len(dataloader) conta só o que falta da época atual depois de uma
+    retomada no meio dela (o amostrador começa em start_index).
+    """
+    return dataloader.sampler.num_local_samples // dataloader.batch_size // group
+
+
+class TrainingBuffers:
+    """
+    Entradas do passo do DCGAN alocadas uma vez por batch size
+
+    Ruído e rótulos das fakes são reescritos no lugar (normal_, random_) a
+    cada iteração e os alvos da BCE (1 e 0) são constantes. Com
+    static_inputs=True (--captured-step), imagens e rótulos reais também são
+    copiados para buffers fixos, que o CUDA graph lê sempre no mesmo endereço.
+    """
+
+    def __init__(self, nz, device, num_classes=None, static_inputs=False):
+        self.nz = nz
+        self.device = device
+        self.num_classes = num_classes
+        self.static_inputs = static_inputs
+        self.batch_size = None
+        self.real = None
+        self.labels = None
+        self.fake_labels = None
+        self.gen_labels = None
+
+    def _allocate(self, real_data):
+        batch_size = real_data.size(0)
+        self.batch_size = batch_size
+        self.noise_d = torch.empty(batch_size, self.nz, 1, 1, device=self.device)
+        self.noise_g = torch.empty(batch_size, self.nz, 1, 1, device=self.device)
+        self.real_targets = torch.ones(batch_size, device=self.device)
+        self.fake_targets = torch.zeros(batch_size, device=self.device)
+        if self.num_classes is not None:
+            self.fake_labels = torch.empty(batch_size, dtype=torch.long, device=self.device)
+            self.gen_labels = torch.empty(batch_size, dtype=torch.long, device=self.device)
+        if self.static_inputs:
+            self.real = torch.empty_like(real_data)
+            if self.num_classes is not None:
+                self.labels = torch.empty(batch_size, dtype=torch.long, device=self.device)
+
+    def refill(self, real_data, labels=None):
+        """Prepara as entradas da iteração (realoca só se o batch size mudar)"""
+        if real_data.size(0) != self.batch_size:
+            self._allocate(real_data)
+
+        self.noise_d.normal_()
+        self.noise_g.normal_()
+        if self.num_classes is not None:
+            # rótulos aleatórios para as fakes
+            self.fake_labels.random_(0, self.num_classes)
+            self.gen_labels.random_(0, self.num_classes)
+
+        if self.static_inputs:
+            self.real.copy_(real_data)
+            if labels is not None:
+                self.labels.copy_(labels)
+        else:
+            self.real = real_data
+            self.labels = labels
+
+
+def dcgan_step(
+    generator,
+    discriminator,
+    optimizerG,
+    optimizerD,
+    criterion,
+    scalers,
+    buffers,
+    autocast_dtype=None,
+    logits=False,
+):
+    """
+    Um passo do DCGAN (D e depois G) com as entradas de um TrainingBuffers
+
+    Não aloca entradas nem sincroniza com a CPU, então serve tanto ao treino
+    eager quanto ao --captured-step (CUDA graph).
+
+    Args:
+        logits: o discriminador devolve logits (criterion = BCEWithLogitsLoss);
+            D(x)/D(G(z)) continuam registrados como probabilidades
+
+    Returns:
+        (errG, errD, D_x, D_G_z1, D_G_z2) - tensores no device
+    """
+    device = buffers.real.device
+    conditional = buffers.labels is not None
+    scalerD, scalerG = scalers["D"], scalers["G"]
+    to_prob = torch.sigmoid if logits else (lambda x: x)
+
+    ############################
+    # (1) Atualizar D
+    ############################
+    discriminator.zero_grad()
+
+    # --- Real ---
+    real_cond = (buffers.labels,) if conditional else ()
+    with _autocast(device, autocast_dtype):
+        output_real = discriminator(buffers.real, *real_cond).view(-1)
+
+    # Perda sempre em fp32 (BCELoss não é seguro sob autocast)
+    errD_real = criterion(output_real.float(), buffers.real_targets)
+    scalerD.scale(errD_real).backward()
+    D_x = to_prob(output_real.detach().float()).mean()
+
+    # --- Fake ---
+    fake_cond = (buffers.fake_labels,) if conditional else ()
+    with _autocast(device, autocast_dtype):
+        fake = generator(buffers.noise_d, *fake_cond)
+        output_fake = discriminator(fake.detach(), *fake_cond).view(-1)
+
+    errD_fake = criterion(output_fake.float(), buffers.fake_targets)
+    scalerD.scale(errD_fake).backward()
+    D_G_z1 = to_prob(output_fake.detach().float()).mean()
+
+    errD = errD_real + errD_fake
+    scalerD.step(optimizerD)
+    scalerD.update()
+
+    ############################
+    # (2) Atualizar G
+    ############################
+    generator.zero_grad()
+
+    gen_cond = (buffers.gen_labels,) if conditional else ()
+    with _autocast(device, autocast_dtype):
+        fake = generator(buffers.noise_g, *gen_cond)
+        output = discriminator(fake, *gen_cond).view(-1)
+
+    # O gerador quer que D classifique as fakes como reais
+    errG = criterion(output.float(), buffers.real_targets)
+    scalerG.scale(errG).backward()
+    D_G_z2 = to_prob(output.detach().float()).mean()
+    scalerG.step(optimizerG)
+    scalerG.update()
+
+    return errG, errD, D_x, D_G_z1, D_G_z2
+
+
+def train_dcgan(
+    generator,
+    discriminator,
+    dataloader,
+    device,
+    config,
+    output_dir,
+    resume_checkpoint=None,
+):
     """
     Treinamento DCGAN padrão OU condicional (dcgan-cond)
 
@@ -63,6 +725,9 @@ def train_dcgan(generator, discriminator, dataloader, device, config, output_dir
         - Usa labels do dataset (data[1])
         - Usa gerador/discriminador condicionais (dcgan-cond)
         - Prompt / GUI podem mapear texto -> classe depois
+
+    Se resume_checkpoint (dicionário carregado) for informado, continua o
+    treino exatamente do ponto salvo.
     """
 
     # Configurações comuns
@@ -79,13 +744,31 @@ def train_dcgan(generator, discriminator, dataloader, device, config, output_dir
     if is_conditional and num_classes is None:
         raise ValueError("Treino condicional requer 'num_classes' em config.")
 
-    # Critério e otimizadores
-    criterion = nn.BCELoss()
-    optimizerD = optim.Adam(discriminator.parameters(), lr=lr, betas=(beta1, beta2))
-    optimizerG = optim.Adam(generator.parameters(), lr=lr, betas=(beta1, beta2))
-
-    real_label = 1.0
-    fake_label = 0.0
+    # Precisão mista / formato de memória
+    autocast_dtype, use_scaler = _get_amp_settings(config.get("amp", "off"), device)
+    memory_format = (
+        torch.channels_last if config.get("channels_last", False) else torch.contiguous_format
+    )
+    scalerD = _make_grad_scaler(use_scaler)
+    scalerG = _make_grad_scaler(use_scaler)
+    scalers = {"G": scalerG, "D": scalerD}
+
+    # --captured-step: entradas em buffers estáticos, capturadas em CUDA graph
+    # quando possível (o Adam precisa de capturable=True)
+    captured = config.get("captured_step", False)
+    use_graphs = _use_cuda_graphs(config, device, use_scaler)
+
+    # Critério e otimizadores. Treinos novos usam D com logits e
+    # BCEWithLogitsLoss (sigmoid fundido na perda, numericamente estável);
+    # checkpoints sem "d_logits" mantêm o Sigmoid no D e a BCELoss
+    d_logits = config.get("d_logits", False)
+    criterion = nn.BCEWithLogitsLoss() if d_logits else nn.BCELoss()
+    optimizerD = optim.Adam(
+        discriminator.parameters(), lr=lr, betas=(beta1, beta2), capturable=use_graphs
+    )
+    optimizerG = optim.Adam(
+        generator.parameters(), lr=lr, betas=(beta1, beta2), capturable=use_graphs
+    )
 
     fixed_noise = torch.randn(64, nz, 1, 1, device=device)
 
@@ -97,8 +780,39 @@ def train_dcgan(generator, discriminator, dataloader, device, config, output_dir
     else:
         fixed_labels = None
 
-    losses = {"G": [], "D": []}
-    logger = TrainingLogger(output_dir)
+    losses = None
+    start_epoch, start_batch = 0, 0
+
+    if resume_checkpoint is not None:
+        start_epoch, start_batch, losses, saved_noise = _restore_training_checkpoint(
+            resume_checkpoint,
+            generator,
+            discriminator,
+            optimizerG,
+            optimizerD,
+            dataloader,
+            device,
+            scalers=scalers,
+        )
+        if saved_noise is not None:
+            fixed_noise = saved_noise
+
+    is_main = is_main_process()
+    logger = TrainingLogger(output_dir, resume=resume_checkpoint is not None, enabled=is_main)
+    checkpoint_writer = CheckpointWriter(
+        os.path.join(output_dir, "checkpoints"),
+        keep_last=config.get("keep_checkpoints", 3),
+        keep_every=config.get("keep_every", 50),
+    )
+    metrics = _open_metrics(
+        ["G", "D", "D_x", "D_G_z1", "D_G_z2"], device, output_dir, saved_losses=losses
+    )
+
+    if resume_checkpoint is not None:
+        logger.log(f"Retomando da época {start_epoch + 1}, batch {start_batch}")
+
+    schedule = _make_progressive_schedule(config)
+    current_resolution = None
 
     logger.log(
         f"Iniciando treinamento {'DCGAN Condicional' if is_conditional else 'DCGAN'}"
@@ -107,159 +821,186 @@ def train_dcgan(generator, discriminator, dataloader, device, config, output_dir
         f"Dataset: {config['dataset']} | Épocas: {epochs} | Batch size: {config['batch_size']}"
     )
 
+    _log_precision_speedup(logger, generator, discriminator, config, device, autocast_dtype)
+    if captured:
+        logger.log(
+            f"Passo capturado: {'CUDA graph' if use_graphs else 'buffers pré-alocados, sem captura'}"
+        )
+
+    # Ruído, rótulos e alvos alocados uma vez; com --captured-step também as
+    # entradas reais, lidas pelo passo capturado
+    buffers = TrainingBuffers(
+        nz, device, num_classes if is_conditional else None, static_inputs=captured
+    )
+
+    def step():
+        return dcgan_step(
+            generator,
+            discriminator,
+            optimizerG,
+            optimizerD,
+            criterion,
+            scalers,
+            buffers,
+            autocast_dtype=autocast_dtype,
+            logits=d_logits,
+        )
+
+    if captured:
+        step = CapturedStep(step, device, use_graph=use_graphs, name="DCGAN")
+
     print("\n" + "=" * 70)
     print("INICIANDO TREINAMENTO", "CONDICIONAL" if is_conditional else "")
     print("=" * 70)
 
     start_time = time.time()
-
-    for epoch in range(epochs):
-        epoch_start = time.time()
-
-        for i, data in enumerate(dataloader):
-            # ------------------------------------------------
-            # Preparar batch real
-            # ------------------------------------------------
-            if is_conditional:
-                real_data, labels = data[0].to(device), data[1].to(device)
-            else:
-                real_data = data[0].to(device)
-                labels = None  # não usado
-
-            batch_size = real_data.size(0)
-
-            ############################
-            # (1) Atualizar D
-            ############################
-            discriminator.zero_grad()
-
-            # --- Real ---
-            label_real_tensor = torch.full(
-                (batch_size,), real_label, dtype=torch.float, device=device
-            )
-
-            if is_conditional:
-                output_real = discriminator(real_data, labels).view(-1)
-            else:
-                output_real = discriminator(real_data).view(-1)
-
-            errD_real = criterion(output_real, label_real_tensor)
-            errD_real.backward()
-            D_x = output_real.mean().item()
-
-            # --- Fake ---
-            noise = torch.randn(batch_size, nz, 1, 1, device=device)
-
-            if is_conditional:
-                # amostra rótulos aleatórios para fakes
-                fake_labels = torch.randint(0, num_classes, (batch_size,), device=device)
-                fake = generator(noise, fake_labels)
-                output_fake = discriminator(fake.detach(), fake_labels).view(-1)
-            else:
-                fake = generator(noise)
-                output_fake = discriminator(fake.detach()).view(-1)
-
-            label_fake_tensor = torch.full(
-                (batch_size,), fake_label, dtype=torch.float, device=device
-            )
-            errD_fake = criterion(output_fake, label_fake_tensor)
-            errD_fake.backward()
-            D_G_z1 = output_fake.mean().item()
-
-            errD = errD_real + errD_fake
-            optimizerD.step()
-
-            ############################
-            # (2) Atualizar G
-            ############################
-            generator.zero_grad()
-            label_gen_tensor = torch.full(
-                (batch_size,), real_label, dtype=torch.float, device=device
+    interrupt = GracefulInterrupt()
+
+    with interrupt:
+        for epoch in range(start_epoch, epochs):
+            epoch_start = time.time()
+            epoch_images = 0
+            first_batch = start_batch if epoch == start_epoch else 0
+            dataloader.sampler.set_epoch(epoch, first_batch * config["batch_size"])
+            num_batches = _batches_per_epoch(dataloader)
+
+            for i, data in enumerate(dataloader, start=first_batch):
+                # ------------------------------------------------
+                # Preparar batch real
+                # ------------------------------------------------
+                if is_conditional:
+                    real_data, labels = data[0].to(device), data[1].to(device)
+                else:
+                    real_data = data[0].to(device)
+                    labels = None  # não usado
+
+                if schedule is not None:
+                    real_data, resolution = _apply_progressive_stage(
+                        schedule, generator, discriminator, real_data, epoch, i, num_batches
+                    )
+                    if resolution != current_resolution:
+                        current_resolution = resolution
+                        logger.log(f"Crescimento progressivo: {resolution}x{resolution}")
+
+                real_data = real_data.contiguous(memory_format=memory_format)
+                batch_size = real_data.size(0)
+                epoch_images += batch_size
+
+                buffers.refill(real_data, labels)
+                errG, errD, D_x, D_G_z1, D_G_z2 = step()
+
+                # Sem .item(): métricas ficam no device até o próximo log
+                metrics.update(errG, errD, D_x, D_G_z1, D_G_z2)
+
+                if i % LOG_INTERVAL == 0:
+                    metrics.flush()
+                    m = metrics.last
+                    print(
+                        f"[{epoch+1}/{epochs}][{i}/{num_batches}] "
+                        f"Loss_D: {m['D']:.4f} Loss_G: {m['G']:.4f} "
+                        f"D(x): {m['D_x']:.4f} D(G(z)): {m['D_G_z1']:.4f}/{m['D_G_z2']:.4f}"
+                    )
+
+                if interrupt_requested(interrupt, device):
+                    # Salva posição exata (próximo batch) para retomada
+                    _save_training_checkpoint(
+                        checkpoint_writer,
+                        generator,
+                        discriminator,
+                        optimizerG,
+                        optimizerD,
+                        epoch,
+                        i + 1,
+                        _history_reference(metrics),
+                        config,
+                        dataloader,
+                        fixed_noise,
+                        scalers=scalers,
+                        save_epoch_file=False,
+                    )
+                    metrics.close()
+                    checkpoint_writer.close()
+                    logger.log(
+                        f"Treinamento interrompido na época {epoch + 1}, batch {i + 1}. "
+                        f"Retome com --resume {os.path.join(output_dir, 'checkpoints', 'checkpoint_latest.pth')}"
+                    )
+                    return
+
+            # ---------------- Fim da época ----------------
+            metrics.flush()
+            epoch_time = time.time() - epoch_start
+            elapsed_total = time.time() - start_time
+
+            logger.log_epoch(
+                epoch + 1,
+                epochs,
+                metrics.last.get("G", float("nan")),
+                metrics.last.get("D", float("nan")),
+                epoch_time,
+                images_per_sec=epoch_images * config.get("world_size", 1) / epoch_time,
             )
 
-            noise = torch.randn(batch_size, nz, 1, 1, device=device)
-
-            if is_conditional:
-                gen_labels = torch.randint(0, num_classes, (batch_size,), device=device)
-                fake = generator(noise, gen_labels)
-                output = discriminator(fake, gen_labels).view(-1)
-            else:
-                fake = generator(noise)
-                output = discriminator(fake).view(-1)
-
-            errG = criterion(output, label_gen_tensor)
-            errG.backward()
-            D_G_z2 = output.mean().item()
-            optimizerG.step()
-
-            losses["G"].append(errG.item())
-            losses["D"].append(errD.item())
-
-            if i % 50 == 0:
-                print(
-                    f"[{epoch+1}/{epochs}][{i}/{len(dataloader)}] "
-                    f"Loss_D: {errD.item():.4f} Loss_G: {errG.item():.4f} "
-                    f"D(x): {D_x:.4f} D(G(z)): {D_G_z1:.4f}/{D_G_z2:.4f}"
-                )
-
-        # ---------------- Fim da época ----------------
-        epoch_time = time.time() - epoch_start
-        elapsed_total = time.time() - start_time
-
-        logger.log_epoch(epoch + 1, epochs, errG.item(), errD.item(), epoch_time)
-
-        # Amostras
-        if (epoch + 1) % 5 == 0 or epoch == 0:
-            samples_dir = os.path.join(output_dir, "samples")
-            os.makedirs(samples_dir, exist_ok=True)
-            sample_path = os.path.join(samples_dir, f"epoch_{epoch+1}.png")
-
-            if is_conditional and fixed_labels is not None:
-                # Modelos condicionais: gera usando labels fixos (0..num_classes-1 repetidos)
-                with torch.no_grad():
-                    fake_samples = generator(fixed_noise, fixed_labels).detach().cpu()
-                # saída do gerador está em [-1, 1] -> normaliza pra [0, 1]
-                fake_samples = (fake_samples + 1) / 2
-                vutils.save_image(
-                    fake_samples,
-                    sample_path,
-                    nrow=8,
+            # Amostras
+            if is_main and ((epoch + 1) % 5 == 0 or epoch == 0):
+                samples_dir = os.path.join(output_dir, "samples")
+                os.makedirs(samples_dir, exist_ok=True)
+                sample_path = os.path.join(samples_dir, f"epoch_{epoch+1}.png")
+
+                if is_conditional and fixed_labels is not None:
+                    # Modelos condicionais: gera usando labels fixos (0..num_classes-1 repetidos)
+                    with torch.no_grad():
+                        fake_samples = (
+                            _sampling_model(generator)(fixed_noise, fixed_labels).detach().cpu()
+                        )
+                    # saída do gerador está em [-1, 1] -> normaliza pra [0, 1]
+                    fake_samples = (fake_samples + 1) / 2
+                    vutils.save_image(
+                        fake_samples,
+                        sample_path,
+                        nrow=8,
+                    )
+                else:
+                    # Modelos não-condicionais usam o helper padrão
+                    generate_samples(_sampling_model(generator), 64, nz, device, sample_path)
+
+                print(f"✓ Amostras salvas: {sample_path}")
+
+
+            # Checkpoints
+            if (epoch + 1) % 10 == 0 or epoch == epochs - 1:
+                _save_training_checkpoint(
+                    checkpoint_writer,
+                    generator,
+                    discriminator,
+                    optimizerG,
+                    optimizerD,
+                    epoch + 1,
+                    0,
+                    _history_reference(metrics),
+                    config,
+                    dataloader,
+                    fixed_noise,
+                    scalers=scalers,
                 )
-            else:
-                # Modelos não-condicionais usam o helper padrão
-                generate_samples(generator, 64, nz, device, sample_path)
-
-            print(f"✓ Amostras salvas: {sample_path}")
-
 
-        # Checkpoints
-        if (epoch + 1) % 10 == 0 or epoch == epochs - 1:
-            checkpoint_dir = os.path.join(output_dir, "checkpoints")
-            os.makedirs(checkpoint_dir, exist_ok=True)
-
-            save_checkpoint(
-                generator,
-                discriminator,
-                optimizerG,
-                optimizerD,
-                epoch + 1,
-                losses,
-                config,
-                checkpoint_dir,
+            remaining = estimate_remaining_time(
+                elapsed_total, epoch + 1 - start_epoch, epochs - start_epoch
             )
-
-        remaining = estimate_remaining_time(elapsed_total, epoch + 1, epochs)
-        print(f"⏱️  Tempo restante estimado: {remaining}\n")
+            print(f"⏱️  Tempo restante estimado: {remaining}\n")
 
     total_time = time.time() - start_time
     logger.log(f"\n Treinamento concluído em {format_time(total_time)}")
 
-    plot_losses(losses, output_dir)
+    metrics.close()
+    checkpoint_writer.close()
+    if not is_main:
+        return
+    plot_losses(metrics.writer.history_dir, output_dir)
 
     final_sample_path = os.path.join(output_dir, "final_samples.png")
     if is_conditional and fixed_labels is not None:
         with torch.no_grad():
-            fake_samples = generator(fixed_noise, fixed_labels).detach().cpu()
+            fake_samples = _sampling_model(generator)(fixed_noise, fixed_labels).detach().cpu()
         fake_samples = (fake_samples + 1) / 2  # [-1,1] -> [0,1]
         vutils.save_image(
             fake_samples,
@@ -267,7 +1008,7 @@ def train_dcgan(generator, discriminator, dataloader, device, config, output_dir
             nrow=8,
         )
     else:
-        generate_samples(generator, 64, nz, device, final_sample_path)
+        generate_samples(_sampling_model(generator), 64, nz, device, final_sample_path)
 
     print("\n" + "=" * 70)
     print("TREINAMENTO CONCLUÍDO!")
@@ -278,19 +1019,39 @@ def train_dcgan(generator, discriminator, dataloader, device, config, output_dir
 
 
 
-def compute_gradient_penalty(critic, real_data, fake_data, device):
-    """Calcula gradient penalty para WGAN-GP"""
-    batch_size = real_data.size(0)
+def compute_gradient_penalty(
+    critic, real_data, fake_data, device, scaler=None, autocast_dtype=None
+):
+    """
+    Calcula gradient penalty para WGAN-GP
+
+    Com AMP, o forward do critic roda sob autocast e, se houver GradScaler
+    ativo, a saída é escalada antes do grad (double-backward) e os gradientes
+    são desescalados antes da norma, evitando underflow em fp16.
+    """
+    interpolates = _interpolate(real_data, fake_data, device)
+
+    with _autocast(device, autocast_dtype):
+        d_interpolates = critic(interpolates)
+
+    return _penalty_from_outputs(d_interpolates, interpolates, scaler)
+
 
-    alpha = torch.rand(batch_size, 1, 1, 1, device=device)
-    interpolates = (alpha * real_data + (1 - alpha) * fake_data).requires_grad_(True)
+def _interpolate(real_data, fake_data, device):
+    """Pontos aleatórios entre amostras reais e falsas (entrada do gradient penalty)"""
+    alpha = torch.rand(real_data.size(0), 1, 1, 1, device=device)
+    return (alpha * real_data + (1 - alpha) * fake_data).requires_grad_(True)
 
-    d_interpolates = critic(interpolates)
 
-    fake = torch.ones(d_interpolates.size(), device=device, requires_grad=False)
+def _penalty_from_outputs(d_interpolates, interpolates, scaler=None):
+    """(||∇ critic(interpolates)|| - 1)² médio, a partir da saída já calculada"""
+    use_scaler = scaler is not None and scaler.is_enabled()
+    outputs = scaler.scale(d_interpolates) if use_scaler else d_interpolates
+
+    fake = torch.ones_like(outputs, requires_grad=False)
 
     gradients = grad(
-        outputs=d_interpolates,
+        outputs=outputs,
         inputs=interpolates,
         grad_outputs=fake,
         create_graph=True,
@@ -298,15 +1059,194 @@ def compute_gradient_penalty(critic, real_data, fake_data, device):
         only_inputs=True,
     )[0]
 
-    gradients = gradients.view(batch_size, -1)
-    gradient_penalty = ((gradients.norm(2, dim=1) - 1) ** 2).mean()
+    if use_scaler:
+        # Escala como tensor no device: get_scale() devolveria um float (sync com a CPU)
+        gradients = gradients / scaler._get_scale_async()
+
+    gradients = gradients.float().reshape(interpolates.size(0), -1)
+    return ((gradients.norm(2, dim=1) - 1) ** 2).mean()
+
+
+def critic_step_fused(
+    critic, real_data, fake_data, device, scaler=None, autocast_dtype=None, gp_samples=None
+):
+    """
+    Saídas do critic em real/fake e gradient penalty num único forward
+
+    Real, fake e interpolados são concatenados num batch só; o penalty usa o
+    gradiente da fatia dos interpolados nesse mesmo grafo. Equivale às três
+    chamadas separadas porque o critic do WGAN-GP não tem BatchNorm (cada
+    amostra é processada de forma independente).
+
+    Troca três forwards pequenos por um grande (menos lançamentos de kernel),
+    mas o double backward do penalty passa a percorrer o batch 3x maior:
+    compensa quando o passo é limitado por latência, não por FLOPs. Meça com
+    scripts/benchmark_critic_step.py.
+
+    Args:
+        gp_samples: quantas amostras (as primeiras do batch) entram no
+            penalty; None = batch inteiro, 0 = sem penalty
+
+    Returns:
+        (critic_real, critic_fake, gradient_penalty)
+    """
+    batch_size = real_data.size(0)
+    gp_samples = batch_size if gp_samples is None else gp_samples
+    inputs = [real_data, fake_data]
+    if gp_samples:
+        interpolates = _interpolate(real_data[:gp_samples], fake_data[:gp_samples], device)
+        inputs.append(interpolates)
+
+    with _autocast(device, autocast_dtype):
+        output = critic(torch.cat(inputs))
+    out_real, out_fake = output[:batch_size], output[batch_size : 2 * batch_size]
+
+    if gp_samples:
+        gradient_penalty = _penalty_from_outputs(output[2 * batch_size :], interpolates, scaler)
+    else:
+        gradient_penalty = torch.zeros((), device=device)
+    return out_real.float().mean(), out_fake.float().mean(), gradient_penalty
+
+
+def critic_losses(
+    critic,
+    real_data,
+    fake_data,
+    device,
+    lambda_gp,
+    fused=True,
+    scaler=None,
+    autocast_dtype=None,
+    gp_subbatch=0,
+):
+    """
+    Perda de um passo do critic (antes do backward)
+
+    fused=True usa critic_step_fused; False, as três chamadas separadas
+    (real, fake e compute_gradient_penalty). lambda_gp = 0 pula o gradient
+    penalty (passos sem regularização do modo preguiçoso) e gp_subbatch > 0
+    o calcula só nas primeiras gp_subbatch amostras do batch.
+
+    Returns:
+        (errD, critic_real, critic_fake)
+    """
+    gp_samples = 0 if lambda_gp == 0 else (gp_subbatch or real_data.size(0))
+
+    if fused:
+        critic_real, critic_fake, gradient_penalty = critic_step_fused(
+            critic,
+            real_data,
+            fake_data,
+            device,
+            scaler=scaler,
+            autocast_dtype=autocast_dtype,
+            gp_samples=gp_samples,
+        )
+    else:
+        with _autocast(device, autocast_dtype):
+            critic_real = critic(real_data).float().mean()
+            critic_fake = critic(fake_data).float().mean()
+        if gp_samples:
+            gradient_penalty = compute_gradient_penalty(
+                critic,
+                real_data[:gp_samples],
+                fake_data[:gp_samples],
+                device,
+                scaler=scaler,
+                autocast_dtype=autocast_dtype,
+            )
+        else:
+            gradient_penalty = torch.zeros((), device=device)
+
+    errD = -critic_real + critic_fake + lambda_gp * gradient_penalty
+    return errD, critic_real, critic_fake
 
-    return gradient_penalty
 
+def generate_critic_fakes(generator, batch_size, nz, n_critic, device, autocast_dtype=None):
+    """
+    As n_critic fakes de uma iteração numa única chamada do gerador
 
-def train_wgan_gp(generator, critic, dataloader, device, config, output_dir):
+    Sem gradiente (o critic só usa as fakes destacadas). Com BatchNorm no
+    gerador as estatísticas passam a ser do batch n_critic x maior, por isso
+    é opcional (--batched-fakes).
+
+    Returns:
+        tupla com n_critic tensores [batch_size, nc, H, W] (fp32)
+    """
+    noise = torch.randn(n_critic * batch_size, nz, 1, 1, device=device)
+    with torch.no_grad(), _autocast(device, autocast_dtype):
+        fakes = generator(noise)
+    return fakes.float().split(batch_size)
+
+
+def wgan_critic_step(
+    critic,
+    optimizerD,
+    scalerD,
+    real_data,
+    fake_data,
+    device,
+    lambda_gp,
+    fused=False,
+    autocast_dtype=None,
+    gp_subbatch=0,
+):
+    """
+    Uma atualização do critic (perda, backward e passo do otimizador)
+
+    Returns:
+        (errD, critic_real, critic_fake)
+    """
+    critic.zero_grad()
+    errD, critic_real, critic_fake = critic_losses(
+        critic,
+        real_data,
+        fake_data,
+        device,
+        lambda_gp,
+        fused=fused,
+        scaler=scalerD,
+        autocast_dtype=autocast_dtype,
+        gp_subbatch=gp_subbatch,
+    )
+    scalerD.scale(errD).backward()
+    scalerD.step(optimizerD)
+    scalerD.update()
+    return errD, critic_real, critic_fake
+
+
+def wgan_generator_step(generator, critic, optimizerG, scalerG, noise, device, autocast_dtype=None):
+    """
+    Uma atualização do gerador do WGAN-GP
+
+    Returns:
+        (errG, critic_fake)
+    """
+    generator.zero_grad()
+    with _autocast(device, autocast_dtype):
+        fake = generator(noise)
+        critic_fake = critic(fake).float().mean()
+    errG = -critic_fake
+    scalerG.scale(errG).backward()
+    scalerG.step(optimizerG)
+    scalerG.update()
+    return errG, critic_fake
+
+
+def train_wgan_gp(
+    generator,
+    critic,
+    dataloader,
+    device,
+    config,
+    output_dir,
+    resume_checkpoint=None,
+):
     """
     Treinamento WGAN-GP (sem condicionamento)
+
+    Se resume_checkpoint (dicionário carregado) for informado, continua o
+    treino exatamente do ponto salvo.
     """
 
     epochs = config["epochs"]
@@ -316,121 +1256,568 @@ def train_wgan_gp(generator, critic, dataloader, device, config, output_dir):
     nz = config["nz"]
     n_critic = config.get("n_critic", 5)
     lambda_gp = config.get("lambda_gp", 10.0)
-
-    optimizerD = optim.Adam(critic.parameters(), lr=lr, betas=(beta1, beta2))
-    optimizerG = optim.Adam(generator.parameters(), lr=lr, betas=(beta1, beta2))
+    fused_critic = config.get("critic_step", "separate") == "fused"
+    batched_fakes = config.get("batched_fakes", False)
+    gp_interval = config.get("gp_interval", 1)
+    gp_subbatch = config.get("gp_subbatch", 0)
+    # Com fresh_critic_batches cada passo do critic recebe um batch real
+    # diferente: a época passa a ter len(dataloader) // n_critic passos do gerador
+    reals_per_step = n_critic if config.get("fresh_critic_batches", False) else 1
+    prefetcher = DevicePrefetcher(dataloader, device, group=reals_per_step)
 
     fixed_noise = torch.randn(64, nz, 1, 1, device=device)
 
-    losses = {"G": [], "D": []}
-    logger = TrainingLogger(output_dir)
+    # Precisão mista / formato de memória
+    autocast_dtype, use_scaler = _get_amp_settings(config.get("amp", "off"), device)
+    memory_format = (
+        torch.channels_last if config.get("channels_last", False) else torch.contiguous_format
+    )
+    scalerD = _make_grad_scaler(use_scaler)
+    scalerG = _make_grad_scaler(use_scaler)
+    scalers = {"G": scalerG, "D": scalerD}
+
+    # --captured-step: um grafo por variante do passo do critic (com e sem
+    # gradient penalty) e um para o gerador
+    captured = config.get("captured_step", False)
+    use_graphs = _use_cuda_graphs(config, device, use_scaler)
+
+    optimizerD = optim.Adam(
+        critic.parameters(), lr=lr, betas=(beta1, beta2), capturable=use_graphs
+    )
+    optimizerG = optim.Adam(
+        generator.parameters(), lr=lr, betas=(beta1, beta2), capturable=use_graphs
+    )
+
+    losses = None
+    start_epoch, start_batch = 0, 0
+
+    if resume_checkpoint is not None:
+        start_epoch, start_batch, losses, saved_noise = _restore_training_checkpoint(
+            resume_checkpoint,
+            generator,
+            critic,
+            optimizerG,
+            optimizerD,
+            dataloader,
+            device,
+            scalers=scalers,
+        )
+        if saved_noise is not None:
+            fixed_noise = saved_noise
+
+    is_main = is_main_process()
+    logger = TrainingLogger(output_dir, resume=resume_checkpoint is not None, enabled=is_main)
+    checkpoint_writer = CheckpointWriter(
+        os.path.join(output_dir, "checkpoints"),
+        keep_last=config.get("keep_checkpoints", 3),
+        keep_every=config.get("keep_every", 50),
+    )
+    metrics = _open_metrics(
+        ["G", "D", "critic_real", "critic_fake"], device, output_dir, saved_losses=losses
+    )
+
+    if resume_checkpoint is not None:
+        logger.log(f"Retomando da época {start_epoch + 1}, batch {start_batch}")
+
+    schedule = _make_progressive_schedule(config)
+    current_resolution = None
 
     logger.log(f"Iniciando treinamento WGAN-GP")
     logger.log(
         f"Dataset: {config['dataset']} | Épocas: {epochs} | Batch size: {config['batch_size']}"
     )
-    logger.log(f"n_critic: {n_critic} | lambda_gp: {lambda_gp}")
+    logger.log(
+        f"n_critic: {n_critic} | lambda_gp: {lambda_gp} | "
+        f"passo do critic: {'fundido' if fused_critic else 'separado'}"
+        f"{' | fakes em lote' if batched_fakes else ''}"
+    )
+    if reals_per_step > 1:
+        logger.log(
+            f"Batches reais novos por passo do critic: {reals_per_step} por passo do gerador, "
+            f"{len(prefetcher)} passos do gerador por época"
+        )
+    if gp_interval > 1 or gp_subbatch:
+        logger.log(
+            f"Gradient penalty preguiçoso: a cada {gp_interval} passo(s) do critic, "
+            f"{gp_subbatch or config['batch_size']} amostra(s)"
+        )
+    _log_precision_speedup(logger, generator, critic, config, device, autocast_dtype)
+    if captured:
+        logger.log(
+            f"Passo capturado: {'CUDA graph' if use_graphs else 'buffers pré-alocados, sem captura'}"
+            f"{' (fakes geradas em cada passo do critic)' if batched_fakes else ''}"
+        )
+        batched_fakes = False
+
+    # Buffers estáticos do --captured-step (alocados no primeiro batch) e os passos
+    static = None
+    captured_critic = {}  # lambda_gp do passo -> CapturedStep
+    captured_generator = None
+
+    def make_captured_critic(step_lambda_gp):
+        def step():
+            with torch.no_grad(), _autocast(device, autocast_dtype):
+                fake = generator(static["noise"]).float()
+            return wgan_critic_step(
+                critic,
+                optimizerD,
+                scalerD,
+                static["real"],
+                fake,
+                device,
+                step_lambda_gp,
+                fused=fused_critic,
+                autocast_dtype=autocast_dtype,
+                gp_subbatch=gp_subbatch,
+            )
+
+        name = f"critic, {'com' if step_lambda_gp else 'sem'} GP"
+        return CapturedStep(step, device, use_graph=use_graphs, name=name)
 
     print("\n" + "=" * 70)
     print("INICIANDO TREINAMENTO WGAN-GP")
     print("=" * 70)
 
     start_time = time.time()
+    interrupt = GracefulInterrupt()
+
+    with interrupt:
+        for epoch in range(start_epoch, epochs):
+            epoch_start = time.time()
+            epoch_images = 0
+            first_batch = start_batch if epoch == start_epoch else 0
+            dataloader.sampler.set_epoch(
+                epoch, first_batch * reals_per_step * config["batch_size"]
+            )
+            num_batches = _batches_per_epoch(dataloader, reals_per_step)
+
+            for i, batches in enumerate(prefetcher, start=first_batch):
+                reals = []
+                for data in batches:
+                    real_data = data[0]
+                    if schedule is not None:
+                        real_data, resolution = _apply_progressive_stage(
+                            schedule, generator, critic, real_data, epoch, i, num_batches
+                        )
+                        if resolution != current_resolution:
+                            current_resolution = resolution
+                            logger.log(f"Crescimento progressivo: {resolution}x{resolution}")
+                    reals.append(real_data.contiguous(memory_format=memory_format))
+                batch_size = reals[0].size(0)
+                epoch_images += batch_size * reals_per_step
+
+                if captured and static is None:
+                    static = {
+                        "real": torch.empty_like(reals[0]),
+                        "noise": torch.empty(batch_size, nz, 1, 1, device=device),
+                        "noise_g": torch.empty(batch_size, nz, 1, 1, device=device),
+                    }
+                    captured_generator = CapturedStep(
+                        lambda: wgan_generator_step(
+                            generator,
+                            critic,
+                            optimizerG,
+                            scalerG,
+                            static["noise_g"],
+                            device,
+                            autocast_dtype,
+                        ),
+                        device,
+                        use_graph=use_graphs,
+                        name="gerador",
+                    )
+
+                # (1) Atualizar Critic n_critic vezes
+                fakes = None
+                if batched_fakes:
+                    fakes = generate_critic_fakes(
+                        generator, batch_size, nz, n_critic, device, autocast_dtype
+                    )
+
+                for k in range(n_critic):
+                    # Penalty preguiçoso: só a cada gp_interval passos, com peso
+                    # multiplicado por gp_interval (mesma regularização média)
+                    if (i * n_critic + k) % gp_interval == 0:
+                        step_lambda_gp = lambda_gp * gp_interval
+                    else:
+                        step_lambda_gp = 0.0
+
+                    if captured:
+                        if k < reals_per_step:
+                            static["real"].copy_(reals[k])
+                        static["noise"].normal_()
+                        if step_lambda_gp not in captured_critic:
+                            captured_critic[step_lambda_gp] = make_captured_critic(step_lambda_gp)
+                        errD, critic_real, critic_fake = captured_critic[step_lambda_gp]()
+                        continue
+
+                    if fakes is not None:
+                        fake = fakes[k]
+                    else:
+                        noise = torch.randn(batch_size, nz, 1, 1, device=device)
+                        with torch.no_grad(), _autocast(device, autocast_dtype):
+                            fake = generator(noise).float()
+
+                    errD, critic_real, critic_fake = wgan_critic_step(
+                        critic,
+                        optimizerD,
+                        scalerD,
+                        reals[k % reals_per_step],
+                        fake,
+                        device,
+                        step_lambda_gp,
+                        fused=fused_critic,
+                        autocast_dtype=autocast_dtype,
+                        gp_subbatch=gp_subbatch,
+                    )
+
+                # (2) Atualizar Gerador
+                if captured:
+                    static["noise_g"].normal_()
+                    errG, critic_fake = captured_generator()
+                else:
+                    noise = torch.randn(batch_size, nz, 1, 1, device=device)
+                    errG, critic_fake = wgan_generator_step(
+                        generator, critic, optimizerG, scalerG, noise, device, autocast_dtype
+                    )
+
+                # Sem .item(): métricas ficam no device até o próximo log
+                metrics.update(errG, errD, critic_real, critic_fake)
+
+                if i % LOG_INTERVAL == 0:
+                    metrics.flush()
+                    m = metrics.last
+                    print(
+                        f"[{epoch+1}/{epochs}][{i}/{num_batches}] "
+                        f"Loss_D: {m['D']:.4f} Loss_G: {m['G']:.4f} "
+                        f"D(x): {m['critic_real']:.4f} D(G(z)): {m['critic_fake']:.4f}"
+                    )
+
+                if interrupt_requested(interrupt, device):
+                    # Salva posição exata (próximo batch) para retomada
+                    _save_training_checkpoint(
+                        checkpoint_writer,
+                        generator,
+                        critic,
+                        optimizerG,
+                        optimizerD,
+                        epoch,
+                        i + 1,
+                        _history_reference(metrics),
+                        config,
+                        dataloader,
+                        fixed_noise,
+                        scalers=scalers,
+                        save_epoch_file=False,
+                    )
+                    metrics.close()
+                    checkpoint_writer.close()
+                    logger.log(
+                        f"Treinamento interrompido na época {epoch + 1}, batch {i + 1}. "
+                        f"Retome com --resume {os.path.join(output_dir, 'checkpoints', 'checkpoint_latest.pth')}"
+                    )
+                    return
+
+            metrics.flush()
+            epoch_time = time.time() - epoch_start
+            elapsed_total = time.time() - start_time
+
+            logger.log_epoch(
+                epoch + 1,
+                epochs,
+                metrics.last.get("G", float("nan")),
+                metrics.last.get("D", float("nan")),
+                epoch_time,
+                images_per_sec=epoch_images * config.get("world_size", 1) / epoch_time,
+            )
 
-    for epoch in range(epochs):
-        epoch_start = time.time()
+            # Amostras
+            if is_main and ((epoch + 1) % 5 == 0 or epoch == 0):
+                samples_dir = os.path.join(output_dir, "samples")
+                os.makedirs(samples_dir, exist_ok=True)
+                sample_path = os.path.join(samples_dir, f"epoch_{epoch+1}.png")
+
+                # WGAN-GP is non-conditional, uses standard helper
+                generate_samples(_sampling_model(generator), 64, nz, device, sample_path)
+
+                print(f"✓ Amostras salvas: {sample_path}")
+
+            # Checkpoints
+            if (epoch + 1) % 10 == 0 or epoch == epochs - 1:
+                _save_training_checkpoint(
+                    checkpoint_writer,
+                    generator,
+                    critic,
+                    optimizerG,
+                    optimizerD,
+                    epoch + 1,
+                    0,
+                    _history_reference(metrics),
+                    config,
+                    dataloader,
+                    fixed_noise,
+                    scalers=scalers,
+                )
 
-        for i, data in enumerate(dataloader):
-            real_data = data[0].to(device)
-            batch_size = real_data.size(0)
+            remaining = estimate_remaining_time(
+                elapsed_total, epoch + 1 - start_epoch, epochs - start_epoch
+            )
+            print(f"⏱️  Tempo restante estimado: {remaining}\n")
 
-            # (1) Atualizar Critic n_critic vezes
-            for _ in range(n_critic):
-                critic.zero_grad()
+    total_time = time.time() - start_time
+    logger.log(f"\n Treinamento concluído em {format_time(total_time)}")
 
-                critic_real = critic(real_data).mean()
+    metrics.close()
+    checkpoint_writer.close()
+    if not is_main:
+        return
+    plot_losses(metrics.writer.history_dir, output_dir)
 
-                noise = torch.randn(batch_size, nz, 1, 1, device=device)
-                fake = generator(noise)
-                critic_fake = critic(fake.detach()).mean()
+    final_sample_path = os.path.join(output_dir, "final_samples.png")
+    generate_samples(_sampling_model(generator), 64, nz, device, final_sample_path)
 
-                gradient_penalty = compute_gradient_penalty(
-                    critic, real_data, fake, device
-                )
+    print("\n" + "=" * 70)
+    print("TREINAMENTO CONCLUÍDO!")
+    print("=" * 70)
+    print(f"📁 Resultados salvos em: {output_dir}")
+    print(f"⏱️  Tempo total: {format_time(total_time)}")
+    print("=" * 70 + "\n")
 
-                errD = -critic_real + critic_fake + lambda_gp * gradient_penalty
-                errD.backward()
-                optimizerD.step()
-
-            # (2) Atualizar Gerador
-            generator.zero_grad()
-            noise = torch.randn(batch_size, nz, 1, 1, device=device)
-            fake = generator(noise)
-            critic_fake = critic(fake).mean()
-            errG = -critic_fake
-            errG.backward()
-            optimizerG.step()
-
-            losses["G"].append(errG.item())
-            losses["D"].append(errD.item())
-
-            if i % 50 == 0:
-                print(
-                    f"[{epoch+1}/{epochs}][{i}/{len(dataloader)}] "
-                    f"Loss_D: {errD.item():.4f} Loss_G: {errG.item():.4f} "
-                    f"D(x): {critic_real.item():.4f} D(G(z)): {critic_fake.item():.4f}"
-                )
 
-        epoch_time = time.time() - epoch_start
-        elapsed_total = time.time() - start_time
+# ====================================================================================
+# Upscaler aprendido (super-resolução)
+# ====================================================================================
+
 
-        logger.log_epoch(epoch + 1, epochs, errG.item(), errD.item(), epoch_time)
+def make_low_res(images, scale):
+    """Versão em baixa resolução (bicúbica com antialias) de um batch em [-1, 1]"""
+    return F.interpolate(
+        images.float(),
+        scale_factor=1 / scale,
+        mode="bicubic",
+        align_corners=False,
+        antialias=True,
+    ).clamp_(-1, 1)
 
-        # Amostras
-        if (epoch + 1) % 5 == 0 or epoch == 0:
-            samples_dir = os.path.join(output_dir, "samples")
-            os.makedirs(samples_dir, exist_ok=True)
-            sample_path = os.path.join(samples_dir, f"epoch_{epoch+1}.png")
 
-            # WGAN-GP is non-conditional, uses standard helper
-            generate_samples(generator, 64, nz, device, sample_path)
+def batch_psnr(output, target):
+    """PSNR médio (dB) de um batch em [-1, 1], calculado em [0, 1]"""
+    mse = ((output.float() - target.float()) / 2).pow(2).flatten(1).mean(dim=1)
+    return (-10 * torch.log10(mse.clamp_min(1e-10))).mean()
 
-            print(f"✓ Amostras salvas: {sample_path}")
 
-        # Checkpoints
-        if (epoch + 1) % 10 == 0 or epoch == epochs - 1:
-            checkpoint_dir = os.path.join(output_dir, "checkpoints")
-            os.makedirs(checkpoint_dir, exist_ok=True)
-            save_checkpoint(
-                generator,
-                critic,
-                optimizerG,
-                optimizerD,
-                epoch + 1,
-                losses,
-                config,
-                checkpoint_dir,
+def train_sr(
+    model,
+    dataloader,
+    device,
+    config,
+    output_dir,
+    resume_checkpoint=None,
+):
+    """
+    Treina o upscaler aprendido (SRNet) nas imagens do próprio dataset
+
+    Cada batch em img_size é o alvo; a entrada é a mesma imagem reduzida por
+    sr_scale. Perda L1; PSNR da rede e do Lanczos (referência) vão para o
+    histórico de métricas. O checkpoint usa o mesmo formato dos GANs (a rede
+    fica em generator_state_dict, sem discriminador).
+    """
+    epochs = config["epochs"]
+    scale = config["sr_scale"]
+
+    criterion = nn.L1Loss()
+    optimizer = optim.Adam(
+        model.parameters(), lr=config["lr"], betas=(config["beta1"], config["beta2"])
+    )
+
+    autocast_dtype, use_scaler = _get_amp_settings(config.get("amp", "off"), device)
+    memory_format = (
+        torch.channels_last if config.get("channels_last", False) else torch.contiguous_format
+    )
+    scaler = _make_grad_scaler(use_scaler)
+    scalers = {"G": scaler}
+
+    losses = None
+    start_epoch, start_batch = 0, 0
+
+    if resume_checkpoint is not None:
+        start_epoch, start_batch, losses, _ = _restore_training_checkpoint(
+            resume_checkpoint,
+            model,
+            None,
+            optimizer,
+            None,
+            dataloader,
+            device,
+            scalers=scalers,
+        )
+
+    is_main = is_main_process()
+    logger = TrainingLogger(output_dir, resume=resume_checkpoint is not None, enabled=is_main)
+    checkpoint_writer = CheckpointWriter(
+        os.path.join(output_dir, "checkpoints"),
+        keep_last=config.get("keep_checkpoints", 3),
+        keep_every=config.get("keep_every", 50),
+    )
+    metrics = _open_metrics(
+        ["loss", "psnr", "psnr_lanczos"], device, output_dir, saved_losses=losses
+    )
+
+    if resume_checkpoint is not None:
+        logger.log(f"Retomando da época {start_epoch + 1}, batch {start_batch}")
+
+    logger.log(f"Iniciando treinamento do upscaler {scale}x")
+    logger.log(
+        f"Dataset: {config['dataset']} | Épocas: {epochs} | Batch size: {config['batch_size']} | "
+        f"{config['img_size'] // scale}px -> {config['img_size']}px"
+    )
+
+    print("\n" + "=" * 70)
+    print(f"INICIANDO TREINAMENTO DO UPSCALER {scale}x")
+    print("=" * 70)
+
+    start_time = time.time()
+    interrupt = GracefulInterrupt()
+    samples_hr = None
+    no_value = torch.tensor(float("nan"), device=device)
+
+    with interrupt:
+        for epoch in range(start_epoch, epochs):
+            epoch_start = time.time()
+            epoch_images = 0
+            first_batch = start_batch if epoch == start_epoch else 0
+            dataloader.sampler.set_epoch(epoch, first_batch * config["batch_size"])
+            num_batches = _batches_per_epoch(dataloader)
+            model.train()
+
+            for i, data in enumerate(dataloader, start=first_batch):
+                high_res = data[0].to(device)
+                low_res = make_low_res(high_res, scale).contiguous(memory_format=memory_format)
+                epoch_images += high_res.size(0)
+
+                optimizer.zero_grad(set_to_none=True)
+                with _autocast(device, autocast_dtype):
+                    output = model(low_res)
+                loss = criterion(output.float(), high_res)
+                scaler.scale(loss).backward()
+                scaler.step(optimizer)
+                scaler.update()
+
+                if i % LOG_INTERVAL == 0:
+                    # Referência (Lanczos) só nas iterações de log: é mais cara que a rede
+                    psnr_lanczos = batch_psnr(upscale_batch(low_res, scale), high_res)
+                else:
+                    psnr_lanczos = no_value
+                metrics.update(loss, batch_psnr(output.detach(), high_res), psnr_lanczos)
+
+                if i % LOG_INTERVAL == 0:
+                    metrics.flush()
+                    m = metrics.last
+                    print(
+                        f"[{epoch+1}/{epochs}][{i}/{num_batches}] "
+                        f"Loss: {m['loss']:.4f} PSNR: {m['psnr']:.2f} dB "
+                        f"(Lanczos: {m['psnr_lanczos']:.2f} dB)"
+                    )
+
+                if interrupt_requested(interrupt, device):
+                    _save_training_checkpoint(
+                        checkpoint_writer,
+                        model,
+                        None,
+                        optimizer,
+                        None,
+                        epoch,
+                        i + 1,
+                        _history_reference(metrics),
+                        config,
+                        dataloader,
+                        None,
+                        scalers=scalers,
+                        save_epoch_file=False,
+                    )
+                    metrics.close()
+                    checkpoint_writer.close()
+                    logger.log(
+                        f"Treinamento interrompido na época {epoch + 1}, batch {i + 1}. "
+                        f"Retome com --resume {os.path.join(output_dir, 'checkpoints', 'checkpoint_latest.pth')}"
+                    )
+                    return
+
+                samples_hr = high_res[:8]
+
+            # ---------------- Fim da época ----------------
+            metrics.flush()
+            epoch_time = time.time() - epoch_start
+            elapsed_total = time.time() - start_time
+            logger.log(
+                f"Época [{epoch + 1}/{epochs}] | Loss: {metrics.mean.get('loss', float('nan')):.4f} | "
+                f"PSNR: {metrics.mean.get('psnr', float('nan')):.2f} dB | "
+                f"Tempo: {epoch_time:.2f}s | "
+                f"{epoch_images * config.get('world_size', 1) / epoch_time:.1f} img/s"
             )
 
-        remaining = estimate_remaining_time(elapsed_total, epoch + 1, epochs)
-        print(f"⏱️  Tempo restante estimado: {remaining}\n")
+            # Amostras: linhas = entrada (nearest) | Lanczos | rede | original
+            if is_main and samples_hr is not None and ((epoch + 1) % 5 == 0 or epoch == 0):
+                samples_dir = os.path.join(output_dir, "samples")
+                os.makedirs(samples_dir, exist_ok=True)
+                sample_path = os.path.join(samples_dir, f"epoch_{epoch+1}.png")
+                _save_sr_samples(_sampling_model(model), samples_hr, scale, sample_path)
+                print(f"✓ Amostras salvas: {sample_path}")
+
+            if (epoch + 1) % 10 == 0 or epoch == epochs - 1:
+                _save_training_checkpoint(
+                    checkpoint_writer,
+                    model,
+                    None,
+                    optimizer,
+                    None,
+                    epoch + 1,
+                    0,
+                    _history_reference(metrics),
+                    config,
+                    dataloader,
+                    None,
+                    scalers=scalers,
+                )
+
+            remaining = estimate_remaining_time(
+                elapsed_total, epoch + 1 - start_epoch, epochs - start_epoch
+            )
+            print(f"⏱️  Tempo restante estimado: {remaining}\n")
 
     total_time = time.time() - start_time
     logger.log(f"\n Treinamento concluído em {format_time(total_time)}")
 
-    plot_losses(losses, output_dir)
-
-    final_sample_path = os.path.join(output_dir, "final_samples.png")
-    generate_samples(generator, 64, nz, device, final_sample_path)
+    metrics.close()
+    checkpoint_writer.close()
 
     print("\n" + "=" * 70)
     print("TREINAMENTO CONCLUÍDO!")
     print("=" * 70)
     print(f"📁 Resultados salvos em: {output_dir}")
     print(f"⏱️  Tempo total: {format_time(total_time)}")
+    print(f"💡 Avalie com: python scripts/evaluate_sr.py --checkpoint "
+          f"{os.path.join(output_dir, 'checkpoints', 'checkpoint_latest.pth')}")
     print("=" * 70 + "\n")
 
 
+def _save_sr_samples(model, high_res, scale, output_path):
+    """Grid de comparação: entrada ampliada (nearest), Lanczos, rede e original"""
+    model.eval()
+    with torch.no_grad():
+        low_res = make_low_res(high_res, scale)
+        rows = [
+            F.interpolate(low_res, scale_factor=scale, mode="nearest"),
+            upscale_batch(low_res, scale),
+            model(low_res).float().clamp(-1, 1),
+            high_res.float(),
+        ]
+    model.train()
+    vutils.save_image(
+        (torch.cat(rows).cpu() + 1) / 2, output_path, nrow=high_res.size(0)
+    )
+
+
 # ====================================================================================
 # Main
 # ====================================================================================
@@ -445,6 +1832,7 @@ Exemplos de uso:
   python train.py --dataset cifar10 --model dcgan --epochs 50
   python train.py --dataset fashion-mnist --model wgan-gp --epochs 100 --batch-size 64
   python train.py --dataset mnist --model dcgan-cond --epochs 25
+  python train.py --dataset cifar10 --model sr --sr-scale 4 --epochs 20
   python train.py --list-datasets
   python train.py --list-models
         """,
@@ -460,12 +1848,17 @@ Exemplos de uso:
     parser.add_argument(
         "--model",
         type=str,
-        choices=["dcgan", "dcgan-cond", "wgan-gp"],
-        help="Tipo de modelo GAN",
+        choices=["dcgan", "dcgan-cond", "wgan-gp", "sr"],
+        help="Tipo de modelo GAN (ou 'sr': upscaler aprendido para pós-geração)",
     )
 
     # Configurações de treinamento
-    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument(
+        "--epochs",
+        type=int,
+        default=None,
+        help="Número de épocas (padrão: 50; ao retomar, o total salvo no checkpoint)",
+    )
     parser.add_argument("--batch-size", type=int, default=128)
     parser.add_argument(
         "--img-size",
@@ -506,15 +1899,172 @@ Exemplos de uso:
         default=64,
         help="Filtros do discriminador (padrão: 64). Para 256px, recomenda-se 96-128 para melhor qualidade.",
     )
+    parser.add_argument(
+        "--progressive",
+        action="store_true",
+        help="dcgan/wgan-gp: crescimento progressivo (começa em --progressive-start "
+        "e dobra a resolução com fade-in até --img-size)",
+    )
+    parser.add_argument(
+        "--progressive-start",
+        type=int,
+        choices=list(PROGRESSIVE_START_SIZES),
+        default=32,
+        help="Resolução inicial do crescimento progressivo (padrão: 32)",
+    )
+    parser.add_argument(
+        "--stage-epochs",
+        type=int,
+        default=None,
+        help="Épocas por resolução no crescimento progressivo "
+        "(padrão: épocas / (número de resoluções + 1))",
+    )
+    parser.add_argument(
+        "--critic-step",
+        type=str,
+        choices=list(CRITIC_STEPS),
+        default=None,
+        help="wgan-gp: separate (três forwards do critic, padrão) ou fused "
+        "(real/fake/interpolados num único forward; compare com "
+        "scripts/benchmark_critic_step.py)",
+    )
+    parser.add_argument(
+        "--batched-fakes",
+        action="store_true",
+        help="wgan-gp: gera as fakes dos n_critic passos numa só chamada do gerador "
+        "(as estatísticas de BatchNorm do gerador passam a ser do lote maior)",
+    )
+    parser.add_argument(
+        "--fresh-critic-batches",
+        action="store_true",
+        help="wgan-gp: cada um dos n_critic passos do critic usa um batch real diferente "
+        "(prefetch no device; a época tem n_critic x menos passos do gerador)",
+    )
+    parser.add_argument(
+        "--gp-interval",
+        type=int,
+        default=None,
+        help="wgan-gp: calcula o gradient penalty só a cada N passos do critic, "
+        "com peso multiplicado por N (padrão: 1 = todo passo)",
+    )
+    parser.add_argument(
+        "--gp-subbatch",
+        type=int,
+        default=None,
+        help="wgan-gp: amostras do batch usadas no gradient penalty (padrão: 0 = todas)",
+    )
+    parser.add_argument(
+        "--sr-scale",
+        type=int,
+        choices=[2, 4],
+        default=None,
+        help="--model sr: fator do upscaler (padrão: 2). A entrada é --img-size / fator",
+    )
+    parser.add_argument(
+        "--sr-features",
+        type=int,
+        default=None,
+        help="--model sr: filtros por camada (padrão: 32)",
+    )
+    parser.add_argument(
+        "--sr-blocks",
+        type=int,
+        default=None,
+        help="--model sr: camadas convolucionais intermediárias (padrão: 4)",
+    )
 
     # Configurações de sistema
     parser.add_argument("--dataroot", type=str, default="./data")
     parser.add_argument("--output", type=str, default="./outputs")
     parser.add_argument("--workers", type=int, default=2)
-    parser.add_argument("--ngpu", type=int, default=1)
+    parser.add_argument(
+        "--cache-dataset",
+        action="store_true",
+        help="Pré-processa o dataset uma vez (uint8 em memmap, em <dataroot>/cache) "
+        "e reutiliza nas épocas seguintes, evitando Resize PIL por amostra",
+    )
+    parser.add_argument(
+        "--preprocess",
+        type=str,
+        choices=["pil", "batched"],
+        default="pil",
+        help="pil: transforms por amostra em workers (padrão). "
+        "batched: imagens uint8 no device e resize/normalização por batch "
+        "(sem workers; apenas cifar10/mnist/fashion-mnist)",
+    )
+    parser.add_argument(
+        "--ngpu",
+        type=int,
+        default=1,
+        help="GPUs usadas por um processo único (nn.DataParallel se > 1). "
+        "Para DDP, lance com torchrun --nproc_per_node N",
+    )
+    parser.add_argument(
+        "--ddp-backend",
+        type=str,
+        choices=list(DDP_BACKENDS),
+        default=None,
+        help="Backend do torch.distributed sob torchrun (padrão: nccl com GPU, "
+        "gloo sem; gloo permite testar vários processos em CPU)",
+    )
+    parser.add_argument(
+        "--sync-bn",
+        action="store_true",
+        help="DDP: usa SyncBatchNorm (estatísticas de BN sobre o batch global; só CUDA)",
+    )
+    parser.add_argument(
+        "--amp",
+        type=str,
+        choices=list(AMP_MODES),
+        default="off",
+        help="Precisão mista: off (fp32), fp16 (CUDA, com GradScaler) ou bf16 (CUDA/CPU)",
+    )
+    parser.add_argument(
+        "--channels-last",
+        action="store_true",
+        help="Usa formato de memória channels_last (NHWC) nas convoluções",
+    )
+    parser.add_argument(
+        "--compile",
+        action="store_true",
+        help="Compila G e D com torch.compile (aquecimento antes do treino, cache em "
+        ".compile_cache; volta ao modo eager se não suportado)",
+    )
+    parser.add_argument(
+        "--compile-mode",
+        type=str,
+        choices=list(COMPILE_MODES),
+        default="default",
+        help="Modo do torch.compile (padrão: default)",
+    )
+    parser.add_argument(
+        "--captured-step",
+        action="store_true",
+        help="dcgan/dcgan-cond/wgan-gp: entradas do passo em buffers estáticos e passo "
+        "capturado em CUDA graph (sem CUDA: só os buffers pré-alocados)",
+    )
+    parser.add_argument(
+        "--keep-checkpoints",
+        type=int,
+        default=3,
+        help="Quantos checkpoints de época recentes manter (padrão: 3)",
+    )
+    parser.add_argument(
+        "--keep-every",
+        type=int,
+        default=50,
+        help="Mantém também todo checkpoint de época múltipla deste valor "
+        "(0 desativa, padrão: 50)",
+    )
 
     # Utilitários
-    parser.add_argument("--resume", type=str, default=None)
+    parser.add_argument(
+        "--resume",
+        type=str,
+        default=None,
+        help="Checkpoint para retomar o treino (ex: outputs/.../checkpoints/checkpoint_latest.pth). "
+        "Usa a configuração salva e continua no mesmo diretório de saída",
+    )
     parser.add_argument("--list-datasets", action="store_true")
     parser.add_argument("--list-models", action="store_true")
 
@@ -529,6 +2079,37 @@ Exemplos de uso:
         list_available_models()
         return
 
+    # Retomada: configuração vem do checkpoint
+    resume_checkpoint = None
+    if args.resume is not None:
+        if not os.path.exists(args.resume):
+            parser.error(f"Checkpoint não encontrado: {args.resume}")
+
+        resume_checkpoint = torch.load(args.resume, map_location="cpu")
+        saved_config = resume_checkpoint.get("config", {})
+
+        args.dataset = saved_config["dataset"]
+        args.model = saved_config["model"]
+        args.batch_size = saved_config["batch_size"]
+        args.img_size = saved_config["img_size"]
+        args.lr = saved_config["lr"]
+        args.beta1 = saved_config["beta1"]
+        args.beta2 = saved_config["beta2"]
+        args.nz = saved_config["nz"]
+        args.ngf = saved_config["ngf"]
+        args.ndf = saved_config["ndf"]
+        args.progressive = saved_config.get("progressive", False)
+        args.progressive_start = saved_config.get("progressive_start", args.progressive_start)
+        args.stage_epochs = saved_config.get("stage_epochs")
+        args.sr_scale = saved_config.get("sr_scale")
+        args.sr_features = saved_config.get("sr_features")
+        args.sr_blocks = saved_config.get("sr_blocks")
+        if args.epochs is None:
+            args.epochs = saved_config["epochs"]
+
+    if args.epochs is None:
+        args.epochs = 50
+
     # Validação básica
     if args.dataset is None or args.model is None:
         parser.error(
@@ -543,8 +2124,62 @@ Exemplos de uso:
             f"Use --img-size {MIN_RESOLUTION} ou 256 para melhores resultados."
         )
 
-    # Dispositivo
-    device, ngpu = get_device(args.ngpu)
+    # Crescimento progressivo: a resolução final precisa ser atingida
+    schedule = None
+    if args.progressive:
+        if args.model not in ("dcgan", "wgan-gp"):
+            parser.error("--progressive está disponível apenas para dcgan e wgan-gp")
+        if args.progressive_start >= args.img_size:
+            parser.error("--progressive-start deve ser menor que --img-size")
+        num_stages = int(np.log2(args.img_size // args.progressive_start)) + 1
+        if args.stage_epochs is None:
+            args.stage_epochs = max(1, args.epochs // (num_stages + 1))
+        schedule = ProgressiveSchedule(args.progressive_start, args.img_size, args.stage_epochs)
+        if schedule.final_epoch > args.epochs:
+            parser.error(
+                f"Com {num_stages} resoluções e --stage-epochs {args.stage_epochs}, "
+                f"são necessárias pelo menos {schedule.final_epoch:g} épocas"
+            )
+
+    # Gradient penalty preguiçoso
+    if args.gp_interval is not None and args.gp_interval < 1:
+        parser.error("--gp-interval deve ser >= 1")
+    if args.gp_subbatch is not None and not 0 <= args.gp_subbatch <= args.batch_size:
+        parser.error(f"--gp-subbatch deve estar entre 0 e --batch-size ({args.batch_size})")
+
+    # O modo batched já mantém o dataset inteiro em um tensor uint8 (sem cache em disco)
+    if args.preprocess == "batched" and args.cache_dataset:
+        parser.error("--cache-dataset não é compatível com --preprocess batched")
+
+    if args.compile and args.progressive:
+        parser.error(
+            "--compile não é compatível com --progressive (o alpha do fade-in muda "
+            "a cada iteração e forçaria recompilações)"
+        )
+
+    # Passo capturado: shapes fixos e sem torch.compile (que já tem seus CUDA graphs)
+    if args.captured_step:
+        if args.model == "sr":
+            parser.error("--captured-step está disponível apenas para dcgan, dcgan-cond e wgan-gp")
+        if args.progressive:
+            parser.error("--captured-step não é compatível com --progressive (shapes variáveis)")
+        if args.compile:
+            parser.error(
+                "--captured-step não é compatível com --compile "
+                "(use --compile-mode reduce-overhead para CUDA graphs com o torch.compile)"
+            )
+
+    # Treino distribuído (torchrun) e dispositivo
+    rank, world_size, local_rank = init_distributed(args.ddp_backend)
+    device, ngpu = get_device(args.ngpu, local_rank)
+    if world_size > 1:
+        print(
+            f"🌐 DDP: {world_size} processos ({dist.get_backend()}) | "
+            f"batch global: {args.batch_size * world_size} ({args.batch_size} por processo)"
+        )
+    if args.sync_bn and (world_size == 1 or device.type != "cuda"):
+        print("⚠️  --sync-bn requer DDP em GPU; usando BatchNorm comum")
+        args.sync_bn = False
 
     # Para dcgan-cond, usamos config base do dcgan
     base_model_type = "dcgan" if args.model == "dcgan-cond" else args.model
@@ -556,6 +2191,10 @@ Exemplos de uso:
         args.beta1 = model_config_defaults["default_beta1"]
     if args.beta2 is None:
         args.beta2 = model_config_defaults["default_beta2"]
+    if args.model == "sr":
+        for key in ("sr_scale", "sr_features", "sr_blocks"):
+            if getattr(args, key) is None:
+                setattr(args, key, model_config_defaults[f"default_{key}"])
 
     # Dataset
     print("\n📦 Carregando dataset...")
@@ -565,6 +2204,10 @@ Exemplos de uso:
         img_size=args.img_size,
         batch_size=args.batch_size,
         workers=args.workers,
+        cache=args.cache_dataset,
+        preprocess=args.preprocess,
+        device=device,
+        distributed=world_size > 1,
     )
     print(f"✓ Dataset carregado: {len(dataloader.dataset)} imagens")
 
@@ -584,8 +2227,16 @@ Exemplos de uso:
         "ndf": args.ndf,
         "nc": nc,
         "img_size": args.img_size,
+        "progressive": args.progressive,
     }
 
+    # D do dcgan/dcgan-cond com logits (BCEWithLogitsLoss); ao retomar um
+    # checkpoint anterior a essa opção, o D mantém o Sigmoid
+    d_logits = args.model in ("dcgan", "dcgan-cond")
+    if d_logits and resume_checkpoint is not None:
+        d_logits = resume_checkpoint["config"].get("d_logits", False)
+    model_cfg["d_logits"] = d_logits
+
     is_conditional = args.model == "dcgan-cond"
     if is_conditional:
         if num_classes is None:
@@ -595,14 +2246,35 @@ Exemplos de uso:
             )
         model_cfg["num_classes"] = num_classes
 
-    generator, discriminator_or_critic = get_model(args.model, model_cfg)
-    generator = generator.to(device)
-    discriminator_or_critic = discriminator_or_critic.to(device)
+    if args.model == "sr":
+        model_cfg.update(
+            sr_scale=args.sr_scale, sr_features=args.sr_features, sr_blocks=args.sr_blocks
+        )
+        generator, discriminator_or_critic = get_sr_model(model_cfg).to(device), None
+        if args.channels_last:
+            generator = to_channels_last(generator)
+        print(f"\n🔍 Upscaler {args.sr_scale}x: {count_parameters(generator):,} parâmetros")
+    else:
+        generator, discriminator_or_critic = get_model(args.model, model_cfg)
+        generator = generator.to(device)
+        discriminator_or_critic = discriminator_or_critic.to(device)
+
+        if args.channels_last:
+            generator = to_channels_last(generator)
+            discriminator_or_critic = to_channels_last(discriminator_or_critic)
 
-    print_model_summary(generator, discriminator_or_critic)
+        print_model_summary(generator, discriminator_or_critic)
 
-    # Diretório de saída
-    output_dir = create_output_dir(args.output, args.dataset, args.model)
+    # Diretório de saída (ao retomar, o diretório original do treino)
+    if resume_checkpoint is not None:
+        checkpoint_dir = os.path.dirname(os.path.abspath(args.resume))
+        output_dir = os.path.dirname(checkpoint_dir)
+    else:
+        # Só o rank 0 cria o diretório (o nome tem timestamp); os demais o recebem
+        output_dir = None
+        if is_main_process():
+            output_dir = create_output_dir(args.output, args.dataset, args.model)
+        output_dir = broadcast_object(output_dir)
     print(f"\n📁 Diretório de saída: {output_dir}")
 
     # Config base
@@ -620,6 +2292,14 @@ Exemplos de uso:
         "ndf": args.ndf,
         "nc": nc,
         "ngpu": ngpu,
+        "world_size": world_size,
+        "sync_bn": args.sync_bn,
+        "amp": args.amp,
+        "channels_last": args.channels_last,
+        "captured_step": args.captured_step,
+        "d_logits": d_logits,
+        "keep_checkpoints": args.keep_checkpoints,
+        "keep_every": args.keep_every,
     }
 
     # Flags específicas
@@ -627,17 +2307,114 @@ Exemplos de uso:
         config["is_conditional"] = True
         config["num_classes"] = num_classes
         config["text_conditional"] = True  # usado pelo app_gui para saber que entende prompt
+    if args.progressive:
+        config["progressive"] = True
+        config["progressive_start"] = args.progressive_start
+        config["stage_epochs"] = args.stage_epochs
+        print(
+            f"📈 Crescimento progressivo: {' → '.join(map(str, schedule.resolutions))}px, "
+            f"{args.stage_epochs} época(s) por resolução"
+        )
+    if args.model == "sr":
+        config["sr_scale"] = args.sr_scale
+        config["sr_features"] = args.sr_features
+        config["sr_blocks"] = args.sr_blocks
     if args.model == "wgan-gp":
         config["n_critic"] = model_config_defaults.get("n_critic", 5)
         config["lambda_gp"] = model_config_defaults.get("lambda_gp", 10.0)
+        config["critic_step"] = model_config_defaults.get("critic_step", "separate")
+        config["batched_fakes"] = model_config_defaults.get("batched_fakes", False)
+        config["gp_interval"] = model_config_defaults.get("gp_interval", 1)
+        config["gp_subbatch"] = model_config_defaults.get("gp_subbatch", 0)
+        # Muda o que batch_idx conta no checkpoint: ao retomar vale o do treino original
+        config["fresh_critic_batches"] = args.fresh_critic_batches or model_config_defaults.get(
+            "fresh_critic_batches", False
+        )
 
-    save_config(config, output_dir)
+    if resume_checkpoint is not None:
+        # Mantém hiperparâmetros específicos do treino original
+        for key in (
+            "n_critic",
+            "lambda_gp",
+            "critic_step",
+            "batched_fakes",
+            "gp_interval",
+            "gp_subbatch",
+            "fresh_critic_batches",
+        ):
+            if key in resume_checkpoint["config"]:
+                config[key] = resume_checkpoint["config"][key]
+
+    # Otimizações do passo do critic podem ser trocadas também ao retomar
+    if args.model == "wgan-gp":
+        if args.critic_step is not None:
+            config["critic_step"] = args.critic_step
+        if args.batched_fakes:
+            config["batched_fakes"] = True
+        if args.gp_interval is not None:
+            config["gp_interval"] = args.gp_interval
+        if args.gp_subbatch is not None:
+            config["gp_subbatch"] = args.gp_subbatch
+
+    if is_main_process():
+        save_config(config, output_dir)
+
+    # Compilação e paralelismo (os shapes de aquecimento vêm da config)
+    if args.compile:
+        generator, discriminator_or_critic = _compile_training_models(
+            generator, discriminator_or_critic, config, device, args.compile_mode
+        )
+    generator = _wrap_parallel(
+        generator,
+        device,
+        world_size,
+        ngpu,
+        sync_bn=args.sync_bn,
+        find_unused_parameters=args.progressive,
+    )
+    if discriminator_or_critic is not None:
+        discriminator_or_critic = _wrap_parallel(
+            discriminator_or_critic,
+            device,
+            world_size,
+            ngpu,
+            sync_bn=args.sync_bn,
+            find_unused_parameters=args.progressive,
+        )
 
     # Treino
     if args.model in ("dcgan", "dcgan-cond"):
-        train_dcgan(generator, discriminator_or_critic, dataloader, device, config, output_dir)
+        train_dcgan(
+            generator,
+            discriminator_or_critic,
+            dataloader,
+            device,
+            config,
+            output_dir,
+            resume_checkpoint=resume_checkpoint,
+        )
     elif args.model == "wgan-gp":
-        train_wgan_gp(generator, discriminator_or_critic, dataloader, device, config, output_dir)
+        train_wgan_gp(
+            generator,
+            discriminator_or_critic,
+            dataloader,
+            device,
+            config,
+            output_dir,
+            resume_checkpoint=resume_checkpoint,
+        )
+    elif args.model == "sr":
+        train_sr(
+            generator,
+            dataloader,
+            device,
+            config,
+            output_dir,
+            resume_checkpoint=resume_checkpoint,
+        )
+
+    cleanup_distributed()
+
 
 if __name__ == "__main__":
     main()
@@ -6,59 +6,330 @@ Funções utilitárias para treinamento e visualização
 import hashlib
 import json
 import os
+import queue
+import random
 import re
+import shutil
+import signal
+import threading
+import time
 import unicodedata
 from datetime import datetime
 
 import matplotlib.pyplot as plt
+import numpy as np
 import torch
+import torch.distributed as dist
 import torchvision.utils as vutils
 
+from checkpoint_index import find_latest_checkpoint, record_checkpoint
+from models import get_model, get_sr_model
+
 # Constantes para geração
 SEED_HASH_LENGTH = 8  # Número de caracteres do hash para gerar seed
 DEFAULT_CLASS_INDEX = 0  # Índice de classe padrão quando não encontra match
 
+# Constantes de métricas
+LOSS_HISTORY_DIRNAME = "loss_history"  # Um arquivo float32 por coluna
+LOG_INTERVAL = 50  # Iterações entre logs no console (e cópias device -> CPU)
+MAX_PLOT_POINTS = 2000  # Pontos por curva em plot_losses (após downsampling)
+COMPILE_CACHE_DIR = ".compile_cache"  # Cache em disco do torch.compile (Inductor)
+COMPILE_BENCH_STEPS = 5  # Passos cronometrados após o aquecimento do --compile
+CAPTURE_WARMUP_STEPS = 3  # Passos eager (stream lateral) antes da captura em CUDA graph
+INTERRUPT_GRACE_SECONDS = 5.0  # Sinais repetidos dentro deste intervalo contam como um só
+
 # ====================================================================================
 # Funções de salvamento e carregamento
 # ====================================================================================
 
 
-def save_checkpoint(
-    generator, discriminator, optimizerG, optimizerD, epoch, losses, config, output_dir
+def capture_rng_state():
+    """
+    Captura o estado de todos os geradores aleatórios usados no treino
+
+    Returns:
+        dicionário com estados de torch (CPU/CUDA), numpy e random (Python),
+        usando apenas tipos aceitos por torch.load(weights_only=True)
+    """
+    np_state = np.random.get_state()
+    state = {
+        "torch": torch.get_rng_state(),
+        "numpy": (
+            np_state[0],
+            torch.from_numpy(np_state[1].astype(np.int64)),
+            int(np_state[2]),
+            int(np_state[3]),
+            float(np_state[4]),
+        ),
+        "python": random.getstate(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def restore_rng_state(state):
+    """Restaura os estados capturados por capture_rng_state"""
+    torch.set_rng_state(state["torch"].cpu())
+
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all([s.cpu() for s in state["cuda"]])
+
+    name, keys, pos, has_gauss, cached = state["numpy"]
+    np.random.set_state(
+        (name, keys.cpu().numpy().astype(np.uint32), pos, has_gauss, cached)
+    )
+
+    version, internal, gauss = state["python"]
+    random.setstate((version, tuple(internal), gauss))
+
+
+def build_checkpoint(
+    generator,
+    discriminator,
+    optimizerG,
+    optimizerD,
+    epoch,
+    losses,
+    config,
+    extra_state=None,
 ):
     """
-    Salva checkpoint completo do treinamento
+    Monta o dicionário de checkpoint (inclui o estado atual dos RNGs)
 
-    Args:
-        generator: modelo do gerador
-        discriminator: modelo do discriminador/critic
-        optimizerG: otimizador do gerador
-        optimizerD: otimizador do discriminador
-        epoch: época atual
-        losses: dicionário com histórico de perdas
-        config: configurações do treinamento
-        output_dir: diretório de saída
+    Deve ser chamado no thread de treino, no ponto exato a ser retomado.
     """
     checkpoint = {
         "epoch": epoch,
         "generator_state_dict": generator.state_dict(),
-        "discriminator_state_dict": discriminator.state_dict(),
         "optimizerG_state_dict": optimizerG.state_dict(),
-        "optimizerD_state_dict": optimizerD.state_dict(),
         "losses": losses,
         "config": config,
+        "rng_state": capture_rng_state(),
     }
+    # Modelos sem discriminador (upscaler 'sr') guardam só a rede principal
+    if discriminator is not None:
+        checkpoint["discriminator_state_dict"] = discriminator.state_dict()
+    if optimizerD is not None:
+        checkpoint["optimizerD_state_dict"] = optimizerD.state_dict()
+    if extra_state:
+        checkpoint.update(extra_state)
+    return checkpoint
+
+
+def _atomic_torch_save(obj, path):
+    """torch.save em arquivo temporário + os.replace (nunca deixa arquivo parcial)"""
+    tmp_path = path + ".tmp"
+    torch.save(obj, tmp_path)
+    os.replace(tmp_path, path)
+
 
-    checkpoint_path = os.path.join(output_dir, f"checkpoint_epoch_{epoch}.pth")
-    torch.save(checkpoint, checkpoint_path)
+def _link_latest(source_path, latest_path):
+    """Aponta checkpoint_latest.pth para source_path via hardlink (cópia se não suportado)"""
+    tmp_path = latest_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(source_path, tmp_path)
+    except OSError:
+        shutil.copyfile(source_path, tmp_path)
+    os.replace(tmp_path, latest_path)
 
-    # Também salvar como "latest" para fácil retomada
+
+def write_checkpoint_files(checkpoint, output_dir, save_epoch_file=True):
+    """
+    Grava um checkpoint já montado de forma atômica
+
+    Com save_epoch_file, escreve checkpoint_epoch_N.pth uma única vez e
+    checkpoint_latest.pth vira um hardlink para ele; sem, atualiza só o latest.
+
+    Returns:
+        caminho do arquivo escrito
+    """
     latest_path = os.path.join(output_dir, "checkpoint_latest.pth")
-    torch.save(checkpoint, latest_path)
+
+    if save_epoch_file:
+        checkpoint_path = os.path.join(
+            output_dir, f"checkpoint_epoch_{checkpoint['epoch']}.pth"
+        )
+        _atomic_torch_save(checkpoint, checkpoint_path)
+        # Também disponibilizar como "latest" para fácil retomada
+        _link_latest(checkpoint_path, latest_path)
+    else:
+        checkpoint_path = latest_path
+        _atomic_torch_save(checkpoint, latest_path)
+
+    # Mantém outputs/checkpoint_index.json atualizado para a descoberta de modelos
+    record_checkpoint(latest_path, checkpoint.get("config"), checkpoint.get("epoch"))
+
+    return checkpoint_path
+
+
+def apply_checkpoint_retention(output_dir, keep_last=3, keep_every=50):
+    """
+    Remove checkpoints de época antigos
+
+    Mantém os keep_last mais recentes e todo checkpoint cuja época é múltipla
+    de keep_every. keep_last=None desativa a limpeza; keep_every=0 desativa
+    a retenção periódica. checkpoint_latest.pth nunca é afetado (hardlink).
+    """
+    if keep_last is None:
+        return
+
+    pattern = re.compile(r"^checkpoint_epoch_(\d+)\.pth$")
+    epochs = sorted(
+        int(m.group(1))
+        for m in (pattern.match(name) for name in os.listdir(output_dir))
+        if m
+    )
+
+    keep = set(epochs[-keep_last:]) if keep_last > 0 else set()
+    if keep_every:
+        keep.update(e for e in epochs if e % keep_every == 0)
+
+    for epoch in epochs:
+        if epoch not in keep:
+            try:
+                os.remove(os.path.join(output_dir, f"checkpoint_epoch_{epoch}.pth"))
+            except OSError:
+                pass
+
+
+def save_checkpoint(
+    generator,
+    discriminator,
+    optimizerG,
+    optimizerD,
+    epoch,
+    losses,
+    config,
+    output_dir,
+    extra_state=None,
+    save_epoch_file=True,
+):
+    """
+    Salva checkpoint completo do treinamento (síncrono, escrita atômica)
+
+    Args:
+        generator: modelo do gerador
+        discriminator: modelo do discriminador/critic
+        optimizerG: otimizador do gerador
+        optimizerD: otimizador do discriminador
+        epoch: época atual
+        losses: referência ao histórico de perdas ({'dir': ..., 'offset': N},
+            ver LossHistoryWriter) ou dicionário com listas (formato antigo)
+        config: configurações do treinamento
+        output_dir: diretório de saída
+        extra_state: dados adicionais para retomada (posição no dataloader etc.)
+        save_epoch_file: se False, atualiza apenas checkpoint_latest.pth
+    """
+    checkpoint = build_checkpoint(
+        generator,
+        discriminator,
+        optimizerG,
+        optimizerD,
+        epoch,
+        losses,
+        config,
+        extra_state,
+    )
+    checkpoint_path = write_checkpoint_files(checkpoint, output_dir, save_epoch_file)
 
     print(f"💾 Checkpoint salvo: {checkpoint_path}")
 
 
+def _snapshot_to_cpu(obj):
+    """Copia recursivamente todos os tensores para a CPU (desacoplados do treino)"""
+    if torch.is_tensor(obj):
+        obj = obj.detach()
+        return obj.clone() if obj.device.type == "cpu" else obj.cpu()
+    if isinstance(obj, dict):
+        return {k: _snapshot_to_cpu(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(_snapshot_to_cpu(v) for v in obj)
+    return obj
+
+
+class CheckpointWriter:
+    """
+    Salva checkpoints em segundo plano.
+
+    save() monta o checkpoint e copia os state dicts para a CPU no thread de
+    treino (rápido); a serialização e a escrita (atômica, com latest via
+    hardlink) acontecem numa thread separada, seguidas da política de
+    retenção. Erros da thread são relançados na próxima chamada.
+    """
+
+    def __init__(self, output_dir, keep_last=3, keep_every=50):
+        self.output_dir = output_dir
+        self.keep_last = keep_last
+        self.keep_every = keep_every
+        self._error = None
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        # maxsize limita quantos snapshots podem ficar em memória aguardando escrita
+        self._queue = queue.Queue(maxsize=2)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                checkpoint, save_epoch_file = item
+                path = write_checkpoint_files(checkpoint, self.output_dir, save_epoch_file)
+                apply_checkpoint_retention(self.output_dir, self.keep_last, self.keep_every)
+                print(f"💾 Checkpoint salvo: {path}")
+            except Exception as e:  # Propaga para o thread de treino
+                self._error = e
+            finally:
+                self._queue.task_done()
+
+    def _raise_pending_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError(f"Falha ao salvar checkpoint: {error}") from error
+
+    def save(
+        self,
+        generator,
+        discriminator,
+        optimizerG,
+        optimizerD,
+        epoch,
+        losses,
+        config,
+        extra_state=None,
+        save_epoch_file=True,
+    ):
+        """Mesmos argumentos de save_checkpoint (exceto output_dir); não bloqueia"""
+        self._raise_pending_error()
+        checkpoint = build_checkpoint(
+            generator,
+            discriminator,
+            optimizerG,
+            optimizerD,
+            epoch,
+            losses,
+            config,
+            extra_state,
+        )
+        self._queue.put((_snapshot_to_cpu(checkpoint), save_epoch_file))
+
+    def wait(self):
+        """Bloqueia até todos os checkpoints enfileirados estarem em disco"""
+        self._queue.join()
+        self._raise_pending_error()
+
+    def close(self):
+        self.wait()
+        self._queue.put(None)
+        self._thread.join()
+
+
 def load_checkpoint(
     checkpoint_path,
     generator,
@@ -66,25 +337,32 @@ def load_checkpoint(
     optimizerG=None,
     optimizerD=None,
     device="cpu",
+    restore_rng=False,
 ):
     """
     Carrega checkpoint do treinamento
 
     Args:
-        checkpoint_path: caminho para o checkpoint
+        checkpoint_path: caminho para o checkpoint (ou dicionário já carregado)
         generator: modelo do gerador
-        discriminator: modelo do discriminador
+        discriminator: modelo do discriminador (None para o upscaler 'sr')
         optimizerG: otimizador do gerador (opcional)
         optimizerD: otimizador do discriminador (opcional)
         device: dispositivo para carregar os modelos
+        restore_rng: se True, restaura os estados aleatórios salvos (retomada exata)
 
     Returns:
         (epoch, losses, config)
     """
-    checkpoint = torch.load(checkpoint_path, map_location=device)
+    if isinstance(checkpoint_path, dict):
+        checkpoint = checkpoint_path
+        checkpoint_path = "<memória>"
+    else:
+        checkpoint = torch.load(checkpoint_path, map_location=device)
 
     generator.load_state_dict(checkpoint["generator_state_dict"])
-    discriminator.load_state_dict(checkpoint["discriminator_state_dict"])
+    if discriminator is not None:
+        discriminator.load_state_dict(checkpoint["discriminator_state_dict"])
 
     if optimizerG is not None:
         optimizerG.load_state_dict(checkpoint["optimizerG_state_dict"])
@@ -92,6 +370,9 @@ def load_checkpoint(
     if optimizerD is not None:
         optimizerD.load_state_dict(checkpoint["optimizerD_state_dict"])
 
+    if restore_rng and "rng_state" in checkpoint:
+        restore_rng_state(checkpoint["rng_state"])
+
     epoch = checkpoint["epoch"]
     losses = checkpoint.get("losses", {"G": [], "D": []})
     config = checkpoint.get("config", {})
@@ -114,6 +395,218 @@ def save_config(config, output_dir):
     print(f"📝 Configuração salva: {config_path}")
 
 
+# ====================================================================================
+# Gerador exportado (apenas inferência)
+# ====================================================================================
+
+GENERATOR_EXPORT_FORMAT = "gan-generator/1"
+GENERATOR_EXPORT_SUFFIX = ".generator.safetensors"
+GENERATOR_EXPORT_FALLBACK_SUFFIX = ".generator.pth"
+
+
+def _torch_load_mmap(path, device):
+    """torch.load com mmap=True (lê só os tensores acessados); fallback sem mmap"""
+    try:
+        return torch.load(path, map_location=device, mmap=True)
+    except (TypeError, RuntimeError):
+        # torch < 2.1 ou arquivo no formato legado (não-zip)
+        return torch.load(path, map_location=device)
+
+
+def get_generator_export_path(checkpoint_path, use_safetensors=True):
+    """Caminho padrão do artefato exportado ao lado do checkpoint"""
+    base = checkpoint_path[: -len(".pth")] if checkpoint_path.endswith(".pth") else checkpoint_path
+    suffix = GENERATOR_EXPORT_SUFFIX if use_safetensors else GENERATOR_EXPORT_FALLBACK_SUFFIX
+    return base + suffix
+
+
+def export_generator(checkpoint_path, output_path=None, dataset_configs=None):
+    """
+    Extrai apenas o gerador (pesos + config) de um checkpoint de treino
+
+    Usa safetensors (config no metadata) se disponível; senão um .pth só com
+    o gerador. num_classes é resolvido aqui para modelos condicionais, assim
+    o artefato é autossuficiente.
+
+    Args:
+        checkpoint_path: checkpoint completo do treino
+        output_path: destino (padrão: <checkpoint>.generator.safetensors)
+        dataset_configs: DATASET_CONFIGS (para inferir num_classes de checkpoints antigos)
+
+    Returns:
+        caminho do arquivo escrito
+    """
+    checkpoint = _torch_load_mmap(checkpoint_path, "cpu")
+
+    config = dict(checkpoint.get("config", {}))
+    if is_conditional_checkpoint(checkpoint) and config.get("num_classes") is None:
+        config["num_classes"] = get_num_classes_from_checkpoint(
+            checkpoint, dataset_configs or {}
+        )
+    state_dict = {
+        k: v.contiguous() for k, v in checkpoint["generator_state_dict"].items()
+    }
+    epoch = checkpoint.get("epoch")
+    stage = checkpoint.get("progressive_stage")
+
+    try:
+        from safetensors.torch import save_file
+    except ImportError:
+        save_file = None
+
+    if output_path is None:
+        output_path = get_generator_export_path(checkpoint_path, save_file is not None)
+
+    tmp_path = output_path + ".tmp"
+    if output_path.endswith(".safetensors"):
+        if save_file is None:
+            raise ImportError("safetensors não instalado (pip install safetensors)")
+        metadata = {
+            "format": GENERATOR_EXPORT_FORMAT,
+            "config": json.dumps(config),
+            "epoch": json.dumps(epoch),
+            "progressive_stage": json.dumps(stage),
+        }
+        save_file(state_dict, tmp_path, metadata=metadata)
+    else:
+        torch.save(
+            {
+                "format": GENERATOR_EXPORT_FORMAT,
+                "generator_state_dict": state_dict,
+                "config": config,
+                "epoch": epoch,
+                "progressive_stage": stage,
+            },
+            tmp_path,
+        )
+    os.replace(tmp_path, output_path)
+
+    return output_path
+
+
+def resolve_generator_artifact(checkpoint_path):
+    """
+    Retorna o artefato exportado do checkpoint se existir e estiver atualizado
+
+    Caso contrário retorna o próprio checkpoint_path.
+    """
+    try:
+        checkpoint_mtime = os.path.getmtime(checkpoint_path)
+    except OSError:
+        return checkpoint_path
+
+    for use_safetensors in (True, False):
+        export_path = get_generator_export_path(checkpoint_path, use_safetensors)
+        try:
+            if os.path.getmtime(export_path) >= checkpoint_mtime:
+                return export_path
+        except OSError:
+            continue
+    return checkpoint_path
+
+
+def load_generator_checkpoint(path, device="cpu", prefer_export=True):
+    """
+    Carrega só o necessário para gerar imagens
+
+    Aceita o artefato exportado (.safetensors/.generator.pth, lidos via mmap)
+    ou um checkpoint completo (mmap: discriminador, otimizadores etc. não são
+    lidos do disco). Com prefer_export, usa o artefato exportado ao lado do
+    checkpoint quando estiver atualizado.
+
+    Returns:
+        dicionário no formato de checkpoint com 'generator_state_dict',
+        'config', 'epoch' e 'progressive_stage' (compatível com
+        is_conditional_checkpoint etc.)
+    """
+    if prefer_export:
+        path = resolve_generator_artifact(path)
+
+    if path.endswith(".safetensors"):
+        from safetensors import safe_open
+        from safetensors.torch import load_file
+
+        with safe_open(path, framework="pt") as f:
+            metadata = f.metadata() or {}
+        return {
+            "generator_state_dict": load_file(path, device=str(device)),
+            "config": json.loads(metadata.get("config", "{}")),
+            "epoch": json.loads(metadata.get("epoch", "null")),
+            "progressive_stage": json.loads(metadata.get("progressive_stage", "null")),
+        }
+
+    checkpoint = _torch_load_mmap(path, device)
+    return {
+        "generator_state_dict": checkpoint["generator_state_dict"],
+        "config": checkpoint.get("config", {}),
+        "epoch": checkpoint.get("epoch"),
+        "progressive_stage": checkpoint.get("progressive_stage"),
+    }
+
+
+def get_img_size_from_checkpoint(checkpoint):
+    """
+    Resolução das imagens geradas pelo checkpoint
+
+    Checkpoints de crescimento progressivo salvos antes da resolução final
+    geram na resolução da etapa em que estavam, não em config['img_size'].
+    """
+    stage = checkpoint.get("progressive_stage")
+    if stage is not None:
+        return int(stage[0])
+    return checkpoint.get("config", {}).get("img_size", 64)
+
+
+def build_generator_from_checkpoint(checkpoint, device, dataset_configs=None):
+    """
+    Instancia o gerador descrito em checkpoint['config'] e carrega os pesos
+
+    Geradores progressivos são colocados na etapa salva no checkpoint
+    (checkpoint['progressive_stage']), senão rodariam na resolução final
+    com blocos ainda não treinados.
+
+    Args:
+        checkpoint: dicionário de load_generator_checkpoint (ou checkpoint completo)
+        device: dispositivo de destino
+        dataset_configs: DATASET_CONFIGS (para inferir num_classes)
+
+    Returns:
+        gerador em modo eval
+    """
+    config = checkpoint.get("config", {})
+    model_config = {
+        "nz": config.get("nz", 100),
+        "ngf": config.get("ngf", 64),
+        "ndf": config.get("ndf", 64),
+        "nc": config.get("nc", 3),
+        "img_size": config.get("img_size", 64),
+        "progressive": config.get("progressive", False),
+    }
+    if is_conditional_checkpoint(checkpoint):
+        num_classes = get_num_classes_from_checkpoint(checkpoint, dataset_configs or {})
+        if num_classes is None:
+            raise ValueError("num_classes é obrigatório para dcgan-cond")
+        model_config["num_classes"] = num_classes
+        model_config["text_conditional"] = config.get("text_conditional", False)
+
+    generator, _ = get_model(config.get("model", "dcgan"), model_config)
+    generator.load_state_dict(checkpoint["generator_state_dict"])
+
+    stage = checkpoint.get("progressive_stage")
+    if stage is not None and hasattr(generator, "set_stage"):
+        resolution, alpha = stage
+        generator.set_stage(resolution, alpha)
+        if (resolution, alpha) != (generator.img_size, 1.0):
+            print(
+                f"⚠️  Checkpoint de etapa intermediária do crescimento progressivo: "
+                f"gerando em {resolution}px (alpha {alpha:.2f})"
+            )
+
+    generator.to(device)
+    generator.eval()
+    return generator
+
+
 # ====================================================================================
 # Funções de visualização
 # ====================================================================================
@@ -138,18 +631,29 @@ def save_image_grid(images, output_path, nrow=8, normalize=True):
     )
 
 
-def plot_losses(losses, output_dir):
+def plot_losses(losses, output_dir, max_points=MAX_PLOT_POINTS):
     """
     Plota gráfico de perdas do gerador e discriminador
 
+    Séries longas são reduzidas por downsample_series: a linha mostra a média
+    de cada balde e a faixa sombreada o mínimo/máximo.
+
     Args:
-        losses: dicionário com listas de perdas {'G': [...], 'D': [...]}
+        losses: dicionário com séries de perdas {'G': [...], 'D': [...]}
+            (listas ou arrays) ou caminho do diretório de histórico
         output_dir: diretório para salvar o gráfico
+        max_points: número máximo de pontos por curva
     """
+    if isinstance(losses, str):
+        losses = read_loss_history(losses, columns=["G", "D"])
+
     plt.figure(figsize=(10, 5))
     plt.title("Perdas do Gerador e Discriminador durante Treinamento")
-    plt.plot(losses["G"], label="Gerador", alpha=0.7)
-    plt.plot(losses["D"], label="Discriminador", alpha=0.7)
+    for key, label in (("G", "Gerador"), ("D", "Discriminador")):
+        x, mean, low, high = downsample_series(losses[key], max_points)
+        line = plt.plot(x, mean, label=label, alpha=0.7)[0]
+        if len(mean) < len(losses[key]):
+            plt.fill_between(x, low, high, color=line.get_color(), alpha=0.15)
     plt.xlabel("Iterações")
     plt.ylabel("Perda")
     plt.legend()
@@ -162,10 +666,13 @@ def plot_losses(losses, output_dir):
     print(f"📊 Gráfico de perdas salvo: {plot_path}")
 
 
-def generate_samples(generator, num_samples, nz, device, output_path, nrow=8):
+def generate_samples(generator, num_samples, nz, device, output_path, nrow=8, batch_size=256):
     """
     Gera amostras do gerador e salva como grid
 
+    A geração é feita em micro-batches de batch_size (evita OOM com muitas
+    amostras); para milhares de imagens em arquivos use batch_generate.py.
+
     Args:
         generator: modelo do gerador
         num_samples: número de amostras a gerar
@@ -173,13 +680,212 @@ def generate_samples(generator, num_samples, nz, device, output_path, nrow=8):
         device: dispositivo (CPU/GPU)
         output_path: caminho para salvar a imagem
         nrow: número de imagens por linha
+        batch_size: tamanho máximo de cada forward
     """
     with torch.no_grad():
         noise = torch.randn(num_samples, nz, 1, 1, device=device)
-        fake_images = generator(noise).detach().cpu()
+        fake_images = torch.cat(
+            [generator(chunk).detach().cpu() for chunk in noise.split(batch_size)]
+        )
         save_image_grid(fake_images, output_path, nrow=nrow)
 
 
+# ====================================================================================
+# Upscaling em batch
+# ====================================================================================
+
+UPSCALE_BATCH_METHODS = ("lanczos", "bicubic", "bilinear", "nearest")
+
+def _resample_filter(method):
+    """(função do filtro, suporte) com as mesmas definições do PIL"""
+
+    def bicubic(x):
+        a = -0.5
+        x = x.abs()
+        return torch.where(
+            x < 1,
+            ((a + 2) * x - (a + 3)) * x * x + 1,
+            torch.where(x < 2, (((x - 5) * x + 8) * x - 4) * a, torch.zeros_like(x)),
+        )
+
+    def lanczos(x):
+        return torch.where(x.abs() < 3, torch.sinc(x) * torch.sinc(x / 3), torch.zeros_like(x))
+
+    def bilinear(x):
+        return (1 - x.abs()).clamp(min=0)
+
+    filters = {"bicubic": (bicubic, 2.0), "lanczos": (lanczos, 3.0), "bilinear": (bilinear, 1.0)}
+    return filters[method]
+
+
+def resample_matrix(in_size, out_size, method, device=None):
+    """
+    Matriz (out_size, in_size) de reamostragem 1D equivalente à do PIL
+
+    Mesma janela, centro de pixel e renormalização nas bordas que
+    Image.resize usa; aplicada em H e W ela reproduz o resize do PIL sem a
+    quantização intermediária para uint8.
+    """
+    kernel, support = _resample_filter(method)
+    scale = in_size / out_size
+    filterscale = max(scale, 1.0)
+    support = support * filterscale
+
+    centers = (torch.arange(out_size, dtype=torch.float64) + 0.5) * scale
+    positions = torch.arange(in_size, dtype=torch.float64) + 0.5
+    weights = kernel((positions[None, :] - centers[:, None]) / filterscale)
+
+    # Janela [center - support, center + support) arredondada como no PIL
+    xmin = (centers - support + 0.5).floor().clamp(min=0)
+    xmax = (centers + support + 0.5).floor().clamp(max=in_size)
+    index = torch.arange(in_size, dtype=torch.float64)
+    window = (index[None, :] >= xmin[:, None]) & (index[None, :] < xmax[:, None])
+    weights = weights * window
+    weights = weights / weights.sum(dim=1, keepdim=True)
+    return weights.to(device=device, dtype=torch.float32)
+
+
+def sharpen_batch(images, factor):
+    """
+    Equivalente a ImageEnhance.Sharpness(img).enhance(factor) para um batch
+
+    O PIL mistura a imagem com uma versão suavizada pelo kernel SMOOTH
+    ([[1,1,1],[1,5,1],[1,1,1]] / 13), que é a soma 3x3 mais 4x o pixel
+    central; a soma é feita com somas deslocadas (bem mais rápido que uma
+    convolução depthwise na CPU).
+
+    Args:
+        images: tensor (N, C, H, W) em [0, 1]
+        factor: 1.0 = original, >1.0 = mais nítido
+
+    Returns:
+        tensor (N, C, H, W) em [0, 1]
+    """
+    if factor == 1.0:
+        return images
+    # Soma 3x3 com somas deslocadas, feitas no lugar (poucas passadas na memória)
+    rows = images[..., :-2, :] + images[..., 1:-1, :]
+    rows += images[..., 2:, :]
+    box = rows[..., :-2] + rows[..., 1:-1]
+    box += rows[..., 2:]
+
+    # factor * x + (1 - factor) * (box + 4x) / 13, como ImageEnhance (blend)
+    inner = images[..., 1:-1, 1:-1]
+    box.mul_((1 - factor) / 13).add_(inner, alpha=factor + 4 * (1 - factor) / 13)
+
+    # Como no PIL, a borda de 1 pixel não é filtrada
+    out = images.clone()
+    out[..., 1:-1, 1:-1] = box
+    return out.clamp_(0, 1)
+
+
+def upscale_batch(images, scale_factor, method="lanczos", sharpen=1.0):
+    """
+    Upscaling de um batch inteiro de uma vez (GPU ou CPU)
+
+    lanczos/bicubic/bilinear usam matrizes de reamostragem com os filtros do
+    PIL (resultado equivalente ao caminho PIL por imagem, a menos do
+    arredondamento para uint8 entre as etapas); nearest replica pixels.
+
+    Args:
+        images: tensor (N, C, H, W) em [-1, 1]
+        scale_factor: fator inteiro (2, 4, 8...)
+        method: 'lanczos', 'bicubic', 'bilinear' ou 'nearest'
+        sharpen: fator de nitidez (1.0 = sem alteração)
+
+    Returns:
+        tensor (N, C, H*scale, W*scale) em [-1, 1], no mesmo device
+    """
+    if scale_factor == 1 and sharpen == 1.0:
+        return images
+
+    x = ((images.float() + 1) / 2).clamp(0, 1)
+    height, width = x.shape[-2:]
+
+    if scale_factor != 1:
+        if method == "nearest":
+            x = torch.nn.functional.interpolate(x, scale_factor=scale_factor, mode="nearest")
+        else:
+            rows = resample_matrix(height, height * scale_factor, method, x.device)
+            cols = resample_matrix(width, width * scale_factor, method, x.device)
+            # Mesma ordem do PIL (horizontal e depois vertical), com o corte
+            # em [0, 1] entre as passadas que o PIL faz ao voltar para uint8
+            x = (x @ cols.T).clamp_(0, 1)
+            x = (rows @ x).clamp_(0, 1)
+
+    x = sharpen_batch(x, sharpen)
+    return x * 2 - 1
+
+
+def load_sr_model(path, device="cpu"):
+    """
+    Carrega o upscaler aprendido (train.py --model sr) em modo eval
+
+    Aceita o checkpoint de treino ou o artefato exportado por export_generator.py.
+    """
+    checkpoint = load_generator_checkpoint(path, device)
+    config = checkpoint.get("config", {})
+    if config.get("model") != "sr":
+        raise ValueError(f"{path} não é um checkpoint do upscaler (--model sr)")
+
+    model = get_sr_model(config)
+    model.load_state_dict(checkpoint["generator_state_dict"])
+    model.to(device)
+    model.eval()
+    return model
+
+
+def resolve_sr_checkpoint(sr_checkpoint, dataset_name, root="outputs"):
+    """
+    Caminho do upscaler: o informado ou o mais recente treinado no mesmo dataset
+    """
+    if sr_checkpoint is None:
+        sr_checkpoint = find_latest_checkpoint(root, dataset=dataset_name, sr=True)
+        if sr_checkpoint is None:
+            raise FileNotFoundError(
+                f"Nenhum upscaler treinado para '{dataset_name}'. Treine com "
+                f"python train.py --dataset {dataset_name} --model sr, ou informe --sr-checkpoint"
+            )
+    elif not os.path.exists(sr_checkpoint):
+        raise FileNotFoundError(f"Checkpoint do upscaler não encontrado: {sr_checkpoint}")
+    return sr_checkpoint
+
+
+def upscale_learned(images, sr_model, scale_factor, batch_size=64):
+    """
+    Upscaling com o upscaler aprendido
+
+    Aplica a rede enquanto o fator restante for múltiplo da escala dela
+    (ex: 8x com um modelo 2x = três passadas); o que sobrar usa Lanczos.
+
+    Args:
+        images: tensor (N, C, H, W) em [-1, 1]
+        sr_model: modelo de load_sr_model
+        scale_factor: fator inteiro total
+        batch_size: imagens por forward
+
+    Returns:
+        tensor (N, C, H*scale, W*scale) em [-1, 1], no device do modelo
+    """
+    if images.size(1) != sr_model.nc:
+        raise ValueError(
+            f"O upscaler espera {sr_model.nc} canal(is), imagens têm {images.size(1)}"
+        )
+
+    device = next(sr_model.parameters()).device
+    x = images.to(device)
+    remaining = scale_factor
+    with torch.inference_mode():
+        while remaining % sr_model.scale == 0 and remaining > 1:
+            x = torch.cat(
+                [sr_model(chunk).clamp_(-1, 1) for chunk in x.split(batch_size)]
+            )
+            remaining //= sr_model.scale
+    if remaining > 1:
+        x = upscale_batch(x, remaining, method="lanczos")
+    return x
+
+
 # ====================================================================================
 # Funções de logging
 # ====================================================================================
@@ -188,17 +894,25 @@ def generate_samples(generator, num_samples, nz, device, output_path, nrow=8):
 class TrainingLogger:
     """Logger para acompanhar progresso do treinamento"""
 
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, resume=False, enabled=True):
         self.output_dir = output_dir
         self.log_file = os.path.join(output_dir, "training.log")
-
-        # Criar arquivo de log
-        with open(self.log_file, "w") as f:
-            f.write(f"Treinamento iniciado em: {datetime.now()}\n")
+        self.enabled = enabled  # False nos processos não principais (DDP)
+        if not enabled:
+            return
+
+        # Criar arquivo de log (ou continuar o existente ao retomar)
+        with open(self.log_file, "a" if resume else "w") as f:
+            if resume:
+                f.write(f"\nTreinamento retomado em: {datetime.now()}\n")
+            else:
+                f.write(f"Treinamento iniciado em: {datetime.now()}\n")
             f.write("=" * 70 + "\n\n")
 
     def log(self, message, print_console=True):
         """Registra mensagem no log e opcionalmente imprime"""
+        if not self.enabled:
+            return
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_message = f"[{timestamp}] {message}"
 
@@ -210,16 +924,574 @@ class TrainingLogger:
         if print_console:
             print(log_message)
 
-    def log_epoch(self, epoch, total_epochs, loss_G, loss_D, elapsed_time):
+    def log_epoch(
+        self, epoch, total_epochs, loss_G, loss_D, elapsed_time, images_per_sec=None
+    ):
         """Registra informações de uma época"""
         message = (
             f"Época [{epoch}/{total_epochs}] | "
             f"Loss_G: {loss_G:.4f} | Loss_D: {loss_D:.4f} | "
             f"Tempo: {elapsed_time:.2f}s"
         )
+        if images_per_sec is not None:
+            message += f" | {images_per_sec:.1f} img/s"
         self.log(message)
 
 
+class GracefulInterrupt:
+    """
+    Context manager que transforma o primeiro Ctrl+C (ou SIGTERM) em um pedido de parada.
+
+    O loop de treino consulta `requested` entre iterações (via
+    interrupt_requested) e salva um checkpoint consistente antes de sair.
+    Sinais repetidos nos primeiros INTERRUPT_GRACE_SECONDS são o mesmo pedido
+    (sob torchrun, cada worker recebe o Ctrl+C do terminal e logo depois o
+    repasse do agente); um novo sinal depois disso interrompe imediatamente.
+    """
+
+    SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+    def __init__(self):
+        self.requested = False
+        self._requested_at = None
+        self._previous_handlers = {}
+        # Estado do all-reduce assíncrono de interrupt_requested (DDP)
+        self._flag = None
+        self._work = None
+
+    def _handler(self, signum, frame):
+        now = time.monotonic()
+        if self.requested:
+            if now - self._requested_at < INTERRUPT_GRACE_SECONDS:
+                return
+            raise KeyboardInterrupt
+        self.requested = True
+        self._requested_at = now
+        print("\n⏸️  Interrupção solicitada: salvando checkpoint ao fim da iteração...")
+
+    def __enter__(self):
+        for signum in self.SIGNALS:
+            self._previous_handlers[signum] = signal.signal(signum, self._handler)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._work is not None:
+            self._work.wait()
+            self._work = None
+        for signum, handler in self._previous_handlers.items():
+            signal.signal(signum, handler)
+        return False
+
+
+# ====================================================================================
+# Treino distribuído (DDP)
+# ====================================================================================
+
+
+_INTERRUPT_GROUP = None  # Criado por init_distributed
+
+
+def init_distributed(backend=None):
+    """
+    Inicializa torch.distributed quando o script é lançado pelo torchrun
+
+    Lê RANK/WORLD_SIZE/LOCAL_RANK do ambiente; sem eles (ou com um único
+    processo) não faz nada. O backend padrão é 'nccl' com GPU e 'gloo' sem
+    (gloo permite testar vários processos em CPU numa só máquina).
+
+    Returns:
+        (rank, world_size, local_rank)
+    """
+    world_size = int(os.environ.get("WORLD_SIZE", 1))
+    if world_size <= 1:
+        return 0, 1, 0
+
+    rank = int(os.environ["RANK"])
+    local_rank = int(os.environ.get("LOCAL_RANK", 0))
+    if backend is None:
+        backend = "nccl" if torch.cuda.is_available() else "gloo"
+    if backend == "nccl":
+        torch.cuda.set_device(local_rank)
+    dist.init_process_group(backend=backend)
+
+    # Grupo gloo (tensores de CPU) para o pedido de interrupção, fora do stream da GPU
+    global _INTERRUPT_GROUP
+    _INTERRUPT_GROUP = dist.new_group(backend="gloo")
+
+    if rank != 0:
+        _silence_print()
+    return rank, world_size, local_rank
+
+
+def _silence_print():
+    """Desliga print() neste processo (exceto com force=True): só o rank 0 fala"""
+    import builtins
+
+    builtin_print = builtins.print
+
+    def print(*args, force=False, **kwargs):
+        if force:
+            builtin_print(*args, **kwargs)
+
+    builtins.print = print
+
+
+def cleanup_distributed():
+    """Encerra o grupo de processos (se houver)"""
+    if dist.is_available() and dist.is_initialized():
+        dist.destroy_process_group()
+
+
+def is_main_process():
+    """True no rank 0 ou fora de treino distribuído"""
+    return not (dist.is_available() and dist.is_initialized()) or dist.get_rank() == 0
+
+
+def broadcast_object(obj):
+    """Valor de obj no rank 0, repassado a todos os processos"""
+    if not (dist.is_available() and dist.is_initialized()):
+        return obj
+    holder = [obj]
+    dist.broadcast_object_list(holder, src=0)
+    return holder[0]
+
+
+def unwrap_model(model):
+    """Módulo original por trás de DistributedDataParallel/DataParallel/torch.compile"""
+    while True:
+        if isinstance(model, (torch.nn.DataParallel, torch.nn.parallel.DistributedDataParallel)):
+            model = model.module
+        elif hasattr(model, "_orig_mod"):
+            model = model._orig_mod
+        else:
+            return model
+
+
+def interrupt_requested(interrupt, device):
+    """
+    interrupt.requested combinado entre os processos, consultado a cada iteração
+
+    Em DDP todos os processos precisam parar na mesma iteração (senão os
+    demais ficam presos no all-reduce dos gradientes); basta um deles ter
+    recebido o sinal. Cada chamada conclui o all-reduce assíncrono iniciado
+    na anterior e inicia o próximo com o estado local, então a parada chega
+    no máximo uma iteração depois do sinal, sem esperar pela rede a cada
+    passo. O all-reduce usa tensores de CPU no grupo gloo de
+    init_distributed, sem sincronizar com a GPU.
+    """
+    if not (dist.is_available() and dist.is_initialized()):
+        return interrupt.requested
+
+    requested = False
+    if interrupt._work is not None:
+        interrupt._work.wait()
+        requested = bool(interrupt._flag.item())
+        interrupt._work = None
+
+    # Todos os processos veem o mesmo resultado: ou todos param, ou todos seguem
+    if not requested:
+        if _INTERRUPT_GROUP is not None:
+            interrupt._flag = torch.tensor(float(interrupt.requested))
+        else:
+            interrupt._flag = torch.tensor(float(interrupt.requested), device=device)
+        interrupt._work = dist.all_reduce(
+            interrupt._flag, op=dist.ReduceOp.MAX, group=_INTERRUPT_GROUP, async_op=True
+        )
+    return requested
+
+
+# ====================================================================================
+# torch.compile (--compile)
+# ====================================================================================
+
+
+def enable_compile_cache(cache_dir=COMPILE_CACHE_DIR):
+    """
+    Ativa o cache em disco do Inductor (grafos FX e autograd compilados)
+
+    Execuções seguintes com os mesmos modelos e shapes reutilizam o código
+    gerado em vez de recompilar. Variáveis TORCHINDUCTOR_* definidas pelo
+    usuário têm prioridade.
+    """
+    # O import do torchvision já fixa o diretório padrão (temporário) no
+    # ambiente; só um valor diferente dele foi escolhido pelo usuário
+    current = os.environ.get("TORCHINDUCTOR_CACHE_DIR")
+    try:
+        from torch._inductor.runtime.cache_dir_utils import default_cache_dir
+
+        default = os.path.abspath(default_cache_dir())
+    except ImportError:
+        default = None
+    if current is None or os.path.abspath(current) == default:
+        os.environ["TORCHINDUCTOR_CACHE_DIR"] = os.path.abspath(cache_dir)
+    os.environ.setdefault("TORCHINDUCTOR_FX_GRAPH_CACHE", "1")
+    os.environ.setdefault("TORCHINDUCTOR_AUTOGRAD_CACHE", "1")
+    try:
+        import torch._inductor.config as inductor_config
+
+        inductor_config.fx_graph_cache = os.environ["TORCHINDUCTOR_FX_GRAPH_CACHE"] == "1"
+    except (ImportError, AttributeError):
+        pass
+
+
+def _time_steps(step, device, steps):
+    """Tempo médio (ms) de step() após uma chamada de aquecimento"""
+    step()
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+    start = time.perf_counter()
+    for _ in range(steps):
+        step()
+    if device.type == "cuda":
+        torch.cuda.synchronize(device)
+    return (time.perf_counter() - start) * 1000 / steps
+
+
+def compile_model(
+    model,
+    example_inputs,
+    train=False,
+    inference_mode=False,
+    mode=None,
+    autocast_dtype=None,
+    name="modelo",
+):
+    """
+    torch.compile com aquecimento, voltando ao modo eager se não suportado
+
+    A compilação do PyTorch é preguiçosa (acontece na primeira chamada); aqui
+    ela é disparada com example_inputs, nos shapes do uso real, e cronometrada
+    à parte do passo em regime. Estatísticas de BatchNorm, gradientes e o
+    estado aleatório tocados pelo aquecimento são restaurados.
+
+    Args:
+        model: módulo a compilar
+        example_inputs: tupla de argumentos do forward
+        train: aquece também o backward (treino); senão roda sob no_grad
+        inference_mode: roda sob torch.inference_mode (como o uso real; o
+            grafo compilado para no_grad não serve para inference_mode)
+        mode: modo do torch.compile (None, 'reduce-overhead', 'max-autotune')
+        autocast_dtype: dtype do autocast usado no uso real (None = fp32); o
+            grafo compilado depende dele
+        name: nome exibido no relatório de tempos
+
+    Returns:
+        modelo compilado, ou o próprio model em caso de falha
+    """
+    if not hasattr(torch, "compile"):
+        print("⚠️  torch.compile indisponível (requer PyTorch 2.x); usando modo eager")
+        return model
+
+    device = example_inputs[0].device
+    buffers = [b.detach().clone() for b in model.buffers()]
+    compiled = torch.compile(model, mode=mode)
+
+    def make_step(module):
+        def step():
+            grad_mode = torch.inference_mode() if inference_mode else torch.set_grad_enabled(train)
+            with grad_mode, torch.autocast(
+                device_type=device.type,
+                dtype=autocast_dtype,
+                enabled=autocast_dtype is not None,
+            ):
+                output = module(*example_inputs)
+                if train:
+                    output.float().sum().backward()
+
+        return step
+
+    cuda_devices = [device.index or 0] if device.type == "cuda" else []
+    try:
+        with torch.random.fork_rng(devices=cuda_devices):
+            eager_ms = _time_steps(make_step(model), device, COMPILE_BENCH_STEPS)
+
+            start = time.perf_counter()
+            make_step(compiled)()
+            if device.type == "cuda":
+                torch.cuda.synchronize(device)
+            compile_s = time.perf_counter() - start
+
+            compiled_ms = _time_steps(make_step(compiled), device, COMPILE_BENCH_STEPS)
+    except Exception as e:  # Backend/compilador ausente, operação não suportada...
+        print(f"⚠️  torch.compile falhou para {name} ({type(e).__name__}: {e}); usando modo eager")
+        compiled = model
+    else:
+        print(
+            f"⚙️  torch.compile ({name}): compilação {compile_s:.1f}s | passo "
+            f"{compiled_ms:.2f} ms (eager {eager_ms:.2f} ms, {eager_ms / compiled_ms:.2f}x)"
+        )
+    finally:
+        with torch.no_grad():
+            for buffer, saved in zip(model.buffers(), buffers):
+                buffer.copy_(saved)
+        model.zero_grad(set_to_none=True)
+
+    return compiled
+
+
+def compile_generator(
+    generator, config, device, batch_size, conditional=False, inference_mode=False, mode=None
+):
+    """
+    --compile dos scripts de geração: compila o gerador (inferência) no
+    batch que será usado, com o cache em disco ativado
+    """
+    enable_compile_cache()
+    with torch.inference_mode(inference_mode):
+        inputs = (torch.randn(batch_size, config.get("nz", 100), 1, 1, device=device),)
+        if conditional:
+            inputs += (torch.zeros(batch_size, dtype=torch.long, device=device),)
+    return compile_model(
+        generator, inputs, inference_mode=inference_mode, mode=mode, name="gerador"
+    )
+
+
+# ====================================================================================
+# Passo capturado (--captured-step)
+# ====================================================================================
+
+
+class CapturedStep:
+    """
+    Passo de treino com entradas estáticas, capturado num CUDA graph
+
+    fn() executa um passo completo (forward, backward e optimizer.step) lendo
+    apenas tensores pré-alocados, que o chamador preenche no lugar (copy_,
+    normal_, random_) antes de cada chamada, e retorna tensores (perdas e
+    métricas). Com CUDA, as primeiras chamadas rodam em eager num stream
+    lateral (aquecimento: estado do otimizador, cuDNN), a seguinte é
+    capturada e as demais só fazem replay do grafo, sem overhead de Python
+    nem de lançamento de kernels. Sem CUDA (ou se a captura falhar), fn é
+    simplesmente chamada, reaproveitando os mesmos buffers.
+
+    Após a captura os tensores retornados são sempre os mesmos (sobrescritos
+    a cada replay): copie-os se precisar guardá-los. Os otimizadores usados
+    em fn precisam de capturable=True.
+    """
+
+    def __init__(self, fn, device, use_graph=True, warmup_steps=CAPTURE_WARMUP_STEPS, name="passo"):
+        self.fn = fn
+        self.device = torch.device(device)
+        self.use_graph = use_graph and self.device.type == "cuda"
+        self.warmup_steps = warmup_steps
+        self.name = name
+        self.graph = None
+        self.outputs = None
+        self.calls = 0
+
+    def __call__(self):
+        if self.graph is not None:
+            self.graph.replay()
+            return self.outputs
+        if not self.use_graph:
+            return self.fn()
+
+        self.calls += 1
+        current = torch.cuda.current_stream(self.device)
+        if self.calls <= self.warmup_steps:
+            stream = torch.cuda.Stream(self.device)
+            stream.wait_stream(current)
+            with torch.cuda.stream(stream):
+                outputs = self.fn()
+            current.wait_stream(stream)
+            return outputs
+
+        graph = torch.cuda.CUDAGraph()
+        try:
+            with torch.cuda.graph(graph):
+                outputs = self.fn()
+        except Exception as e:
+            print(
+                f"⚠️  Captura em CUDA graph ({self.name}) falhou "
+                f"({type(e).__name__}: {e}); seguindo sem captura"
+            )
+            self.use_graph = False
+            return self.fn()
+
+        # A captura só grava os kernels: o replay executa o passo atual
+        self.graph, self.outputs = graph, outputs
+        graph.replay()
+        print(f"⚙️  Passo capturado em CUDA graph ({self.name})")
+        return outputs
+
+
+# ====================================================================================
+# Métricas por iteração
+# ====================================================================================
+
+class LossHistoryWriter:
+    """
+    Grava o histórico por iteração em arquivos colunares append-only.
+
+    Cada coluna vira um arquivo `<coluna>.f32` (float32 cru) dentro de
+    history_dir, com os nomes das colunas em meta.json. O registro N de todas
+    as colunas fica no offset N * 4 bytes, então um checkpoint só precisa
+    guardar o número de registros (offset). A escrita acontece numa thread
+    separada para não bloquear o loop de treino. Com history_dir=None nada é
+    gravado (processos não principais em treino distribuído).
+    """
+
+    def __init__(self, history_dir, columns, start_record=0):
+        self.history_dir = history_dir
+        self.columns = list(columns)
+        self.num_records = start_record
+
+        if history_dir is not None:
+            os.makedirs(history_dir, exist_ok=True)
+            with open(os.path.join(history_dir, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"columns": self.columns, "dtype": "float32"}, f)
+
+        # Ao retomar, descarta registros posteriores ao checkpoint
+        self._files = []
+        for name in self.columns if history_dir is not None else ():
+            path = os.path.join(history_dir, f"{name}.f32")
+            f = open(path, "r+b" if os.path.exists(path) else "wb")
+            f.truncate(start_record * 4)
+            f.seek(0, os.SEEK_END)
+            self._files.append(f)
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            rows = self._queue.get()
+            try:
+                if rows is None:
+                    return
+                for f, values in zip(self._files, np.asarray(rows, dtype=np.float32).T):
+                    f.write(np.ascontiguousarray(values).tobytes())
+                    f.flush()
+            finally:
+                self._queue.task_done()
+
+    def append(self, rows):
+        """Enfileira linhas [n, len(columns)] para escrita assíncrona"""
+        self.num_records += len(rows)
+        self._queue.put(rows)
+
+    def flush(self):
+        """Bloqueia até todas as linhas enfileiradas estarem nos arquivos"""
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        for f in self._files:
+            f.close()
+
+
+def read_loss_history(history_dir, columns=None):
+    """
+    Abre o histórico gravado por LossHistoryWriter sem carregá-lo na memória
+
+    Args:
+        history_dir: diretório do histórico (ex: <run>/loss_history)
+        columns: colunas desejadas (padrão: todas)
+
+    Returns:
+        dicionário {coluna: np.memmap float32 (somente leitura)}
+    """
+    with open(os.path.join(history_dir, "meta.json"), "r", encoding="utf-8") as f:
+        all_columns = json.load(f)["columns"]
+
+    history = {}
+    for name in columns or all_columns:
+        path = os.path.join(history_dir, f"{name}.f32")
+        if os.path.getsize(path) == 0:
+            history[name] = np.zeros(0, dtype=np.float32)  # memmap vazio não é permitido
+        else:
+            history[name] = np.memmap(path, dtype=np.float32, mode="r")
+    return history
+
+
+def downsample_series(values, max_points=MAX_PLOT_POINTS):
+    """
+    Reduz uma série longa a no máximo ~max_points baldes
+
+    Opera em blocos sobre o array (inclusive memmap), sem converter para
+    floats Python.
+
+    Returns:
+        (x, mean, low, high) - posição central, média, mínimo e máximo por balde
+    """
+    values = np.asarray(values, dtype=np.float32)
+    n = len(values)
+
+    if n <= max_points:
+        x = np.arange(n)
+        return x, values, values, values
+
+    bucket = int(np.ceil(n / max_points))
+    usable = (n // bucket) * bucket
+    blocks = values[:usable].reshape(-1, bucket)
+
+    mean = blocks.mean(axis=1)
+    low = blocks.min(axis=1)
+    high = blocks.max(axis=1)
+    x = np.arange(len(mean)) * bucket + (bucket - 1) / 2
+
+    if usable < n:  # Sobra final (balde incompleto)
+        tail = values[usable:]
+        mean = np.append(mean, tail.mean())
+        low = np.append(low, tail.min())
+        high = np.append(high, tail.max())
+        x = np.append(x, usable + (n - usable - 1) / 2)
+
+    return x, mean, low, high
+
+
+class MetricsAccumulator:
+    """
+    Acumula métricas por iteração no próprio device, sem .item() a cada passo.
+
+    update() apenas copia os valores (tensores 0-dim) para um buffer
+    [LOG_INTERVAL, n_métricas] no device. flush() faz uma única cópia para a
+    CPU, envia as linhas ao LossHistoryWriter e atualiza `last`/`mean`; deve ser
+    chamado no intervalo de log e no fim da época.
+    """
+
+    def __init__(self, columns, device, history_dir, start_record=0):
+        self.columns = list(columns)
+        self.buffer = torch.zeros(LOG_INTERVAL, len(self.columns), device=device)
+        self.count = 0
+        self.last = {}
+        self.mean = {}
+        self.writer = LossHistoryWriter(history_dir, self.columns, start_record)
+
+    @property
+    def num_records(self):
+        return self.writer.num_records + self.count
+
+    def update(self, *values):
+        """Registra uma iteração (um tensor por coluna, na ordem de `columns`)"""
+        if self.count == self.buffer.size(0):
+            self.flush()
+        self.buffer[self.count] = torch.stack([v.detach().float() for v in values])
+        self.count += 1
+
+    def flush(self):
+        """Transfere as iterações acumuladas para a CPU e para o arquivo"""
+        if self.count == 0:
+            return
+        rows = self.buffer[: self.count].cpu().numpy()
+        self.count = 0
+
+        self.writer.append(rows)
+        self.last = dict(zip(self.columns, rows[-1].tolist()))
+        self.mean = dict(zip(self.columns, rows.mean(axis=0).tolist()))
+
+    def sync(self):
+        """flush() + espera a escrita em disco (antes de salvar checkpoints)"""
+        self.flush()
+        self.writer.flush()
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
 # ====================================================================================
 # Funções de utilidade
 # ====================================================================================
@@ -247,22 +1519,25 @@ def create_output_dir(base_dir, dataset_name, model_type):
     return output_dir
 
 
-def get_device(ngpu=1):
+def get_device(ngpu=1, local_rank=0):
     """
     Detecta e retorna o melhor dispositivo disponível
 
     Args:
         ngpu: número de GPUs solicitadas
+        local_rank: índice da GPU deste processo (treino distribuído)
 
     Returns:
         (device, ngpu_actual)
     """
     if torch.cuda.is_available() and ngpu > 0:
-        device = torch.device("cuda:0")
+        device = torch.device(f"cuda:{local_rank}")
+        torch.cuda.set_device(device)
         ngpu_actual = min(ngpu, torch.cuda.device_count())
-        print(f"✓ GPU detectada! Usando: {torch.cuda.get_device_name(0)}")
+        print(f"✓ GPU detectada! Usando: {torch.cuda.get_device_name(device)}")
         print(
-            f"  Memória total: {torch.cuda.get_device_properties(0).total_memory / 1e9:.2f} GB"
+            f"  Memória total: "
+            f"{torch.cuda.get_device_properties(device).total_memory / 1e9:.2f} GB"
         )
     else:
         device = torch.device("cpu")
@@ -489,3 +1764,30 @@ def get_num_classes_from_checkpoint(checkpoint, dataset_configs):
             num_classes = len(classes)
     
     return num_classes
+
+
+def seeded_noise(indices, base_seed, nz, device):
+    """
+    Ruído (len(indices), nz, 1, 1) onde a linha k depende só de base_seed + indices[k]
+
+    Args:
+        indices: índices globais das imagens
+        base_seed: seed base
+        nz: tamanho do vetor de ruído
+        device: dispositivo de destino
+
+    Returns:
+        tensor de ruído no device
+    """
+    gen = torch.Generator()
+    noise = torch.empty(len(indices), nz, 1, 1)
+    for row, idx in enumerate(indices):
+        gen.manual_seed(base_seed + int(idx))
+        torch.randn(nz, 1, 1, generator=gen, out=noise[row])
+    return noise.to(device, non_blocking=True)
+
+
+def to_uint8_nhwc(images):
+    """Converte imagens em [-1, 1] (N, C, H, W) para uint8 (N, H, W, C) na CPU"""
+    images = ((images.float() + 1) * 127.5).round_().clamp_(0, 255).to(torch.uint8)
+    return images.permute(0, 2, 3, 1).contiguous().cpu().numpy()